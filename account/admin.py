@@ -4,7 +4,10 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.forms import UserChangeForm
 from django.utils.translation import gettext_lazy as _
 
+from auth.snapshots import invalidate_user_snapshots
+
 from .forms import CustomUserCreationForm
+from .search import search_accounts
 
 User = get_user_model()
 
@@ -54,5 +57,17 @@ class CustomUserAdmin(BaseUserAdmin):
         "user_permissions",
     )
 
+    def save_model(self, request, obj, form, change):
+        if change:
+            obj.version += 1
+        super().save_model(request, obj, form, change)
+        if change:
+            invalidate_user_snapshots([obj.pk])
+
+    def get_search_results(self, request, queryset, search_term):
+        # Prefix search backed by the account search indexes, instead of
+        # "icontains" table scans
+        return search_accounts(queryset, search_term), False
+
 
 admin.site.register(User, CustomUserAdmin)
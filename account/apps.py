@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save
 
 
 class AccountConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "account"
+
+    def ready(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        from .signals import add_to_blacklist_index, record_session_login
+
+        post_save.connect(
+            add_to_blacklist_index,
+            sender=BlacklistedToken,
+            dispatch_uid="account_add_to_blacklist_index",
+        )
+        user_logged_in.connect(
+            record_session_login,
+            dispatch_uid="account_record_session_login",
+        )
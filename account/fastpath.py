@@ -0,0 +1,105 @@
+"""
+Read path for the read-only account serializers without model instances.
+
+``ModelSerializer`` builds a ``User`` for every row and then calls the
+``to_representation`` of every field on it. ``ValuesSerializer`` fetches the
+declared fields of the serializer with ``values()``/``values_list()`` and
+maps them with converters compiled once from the serializer fields. The
+result has the same keys, order and values as the serializer's ``data``, so
+it renders to the same bytes.
+"""
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+# Fields whose representation of the values the database returns is the
+# value itself, e.g. ``str(value)`` of a ``str``
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+)
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+
+    # DateTimeField.enforce_timezone(), resolved once for aware values
+    field_timezone = (
+        field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    )
+    if field_timezone is None:
+        return field.to_representation
+    to_representation = field.to_representation
+
+    def convert(value):
+        if isinstance(value, str) or timezone.is_naive(value):
+            return to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith("+00:00"):
+            return value[:-6] + "Z"
+        return value
+
+    return convert
+
+
+def compile_converter(field):
+    """
+    Returns a function giving the representation of a non-null database value
+    of ``field``, or ``None`` when the value is its own representation.
+    """
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field)
+    if type(field) in IDENTITY_FIELDS or isinstance(field, serializers.EmailField):
+        return None
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """
+    Represents rows of ``values()`` dicts or ``values_list()`` tuples like
+    ``serializer_class`` represents model instances.
+
+    ``fields`` defaults to every field of the serializer, which must all be
+    model fields. The converters depend on the active time zone, so an
+    instance is meant to be built for a request.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        serializer_fields = serializer_class().fields
+        self.fields = tuple(fields or serializer_fields.keys())
+        self.converters = tuple(
+            compile_converter(serializer_fields[name]) for name in self.fields
+        )
+
+    def values(self, queryset):
+        return queryset.values(*self.fields)
+
+    def values_list(self, queryset):
+        return queryset.values_list(*self.fields)
+
+    def convert_row(self, row):
+        """
+        Returns the represented values of a ``values_list()`` tuple.
+        """
+        return [
+            value if convert is None or value is None else convert(value)
+            for convert, value in zip(self.converters, row)
+        ]
+
+    def to_representation(self, row):
+        """
+        Returns the representation of a ``values()`` dict.
+        """
+        return {
+            name: value if convert is None or value is None else convert(value)
+            for name, convert, value in zip(
+                self.fields, self.converters, map(row.__getitem__, self.fields)
+            )
+        }
+
+    def many(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
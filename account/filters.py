@@ -0,0 +1,56 @@
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.filters import BaseFilterBackend
+
+from .serializers import AccountFilterSerializer
+from .services import filter_accounts
+
+
+class AccountFilterBackend(BaseFilterBackend):
+    """
+    Filters accounts by the query parameters of ``AccountFilterSerializer``,
+    see ``account.services.filter_accounts``.
+    """
+
+    descriptions = {
+        "is_active": "true or false",
+        "is_staff": "true or false",
+        "email_domain": "Domain of the email address, e.g. example.com",
+        "last_login_after": "Last login at or after this ISO 8601 datetime",
+        "last_login_before": "Last login before this ISO 8601 datetime",
+        "search": "Prefixes of the username, first name, last name or email",
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        # A plain dict, as missing booleans of a QueryDict read as false
+        serializer = AccountFilterSerializer(data=request.query_params.dict())
+        serializer.is_valid(raise_exception=True)
+        return filter_accounts(queryset, serializer.validated_data)
+
+    def get_schema_fields(self, view):
+        assert (
+            coreapi is not None
+        ), "coreapi must be installed to use `get_schema_fields()`"
+        assert (
+            coreschema is not None
+        ), "coreschema must be installed to use `get_schema_fields()`"
+        return [
+            coreapi.Field(
+                name=name,
+                required=False,
+                location="query",
+                schema=coreschema.String(description=description),
+            )
+            for name, description in self.descriptions.items()
+        ]
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": name,
+                "required": False,
+                "in": "query",
+                "description": description,
+                "schema": {"type": "string"},
+            }
+            for name, description in self.descriptions.items()
+        ]
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from conf.schema import write_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates the OpenAPI schema served to the Swagger UI, to run at build "
+        "or deploy time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", help="Defaults to settings.OPENAPI_SCHEMA['PATH']"
+        )
+
+    def handle(self, *args, **options):
+        path = write_schema(options["output"])
+        self.stdout.write(self.style.SUCCESS(f"OpenAPI schema written to {path}"))
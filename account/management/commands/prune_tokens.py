@@ -0,0 +1,85 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from auth.pruning import TokenPruner
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired outstanding and blacklisted tokens in small batches, "
+        "safe to run next to live traffic"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--max-rows", type=int, help="Stop after deleting this many tokens"
+        )
+        parser.add_argument(
+            "--max-seconds", type=float, help="Stop after running this long"
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches",
+        )
+        parser.add_argument(
+            "--start-after", type=int, default=0, help="Resume after this token id"
+        )
+        parser.add_argument(
+            "--state-file",
+            help="Resume from and record the last processed token id in this file",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep pruning in passes, each within the budgets, starting over "
+            "once the table is exhausted",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60.0,
+            help="Seconds to wait between passes with --loop",
+        )
+
+    def handle(self, *args, **options):
+        state_file = Path(options["state_file"]) if options["state_file"] else None
+        start_after = options["start_after"]
+        if state_file is not None and state_file.exists():
+            start_after = int(state_file.read_text().strip() or 0)
+
+        while True:
+            progress = self.prune(options, start_after, state_file)
+            start_after = 0 if progress.finished else progress.last_id
+            self.record(state_file, start_after)
+
+            status = "finished" if progress.finished else "stopped"
+            self.stdout.write(self.style.SUCCESS(f"Pruning {status}: {progress}"))
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    def prune(self, options, start_after, state_file):
+        def report(progress):
+            self.record(state_file, progress.last_id)
+            if options["verbosity"] > 1:
+                self.stdout.write(str(progress))
+
+        pruner = TokenPruner(
+            batch_size=options["batch_size"],
+            start_after=start_after,
+            max_rows=options["max_rows"],
+            max_seconds=options["max_seconds"],
+            pause=options["pause"],
+            on_batch=report,
+        )
+        return pruner.run()
+
+    @staticmethod
+    def record(state_file, last_id):
+        if state_file is not None:
+            state_file.write_text(f"{last_id}\n")
@@ -0,0 +1,66 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from account.services import reap_deleted_accounts
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes soft deleted accounts and their related rows in small batches, "
+        "safe to run next to live traffic"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument(
+            "--related-batch-size",
+            type=int,
+            default=1000,
+            help="Tokens and admin log entries deleted per transaction",
+        )
+        parser.add_argument(
+            "--grace-seconds",
+            type=float,
+            default=0.0,
+            help="Only reap accounts deleted at least this long ago",
+        )
+        parser.add_argument(
+            "--max-seconds", type=float, help="Stop after running this long"
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep reaping in passes, each within the budget",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60.0,
+            help="Seconds to wait between passes with --loop",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted_before = aware_utcnow() - timedelta(
+                seconds=options["grace_seconds"]
+            )
+            reaped = reap_deleted_accounts(
+                batch_size=options["batch_size"],
+                deleted_before=deleted_before,
+                max_seconds=options["max_seconds"],
+                pause=options["pause"],
+                related_batch_size=options["related_batch_size"],
+            )
+            self.stdout.write(self.style.SUCCESS(f"Reaped {reaped} accounts"))
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
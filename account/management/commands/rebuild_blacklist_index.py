@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auth.blacklist import get_blacklist_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the worker-wide blacklisted token index snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only add rows blacklisted since the last snapshot",
+        )
+
+    def handle(self, *args, **options):
+        index = get_blacklist_index()
+        if index is None:
+            raise CommandError("The blacklist index is disabled")
+
+        index.refresh(force_rebuild=not options["incremental"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Blacklist index written to {index.path}")
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.4 on 2026-10-18 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="token_epoch",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Tokens issued at or before this time are no longer accepted.",
+                null=True,
+                verbose_name="token epoch",
+            ),
+        ),
+    ]
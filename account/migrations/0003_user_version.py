@@ -0,0 +1,22 @@
+# Generated by Django 4.1.4 on 2026-10-18 07:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0002_user_token_epoch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Incremented whenever the account is changed.",
+                verbose_name="version",
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.1.4 on 2026-10-18 08:05
+
+from django.db import migrations, models
+
+import account.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0003_user_version"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", account.models.AccountUserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Soft deleted accounts are removed later by the reaper.",
+                null=True,
+                verbose_name="deleted at",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["id"],
+                name="account_user_alive_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", False)),
+                fields=["deleted_at"],
+                name="account_user_deleted_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 4.1.4 on 2026-10-18 08:08
+
+import django.db.models.functions.text
+from django.db import DatabaseError, migrations, models, transaction
+
+import account.models
+from account.search import FTS_TABLE, create_fts_triggers, drop_fts_triggers
+
+SEARCH_FIELDS = ("username", "first_name", "last_name", "email")
+
+# External content table over account_user, kept in sync by the triggers of
+# account.search
+SQLITE_FTS = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "username, first_name, last_name, email, "
+    "content='account_user', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+# Trigram indexes on the expressions of Django's istartswith lookups
+POSTGRES_TRGM = [
+    f"CREATE INDEX account_{field}_trgm ON account_user "
+    f'USING gin (UPPER(("{field}")::text) gin_trgm_ops)'
+    for field in SEARCH_FIELDS
+]
+POSTGRES_TRGM_REVERSE = [
+    f"DROP INDEX IF EXISTS account_{field}_trgm" for field in SEARCH_FIELDS
+]
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Creates the full text search table on SQLite and the trigram indexes on
+    PostgreSQL, where the database supports them. Search falls back to the
+    prefix indexes otherwise.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor not in ("sqlite", "postgresql"):
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            if vendor == "sqlite":
+                schema_editor.execute(SQLITE_FTS)
+                create_fts_triggers(schema_editor)
+                schema_editor.execute(
+                    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+                )
+            else:
+                schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                for statement in POSTGRES_TRGM:
+                    schema_editor.execute(statement)
+    except DatabaseError:
+        # SQLite without FTS5, or no permission to create the extension
+        pass
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        drop_fts_triggers(schema_editor)
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == "postgresql":
+        for statement in POSTGRES_TRGM_REVERSE:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0004_user_deleted_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["last_login"], name="account_user_last_login_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                account.models.EmailDomain("email"),
+                name="account_user_email_domain_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                django.db.models.functions.text.Upper("username"),
+                name="account_username_upper_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                django.db.models.functions.text.Upper("first_name"),
+                name="account_first_name_upper_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                django.db.models.functions.text.Upper("last_name"),
+                name="account_last_name_upper_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                django.db.models.functions.text.Upper("email"),
+                name="account_email_upper_idx",
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
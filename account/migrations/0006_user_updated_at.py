@@ -0,0 +1,27 @@
+# Generated by Django 4.1.4 on 2026-10-18 08:12
+
+from django.db import migrations, models
+
+from account.search import restore_fts_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0005_user_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                help_text="Time of the last change, sent as Last-Modified.",
+                verbose_name="updated at",
+            ),
+        ),
+        # Adding the column remakes account_user on SQLite, which drops the
+        # triggers that keep the full text table of 0005 in sync
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,110 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
+from auth.snapshots import invalidate_user_snapshots
+
+# Columns matched by the account search, see account/search.py
+SEARCH_FIELDS = ("username", "first_name", "last_name", "email")
+
+
+class EmailDomain(models.Func):
+    """
+    The lowercased part of an email address after the "@". The "@" is a
+    literal rather than a query parameter, so that filters on the domain
+    match the expression index.
+    """
+
+    template = "LOWER(SUBSTR(%(expressions)s, INSTR(%(expressions)s, '@') + 1))"
+    output_field = models.CharField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="LOWER(SUBSTR(%(expressions)s, STRPOS(%(expressions)s, '@') + 1))",
+            **extra_context,
+        )
+
+
+class UserQuerySet(models.QuerySet):
+    def alive(self):
+        """
+        Excludes the soft deleted accounts that wait for the reaper.
+        """
+        return self.filter(deleted_at__isnull=True)
+
+    def soft_deleted(self):
+        return self.filter(deleted_at__isnull=False)
+
+
+class AccountUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
 
 class User(AbstractUser):
     first_name = models.CharField(_("first name"), max_length=150)
     last_name = models.CharField(_("last name"), max_length=150)
     email = models.EmailField(_("email address"))
+    token_epoch = models.DateTimeField(
+        _("token epoch"),
+        null=True,
+        blank=True,
+        help_text=_("Tokens issued at or before this time are no longer accepted."),
+    )
+    version = models.PositiveIntegerField(
+        _("version"),
+        default=0,
+        help_text=_("Incremented whenever the account is changed."),
+    )
+    updated_at = models.DateTimeField(
+        _("updated at"),
+        auto_now=True,
+        help_text=_("Time of the last change, sent as Last-Modified."),
+    )
+    deleted_at = models.DateTimeField(
+        _("deleted at"),
+        null=True,
+        blank=True,
+        help_text=_("Soft deleted accounts are removed later by the reaper."),
+    )
+
+    objects = AccountUserManager()
 
     REQUIRED_FIELDS = ["first_name", "last_name", "email"]
+
+    def save(self, *args, **kwargs):
+        # set_password() keeps the raw password until the user is saved, e.g.
+        # by the admin's password change form
+        password_changed = self._password is not None
+        if password_changed:
+            self.version += 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "version"}
+        super().save(*args, **kwargs)
+        if password_changed:
+            invalidate_user_snapshots([self.pk])
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Partial indexes: reads scan the live accounts in primary key
+            # order, the reaper picks the soft deleted ones oldest first
+            models.Index(
+                fields=["id"],
+                condition=models.Q(deleted_at__isnull=True),
+                name="account_user_alive_idx",
+            ),
+            models.Index(
+                fields=["deleted_at"],
+                condition=models.Q(deleted_at__isnull=False),
+                name="account_user_deleted_idx",
+            ),
+            models.Index(fields=["last_login"], name="account_user_last_login_idx"),
+            models.Index(EmailDomain("email"), name="account_user_email_domain_idx"),
+            *(
+                models.Index(Upper(field), name=f"account_{field}_upper_idx")
+                for field in SEARCH_FIELDS
+            ),
+        ]
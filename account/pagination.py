@@ -0,0 +1,39 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class AccountCursorPagination(CursorPagination):
+    """
+    Keyset pagination of accounts by primary key.
+
+    Every page is a ``WHERE id > <cursor> ORDER BY id LIMIT <page size>``
+    query on the primary key index, so deep pages cost the same as the first
+    one. The total number of accounts is only counted when asked for with
+    ``?with_count=true``.
+    """
+
+    ordering = "id"
+    page_size_query_param = "page_size"
+    count_query_param = "with_count"
+
+    def __init__(self):
+        config = settings.ACCOUNT_LIST_PAGINATION
+        self.page_size = config["PAGE_SIZE"]
+        self.max_page_size = config["MAX_PAGE_SIZE"]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ("1", "true"):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data["count"] = self.count
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema["properties"]["count"] = {"type": "integer", "example": 123}
+        return schema
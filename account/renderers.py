@@ -0,0 +1,85 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class StreamingRenderer(BaseRenderer):
+    """
+    Renders rows of values one chunk at a time.
+
+    ``stream`` turns an iterable of value tuples into an iterator of encoded
+    chunks for a ``StreamingHttpResponse``, so only ``chunk_size`` rows are
+    held in memory. ``render`` covers the ordinary responses of the view,
+    e.g. errors.
+    """
+
+    def encode_rows(self, fields, rows):
+        raise NotImplementedError("Streaming renderers must implement .encode_rows()")
+
+    def header(self, fields):
+        return ""
+
+    def stream(self, fields, rows, chunk_size):
+        yield self.header(fields).encode()
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                yield self.encode_rows(fields, batch).encode()
+                batch = []
+        if batch:
+            yield self.encode_rows(fields, batch).encode()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        fields = list(items[0]) if items else []
+        rows = [[item.get(field) for field in fields] for item in items]
+        return (self.header(fields) + self.encode_rows(fields, rows)).encode()
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """
+    Newline delimited JSON, one object per row.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def encode_rows(self, fields, rows):
+        encode = self.encoder.encode
+        return "".join(encode(dict(zip(fields, row))) + "\n" for row in rows)
+
+
+class CSVRenderer(StreamingRenderer):
+    """
+    CSV with a header row. Booleans are written as ``true``/``false`` and
+    null values as empty cells.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+
+    class Buffer(list):
+        def write(self, value):
+            self.append(value)
+
+    def cell(self, value):
+        if value is None:
+            return ""
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        return value
+
+    def header(self, fields):
+        return self.encode_rows(fields, [fields])
+
+    def encode_rows(self, fields, rows):
+        buffer = self.Buffer()
+        writer = csv.writer(buffer)
+        writer.writerows([self.cell(value) for value in row] for row in rows)
+        return "".join(buffer)
@@ -0,0 +1,181 @@
+"""
+Account search by name, username and email.
+
+Every whitespace separated term of a search must be the prefix of one of the
+``SEARCH_FIELDS`` of an account. Depending on the database the terms are
+matched by:
+
+* ``fts5``: the SQLite full text table created by the account migrations,
+  which also matches the words inside the fields, e.g. "doe" in
+  "john.doe@example.com".
+* ``trigram``: PostgreSQL trigram indexes on the case-insensitive fields.
+* ``prefix``: case-insensitive ranges on the ``Upper()`` indexes of the
+  fields, on any database. The ranges compare strings by code point, which is
+  the SQLite default and needs the "C" collation on PostgreSQL.
+
+``settings.ACCOUNT_SEARCH_BACKEND`` picks one of them, or the best available
+one with ``"auto"``.
+
+Migrations that remake ``account_user`` on SQLite, e.g. to add a column with
+a default, drop the triggers that keep the full text table in sync. They have
+to end with ``migrations.RunPython(restore_fts_triggers, RunPython.noop)``,
+see migration 0006.
+"""
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
+from django.dispatch import receiver
+
+from .models import SEARCH_FIELDS
+
+FTS_TABLE = "account_user_fts"
+TRIGRAM_INDEX = "account_username_trgm"
+
+_FTS_COLUMNS = ", ".join(SEARCH_FIELDS)
+_FTS_NEW = ", ".join(f"new.{field}" for field in SEARCH_FIELDS)
+_FTS_OLD = ", ".join(f"old.{field}" for field in SEARCH_FIELDS)
+_FTS_INSERT = (
+    f"INSERT INTO {FTS_TABLE}(rowid, {_FTS_COLUMNS}) VALUES (new.id, {_FTS_NEW});"
+)
+_FTS_DELETE = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_FTS_COLUMNS}) "
+    f"VALUES ('delete', old.id, {_FTS_OLD});"
+)
+# The triggers that keep the external content table in sync with account_user
+FTS_TRIGGERS = {
+    f"{FTS_TABLE}_insert": f"AFTER INSERT ON account_user BEGIN {_FTS_INSERT} END",
+    f"{FTS_TABLE}_delete": f"AFTER DELETE ON account_user BEGIN {_FTS_DELETE} END",
+    f"{FTS_TABLE}_update": (
+        f"AFTER UPDATE OF {_FTS_COLUMNS} ON account_user "
+        f"BEGIN {_FTS_DELETE} {_FTS_INSERT} END"
+    ),
+}
+
+_backends = {}
+
+
+def create_fts_triggers(schema_editor):
+    """
+    Creates the missing triggers of the SQLite full text table.
+    """
+    for name, definition in FTS_TRIGGERS.items():
+        schema_editor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {definition}")
+
+
+def drop_fts_triggers(schema_editor):
+    for name in FTS_TRIGGERS:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def restore_fts_triggers(apps, schema_editor):
+    """
+    Migration operation creating the triggers of the SQLite full text table
+    again, after ``account_user`` was remade.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        if FTS_TABLE not in connection.introspection.table_names(cursor):
+            return
+    create_fts_triggers(schema_editor)
+
+
+def _detect_backend(connection):
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            if FTS_TABLE in connection.introspection.table_names(cursor):
+                return "fts5"
+    elif connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_indexes WHERE indexname = %s", [TRIGRAM_INDEX]
+            )
+            if cursor.fetchone() is not None:
+                return "trigram"
+    return "prefix"
+
+
+def get_search_backend(using):
+    """
+    Returns the name of the search backend of the ``using`` database.
+    """
+    backend = settings.ACCOUNT_SEARCH_BACKEND
+    if backend != "auto":
+        return backend
+    if using not in _backends:
+        _backends[using] = _detect_backend(connections[using])
+    return _backends[using]
+
+
+@receiver(setting_changed)
+def reset_search_backends(*, setting, **kwargs):
+    if setting in ("ACCOUNT_SEARCH_BACKEND", "DATABASES"):
+        _backends.clear()
+
+
+def _fts_match(terms):
+    # Every term as a quoted prefix query, so FTS5 operators are literal
+    return " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def _upper(term, vendor):
+    # SQLite's UPPER() only folds ASCII letters
+    if vendor == "sqlite":
+        return "".join(char.upper() if char.isascii() else char for char in term)
+    return term.upper()
+
+
+def _prefix_range(alias, prefix):
+    condition = Q(**{f"{alias}__gte": prefix})
+    last = ord(prefix[-1])
+    if last < 0x10FFFF:
+        condition &= Q(**{f"{alias}__lt": prefix[:-1] + chr(last + 1)})
+    return condition
+
+
+def _any_field(condition):
+    match = Q()
+    for field in SEARCH_FIELDS:
+        match |= condition(field)
+    return match
+
+
+def search_accounts(queryset, search):
+    """
+    Narrows ``queryset`` down to the accounts matching every term of
+    ``search``.
+    """
+    terms = search.split()
+    if not terms:
+        return queryset
+
+    backend = get_search_backend(queryset.db)
+    if backend == "fts5":
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                (_fts_match(terms),),
+            )
+        )
+
+    if backend == "trigram":
+        for term in terms:
+            queryset = queryset.filter(
+                _any_field(lambda field: Q(**{f"{field}__istartswith": term}))
+            )
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    queryset = queryset.alias(
+        **{f"{field}_upper": Upper(field) for field in SEARCH_FIELDS}
+    )
+    for term in terms:
+        prefix = _upper(term, vendor)
+        queryset = queryset.filter(
+            _any_field(lambda field: _prefix_range(f"{field}_upper", prefix))
+        )
+    return queryset
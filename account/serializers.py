@@ -1,8 +1,15 @@
-from django.contrib.auth.hashers import make_password
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoCoreValidationError
+from django.core.validators import EmailValidator
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.validators import UniqueValidator
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from auth.epochs import cache_token_epoch
+from auth.hashing import make_password
+from auth.snapshots import invalidate_user_snapshots
 
 from .models import User as AccountUser
 
@@ -63,10 +70,140 @@ class AccountSerializer(serializers.ModelSerializer):
         instance.first_name = validated_data.get("first_name", instance.first_name)
         instance.last_name = validated_data.get("last_name", instance.last_name)
         instance.email = validated_data.get("email", instance.email)
+        revoke_tokens = False
         if validated_data.get("password"):
             password = make_password(validated_data.get("password"))
             instance.password = password
+            revoke_tokens = True
+        if instance.is_active and validated_data.get("is_active") is False:
+            revoke_tokens = True
         instance.is_active = validated_data.get("is_active", instance.is_active)
         instance.is_stuff = validated_data.get("is_staff", instance.is_staff)
+        if revoke_tokens:
+            # Password changes and deactivation invalidate all issued tokens
+            instance.token_epoch = aware_utcnow()
+        instance.version += 1
         instance.save()
+        if revoke_tokens:
+            cache_token_epoch(instance.pk, instance.token_epoch)
+        invalidate_user_snapshots([instance.pk])
         return instance
+
+
+class BulkAccountSerializer(AccountSerializer):
+    """
+    Validates one account of a bulk creation. Username collisions are
+    checked for all the accounts at once by ``account.services``, and the
+    password is validated here so it's reported with the other field errors.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        username = fields["username"]
+        username.validators = [
+            validator
+            for validator in username.validators
+            if not isinstance(validator, UniqueValidator)
+        ]
+        return fields
+
+    def validate_password(self, value):
+        try:
+            validate_password(value)
+        except DjangoCoreValidationError as err:
+            raise ValidationError(err.messages, code="invalid_password") from None
+        return value
+
+
+def validate_email_domain(value):
+    try:
+        EmailValidator()(f"user@{value}")
+    except DjangoCoreValidationError:
+        raise ValidationError("Enter a valid email domain.", code="invalid") from None
+
+
+class BulkAccountChangesSerializer(serializers.ModelSerializer):
+    """
+    The changes of a bulk update: the fields of ``AccountSerializer`` that
+    are the same for every account. Usernames are unique and passwords are
+    hashed per account, so they can only be changed one account at a time.
+    ``email_domain`` replaces the domain of every email address.
+    """
+
+    email_domain = serializers.CharField(
+        required=False, validators=[validate_email_domain]
+    )
+
+    class Meta:
+        model = AccountUser
+        fields = [
+            "first_name",
+            "last_name",
+            "email",
+            "is_active",
+            "is_staff",
+            "email_domain",
+        ]
+        extra_kwargs = {field: {"required": False} for field in fields}
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            unknown = sorted(set(data) - set(self.fields))
+            if unknown:
+                raise ValidationError(
+                    {
+                        field: ["This field can't be changed in bulk."]
+                        for field in unknown
+                    },
+                    code="invalid",
+                )
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise ValidationError("No changes given.", code="required")
+        if "email" in attrs and "email_domain" in attrs:
+            raise ValidationError(
+                "Change either the email or its domain.", code="invalid"
+            )
+        return attrs
+
+
+class AccountFilterSerializer(serializers.Serializer):
+    is_active = serializers.BooleanField(required=False)
+    is_staff = serializers.BooleanField(required=False)
+    email_domain = serializers.CharField(
+        required=False, validators=[validate_email_domain]
+    )
+    last_login_after = serializers.DateTimeField(required=False)
+    last_login_before = serializers.DateTimeField(required=False)
+    search = serializers.CharField(required=False, max_length=150)
+
+
+class BulkAccountUpdateSerializer(serializers.Serializer):
+    """
+    Selects the accounts of a bulk update by ``ids`` or by ``filter`` and
+    holds the ``changes`` to make.
+    """
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False
+    )
+    filter = AccountFilterSerializer(required=False)
+    changes = BulkAccountChangesSerializer()
+
+    def validate_ids(self, value):
+        max_items = settings.ACCOUNT_BULK["MAX_ITEMS"]
+        if len(value) > max_items:
+            raise ValidationError(
+                f"Ensure this field has no more than {max_items} elements.",
+                code="max_length",
+            )
+        return value
+
+    def validate(self, attrs):
+        if ("ids" in attrs) == ("filter" in attrs):
+            raise ValidationError(
+                "Select the accounts either by ids or by filter.", code="invalid"
+            )
+        return attrs
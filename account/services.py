@@ -0,0 +1,316 @@
+import time
+
+from django.conf import settings
+from django.contrib.admin.models import LogEntry
+from django.db import IntegrityError, transaction
+from django.db.models import Case, EmailField, F, Value, When
+from django.db.models.functions import Concat, Left, StrIndex
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from auth.epochs import cache_token_epochs, forget_token_epochs
+from auth.hashing import make_passwords
+from auth.pruning import delete_user_tokens
+from auth.services import blacklist_user_tokens
+from auth.snapshots import invalidate_user_snapshots
+
+from .models import EmailDomain
+from .models import User as AccountUser
+from .search import search_accounts
+from .serializers import AccountPreviewSerializer, BulkAccountSerializer
+
+CREATED = "created"
+FAILED = "failed"
+# Valid items that weren't created because others failed in atomic mode
+SKIPPED = "skipped"
+
+
+def _failure(index, errors):
+    return {"index": index, "status": FAILED, "errors": errors}
+
+
+def _username_taken():
+    return {
+        "username": [AccountUser._meta.get_field("username").error_messages["unique"]]
+    }
+
+
+def _taken_usernames(accepted):
+    usernames = [data["username"] for _index, data in accepted]
+    return set(
+        AccountUser.objects.filter(username__in=usernames).values_list(
+            "username", flat=True
+        )
+    )
+
+
+def _insert(accounts):
+    created = AccountUser.objects.bulk_create(
+        accounts, batch_size=settings.ACCOUNT_BULK["BATCH_SIZE"]
+    )
+    return AccountPreviewSerializer(created, many=True).data
+
+
+def create_accounts(items, atomic=True):
+    """
+    Creates an account for every item of ``items`` and returns the result of
+    each one, in order.
+
+    All the items are validated before anything is written. Usernames are
+    checked against the database by a single ``IN`` query, the passwords are
+    hashed in parallel (see ``auth.hashing.make_passwords``) and the accounts
+    are inserted by ``bulk_create`` in batches of
+    ``ACCOUNT_BULK["BATCH_SIZE"]``.
+
+    With ``atomic`` nothing is created unless every item is valid. Otherwise
+    the valid items are created and each batch is committed on its own.
+    Usernames created concurrently, after the check, fail their items: in
+    best effort mode the rest of their batch is inserted again.
+    """
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        serializer = BulkAccountSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = _failure(index, serializer.errors)
+
+    taken = _taken_usernames(valid)
+    accepted = []
+    for index, data in valid:
+        if data["username"] in taken:
+            results[index] = _failure(index, _username_taken())
+        else:
+            taken.add(data["username"])
+            accepted.append((index, data))
+
+    if atomic and len(accepted) < len(items):
+        for index, _data in accepted:
+            results[index] = {"index": index, "status": SKIPPED}
+        return results
+
+    hashes = make_passwords([data["password"] for _index, data in accepted])
+    accounts = [
+        AccountUser(**{**data, "password": password})
+        for (_index, data), password in zip(accepted, hashes)
+    ]
+    batch_size = settings.ACCOUNT_BULK["BATCH_SIZE"]
+    if atomic:
+        try:
+            with transaction.atomic():
+                batches = [(accepted, _insert(accounts))]
+        except IntegrityError:
+            # Usernames were taken since they were checked: nothing is created,
+            # and the rows that took them are committed
+            taken = _taken_usernames(accepted)
+            if not taken:
+                raise
+            for index, data in accepted:
+                if data["username"] in taken:
+                    results[index] = _failure(index, _username_taken())
+                else:
+                    results[index] = {"index": index, "status": SKIPPED}
+            return results
+    else:
+        batches = []
+        for start in range(0, len(accounts), batch_size):
+            end = start + batch_size
+            batch = list(zip(accepted[start:end], accounts[start:end]))
+            while batch:
+                try:
+                    with transaction.atomic():
+                        created = _insert([account for _item, account in batch])
+                except IntegrityError:
+                    # Usernames were taken since they were checked, the rest
+                    # of the batch is inserted again without them
+                    taken = _taken_usernames([item for item, _account in batch])
+                    if not taken:
+                        raise
+                    for (index, data), _account in batch:
+                        if data["username"] in taken:
+                            results[index] = _failure(index, _username_taken())
+                    batch = [
+                        (item, account)
+                        for item, account in batch
+                        if item[1]["username"] not in taken
+                    ]
+                else:
+                    batches.append(([item for item, _account in batch], created))
+                    break
+
+    for batch, created in batches:
+        for (index, _data), account in zip(batch, created):
+            results[index] = {"index": index, "status": CREATED, "account": account}
+    return results
+
+
+def filter_accounts(queryset, filters):
+    """
+    Narrows ``queryset`` down to the accounts matching ``filters``, validated
+    by ``AccountFilterSerializer``.
+    """
+    for field in ("is_active", "is_staff"):
+        if field in filters:
+            queryset = queryset.filter(**{field: filters[field]})
+    if "email_domain" in filters:
+        # Matches the expression index on the domain
+        queryset = queryset.alias(email_domain=EmailDomain("email")).filter(
+            email_domain=filters["email_domain"].lower()
+        )
+    if "last_login_after" in filters:
+        queryset = queryset.filter(last_login__gte=filters["last_login_after"])
+    if "last_login_before" in filters:
+        queryset = queryset.filter(last_login__lt=filters["last_login_before"])
+    if filters.get("search"):
+        queryset = search_accounts(queryset, filters["search"])
+    return queryset
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]  # noqa: E203
+
+
+def _id_batches(queryset, batch_size):
+    # Keyset pagination over the primary key, so rows leaving the filter
+    # after an update don't shift the following batches
+    last_id = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def _update_values(changes):
+    values = dict(changes)
+    domain = values.pop("email_domain", None)
+    if domain is not None:
+        # Keeps everything up to and including the "@"
+        values["email"] = Case(
+            When(
+                email__contains="@",
+                then=Concat(
+                    Left("email", StrIndex("email", Value("@"))),
+                    Value(domain),
+                    output_field=EmailField(),
+                ),
+            ),
+            default=F("email"),
+        )
+    values["version"] = F("version") + 1
+    return values
+
+
+def update_accounts(changes, ids=None, filters=None):
+    """
+    Applies ``changes`` (see ``BulkAccountChangesSerializer``) to the
+    accounts with the given ``ids``, or to the ones matching ``filters``.
+
+    The accounts are updated by one ``UPDATE`` per batch of
+    ``ACCOUNT_BULK["BATCH_SIZE"]`` accounts, each batch in its own
+    transaction. Deactivating accounts revokes their tokens in the same
+    statement, by moving the token epoch, and blacklists their refresh
+    tokens in the same transaction. Returns the number of updated accounts
+    and blacklisted tokens.
+    """
+    batch_size = settings.ACCOUNT_BULK["BATCH_SIZE"]
+    if ids is not None:
+        batches = _chunks(sorted(set(ids)), batch_size)
+    else:
+        batches = _id_batches(
+            filter_accounts(AccountUser.objects.alive(), filters), batch_size
+        )
+
+    values = _update_values(changes)
+    now = aware_utcnow()
+    values["updated_at"] = now
+    epoch = None
+    if changes.get("is_active") is False:
+        epoch = now
+        values["token_epoch"] = epoch
+
+    updated = blacklisted = 0
+    for batch in batches:
+        with transaction.atomic():
+            updated += AccountUser.objects.alive().filter(pk__in=batch).update(**values)
+            if epoch is not None:
+                blacklisted += blacklist_user_tokens(batch)
+        if epoch is not None:
+            cache_token_epochs(batch, epoch)
+        invalidate_user_snapshots(batch)
+    return {"updated": updated, "blacklisted_tokens": blacklisted}
+
+
+def soft_delete_accounts(user_ids):
+    """
+    Marks the given accounts deleted and deactivates them, revoking their
+    tokens, with a single ``UPDATE``. The rows and everything related to
+    them are deleted later by ``reap_deleted_accounts()``. Returns the
+    number of accounts deleted.
+    """
+    user_ids = list(user_ids)
+    now = aware_utcnow()
+    deleted = (
+        AccountUser.objects.alive()
+        .filter(pk__in=user_ids)
+        .update(
+            deleted_at=now,
+            updated_at=now,
+            is_active=False,
+            token_epoch=now,
+            version=F("version") + 1,
+        )
+    )
+    cache_token_epochs(user_ids, now)
+    invalidate_user_snapshots(user_ids)
+    return deleted
+
+
+def reap_deleted_accounts(
+    batch_size=20,
+    deleted_before=None,
+    max_seconds=None,
+    pause=0.0,
+    related_batch_size=1000,
+):
+    """
+    Deletes the soft deleted accounts, oldest first, ``batch_size`` at a
+    time. The tokens and admin log entries of a batch, which can be
+    numerous, are deleted first, ``related_batch_size`` rows per
+    transaction. The accounts are then deleted, with the cascade through
+    groups and permissions, in their own short transaction.
+
+    Only accounts deleted at or before ``deleted_before`` are reaped, if
+    given. ``max_seconds`` limits the run time and ``pause`` is slept
+    between batches. Returns the number of reaped accounts.
+    """
+    started_at = time.monotonic()
+    queryset = AccountUser.objects.soft_deleted().order_by("deleted_at")
+    if deleted_before is not None:
+        queryset = queryset.filter(deleted_at__lte=deleted_before)
+
+    reaped = 0
+    while True:
+        batch = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            break
+        delete_user_tokens(batch, batch_size=related_batch_size)
+        log_entries = LogEntry.objects.filter(user_id__in=batch)
+        for log_entry_ids in _id_batches(log_entries, related_batch_size):
+            LogEntry.objects.filter(pk__in=log_entry_ids).delete()
+        with transaction.atomic():
+            AccountUser.objects.filter(pk__in=batch).delete()
+        forget_token_epochs(batch)
+        invalidate_user_snapshots(batch)
+        reaped += len(batch)
+        if max_seconds is not None and time.monotonic() - started_at >= max_seconds:
+            break
+        if pause:
+            time.sleep(pause)
+    return reaped
@@ -0,0 +1,23 @@
+from auth.blacklist import get_blacklist_index
+from auth.services import record_login
+
+
+def add_to_blacklist_index(sender, instance, created, **kwargs):
+    """
+    Publishes a newly blacklisted token to the worker-wide blacklist index, so
+    other workers on this host see it without waiting for a refresh.
+    """
+    if not created:
+        return
+    index = get_blacklist_index()
+    if index is not None:
+        index.add(instance.token.jti)
+
+
+def record_session_login(sender, request, user, **kwargs):
+    """
+    Bumps the account version on the session logins of the admin, like the
+    token logins do, as the account representations show the last login.
+    Django's ``update_last_login()`` receiver stores the login time again.
+    """
+    record_login(user)
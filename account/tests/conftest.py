@@ -2,6 +2,47 @@ import pytest
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from conf.middleware import query_stats_recorded
+
+
+@pytest.fixture(autouse=True)
+def query_budget(request):
+    """
+    Collects the view name and ``QueryStats`` of every request made by the
+    test, see ``conf.middleware.QueryCountMiddleware``.
+
+    Tests marked with ``@pytest.mark.query_budget(queries, duplicates=None)``
+    fail when a request runs more than ``queries`` SQL queries, or repeats
+    statements more than ``duplicates`` times.
+    """
+    recorded = []
+
+    def record(sender, view_name, stats, **kwargs):
+        recorded.append((view_name, stats))
+
+    query_stats_recorded.connect(record)
+    yield recorded
+    query_stats_recorded.disconnect(record)
+
+    marker = request.node.get_closest_marker("query_budget")
+    if marker is None:
+        return
+    queries = marker.args[0]
+    duplicates = marker.kwargs.get("duplicates")
+    assert recorded, "The test didn't make any request"
+    for view_name, stats in recorded:
+        if stats.queries > queries:
+            pytest.fail(
+                f"{view_name} ran {stats.queries} queries, "
+                f"over its budget of {queries}"
+            )
+        if duplicates is not None and stats.duplicates > duplicates:
+            statement, count = stats.most_duplicated()
+            pytest.fail(
+                f"{view_name} repeated statements {stats.duplicates} times, over its "
+                f"budget of {duplicates}, e.g. {count} times: {statement}"
+            )
+
 
 @pytest.fixture()
 def api_client():
@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+
+import pytest
+from django.utils import timezone as django_timezone
+from rest_framework.renderers import JSONRenderer
+
+from account.fastpath import ValuesSerializer
+from account.serializers import AccountPreviewSerializer, PersonalAccountSerializer
+
+
+@pytest.fixture
+def accounts(django_user_model):
+    return django_user_model.objects.bulk_create(
+        [
+            django_user_model(
+                username="jürgen",
+                first_name="Jürgen",
+                email="jurgen@example.com",
+                last_login=datetime(
+                    2022, 12, 24, 18, 30, 5, 123456, tzinfo=timezone.utc
+                ),
+            ),
+            django_user_model(username="nologin", is_staff=True, is_active=False),
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "serializer_class", [AccountPreviewSerializer, PersonalAccountSerializer]
+)
+class TestValuesSerializer:
+    def test_many_renders_like_the_serializer(
+        self, serializer_class, accounts, django_user_model
+    ):
+        queryset = django_user_model.objects.order_by("id")
+        serializer = ValuesSerializer(serializer_class)
+        expected = serializer_class(queryset, many=True).data
+        rows = serializer.many(serializer.values(queryset))
+        assert JSONRenderer().render(rows) == JSONRenderer().render(expected)
+
+    def test_convert_row_matches_the_serializer(
+        self, serializer_class, accounts, django_user_model
+    ):
+        queryset = django_user_model.objects.order_by("id")
+        serializer = ValuesSerializer(serializer_class, ["id", "last_login"])
+        expected = [
+            [item["id"], item["last_login"]]
+            for item in serializer_class(queryset, many=True).data
+        ]
+        rows = serializer.values_list(queryset)
+        assert [serializer.convert_row(row) for row in rows] == expected
+
+    def test_active_time_zone(self, serializer_class, accounts, django_user_model):
+        account = django_user_model.objects.get(pk=accounts[0].pk)
+        with django_timezone.override("Europe/Berlin"):
+            serializer = ValuesSerializer(serializer_class)
+            row = serializer.values(django_user_model.objects.filter(pk=account.pk))[0]
+            representation = serializer.to_representation(row)
+            assert representation == serializer_class(account).data
+        assert representation["last_login"] == "2022-12-24T19:30:05.123456+01:00"
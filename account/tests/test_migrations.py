@@ -0,0 +1,37 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+from account.models import User
+from account.search import FTS_TABLE, FTS_TRIGGERS, search_accounts
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "sqlite", reason="full text table of SQLite"
+)
+
+
+def fts_triggers():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s",
+            ["account_user"],
+        )
+        return {name for name, in cursor.fetchall()}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_latest_migration_keeps_fts_triggers(settings):
+    settings.ACCOUNT_SEARCH_BACKEND = "fts5"
+    executor = MigrationExecutor(connection)
+    executor.migrate([("account", "0004_user_deleted_at")])
+    with connection.cursor() as cursor:
+        assert FTS_TABLE not in connection.introspection.table_names(cursor)
+
+    executor.loader.build_graph()
+    executor.migrate(executor.loader.graph.leaf_nodes("account"))
+
+    assert fts_triggers() >= FTS_TRIGGERS.keys()
+    user = User.objects.create_user("jdoe", "john.doe@example.com", "password")
+    assert list(search_accounts(User.objects.all(), "doe")) == [user]
+    User.objects.filter(pk=user.pk).update(email="jane@example.com")
+    assert not search_accounts(User.objects.all(), "doe").exists()
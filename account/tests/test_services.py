@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.core.management import call_command
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from account import services
+from account.services import (
+    CREATED,
+    FAILED,
+    SKIPPED,
+    create_accounts,
+    reap_deleted_accounts,
+    soft_delete_accounts,
+)
+
+
+@pytest.fixture
+def accounts(django_user_model):
+    """
+    Three accounts with a refresh token each, the first two soft deleted.
+    """
+    accounts = django_user_model.objects.bulk_create(
+        django_user_model(username=f"user{index}") for index in range(3)
+    )
+    for account in accounts:
+        RefreshToken.for_user(account)
+    soft_delete_accounts([account.pk for account in accounts[:2]])
+    return accounts
+
+
+class TestReapDeletedAccounts:
+    def test_soft_deleted_accounts_are_deleted(self, accounts, django_user_model):
+        assert reap_deleted_accounts(batch_size=1) == 2
+        assert list(django_user_model.objects.values_list("pk", flat=True)) == [
+            accounts[2].pk
+        ]
+        assert OutstandingToken.objects.filter(user__isnull=True).count() == 0
+        assert OutstandingToken.objects.count() == 1
+
+    def test_related_rows_are_deleted_in_batches(self, accounts):
+        for _ in range(2):
+            jti = RefreshToken.for_user(accounts[0])["jti"]
+            BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=jti))
+        LogEntry.objects.log_action(
+            accounts[0].pk, None, None, "", ADDITION, change_message=""
+        )
+        reap_deleted_accounts(batch_size=2, related_batch_size=2)
+        assert OutstandingToken.objects.filter(user__isnull=True).count() == 0
+        assert BlacklistedToken.objects.count() == 0
+        assert LogEntry.objects.count() == 0
+
+    def test_recently_deleted_accounts_are_kept(self, accounts, django_user_model):
+        deleted_before = aware_utcnow() - timedelta(minutes=1)
+        assert reap_deleted_accounts(deleted_before=deleted_before) == 0
+        assert django_user_model.objects.count() == 3
+
+    def test_command(self, accounts, django_user_model):
+        call_command("reap_accounts", batch_size=1)
+        assert django_user_model.objects.count() == 1
+
+
+@pytest.fixture
+def created_concurrently(monkeypatch, django_user_model):
+    """
+    Creates the given usernames after ``create_accounts()`` checked them,
+    while it hashes the passwords.
+    """
+    usernames = []
+    make_passwords = services.make_passwords
+
+    def create_then_hash(passwords):
+        for username in usernames:
+            django_user_model.objects.create_user(username=username)
+        return make_passwords(passwords)
+
+    monkeypatch.setattr(services, "make_passwords", create_then_hash)
+    return usernames
+
+
+class TestCreateAccounts:
+    items = [
+        {
+            "username": f"user{index}",
+            "first_name": "Bulk",
+            "last_name": "User",
+            "email": f"user{index}@example.com",
+            "password": "super_secret_password",
+        }
+        for index in range(5)
+    ]
+
+    @pytest.fixture(autouse=True)
+    def small_batches(self, settings):
+        settings.ACCOUNT_BULK = {**settings.ACCOUNT_BULK, "BATCH_SIZE": 2}
+
+    def statuses(self, results):
+        return [result["status"] for result in results]
+
+    @pytest.mark.django_db
+    def test_atomic_with_concurrently_taken_username(
+        self, created_concurrently, django_user_model
+    ):
+        created_concurrently.append("user3")
+        results = create_accounts(self.items, atomic=True)
+        assert self.statuses(results) == [SKIPPED, SKIPPED, SKIPPED, FAILED, SKIPPED]
+        assert "username" in results[3]["errors"]
+        assert django_user_model.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_best_effort_with_concurrently_taken_username(
+        self, created_concurrently, django_user_model
+    ):
+        created_concurrently.extend(["user0", "user3"])
+        results = create_accounts(self.items, atomic=False)
+        # The other item of each batch is created anyway
+        assert self.statuses(results) == [FAILED, CREATED, CREATED, FAILED, CREATED]
+        assert django_user_model.objects.count() == 5
@@ -1,8 +1,20 @@
+import csv
+import io
+import json
+
+import pytest
 from django.urls import reverse, reverse_lazy
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
 
-from account.views import (AccountCreateView, AccountDestroyView,
-                           AccountListView, AccountRetrieveView,
-                           AccountUpdateView, PersonalAccountView)
+from account.views import (AccountBulkCreateView, AccountBulkUpdateView,
+                           AccountCreateView, AccountDestroyView,
+                           AccountExportView, AccountListView,
+                           AccountRetrieveView, AccountUpdateView,
+                           PersonalAccountView)
+from account.serializers import AccountPreviewSerializer, AccountSerializer
+from account.services import soft_delete_accounts
+from auth.epochs import is_token_revoked
 
 
 class TestPersonalAccountView:
@@ -20,6 +32,7 @@ class TestPersonalAccountView:
         assert "detail" in response.data
         assert response.data["detail"].code == "not_authenticated"
 
+    @pytest.mark.query_budget(3, duplicates=0)
     def test_authenticated_valid_request(self, user_api_client, regular_user_data):
         view_url = self.view_url()
         client = user_api_client
@@ -34,6 +47,69 @@ class TestPersonalAccountView:
         assert response.status_code == 200
         assert "password" not in response.data
 
+    def test_conditional_get(self, user_api_client, django_assert_num_queries):
+        view_url = self.view_url()
+        client = user_api_client
+        response = client.get(view_url)
+        assert response.status_code == 200
+        etag = response["ETag"]
+        assert response["Last-Modified"]
+
+        # Authentication only, the account snapshot is cached
+        with django_assert_num_queries(1):
+            response = client.get(view_url, HTTP_IF_NONE_MATCH=etag)
+        # 304: not modified
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+
+    def test_login_changes_etag(self, api_client, user_api_client, regular_user_data):
+        view_url = self.view_url()
+        client = user_api_client
+        etag = client.get(view_url)["ETag"]
+        response = api_client.post(
+            reverse("token_obtain_pair"),
+            {
+                "username": regular_user_data["username"],
+                "password": regular_user_data["password"],
+            },
+        )
+        assert response.status_code == 200
+        response = client.get(view_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+        assert response.data["last_login"] is not None
+
+    def test_session_login_changes_etag(
+        self, client, user_api_client, regular_user_data
+    ):
+        view_url = self.view_url()
+        etag = user_api_client.get(view_url)["ETag"]
+        assert client.login(
+            username=regular_user_data["username"],
+            password=regular_user_data["password"],
+        )
+        response = user_api_client.get(view_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+
+    def test_admin_password_change_changes_etag(
+        self, admin_client, user_api_client, django_user_model
+    ):
+        view_url = self.view_url()
+        etag = user_api_client.get(view_url)["ETag"]
+        user = django_user_model.objects.get(username="johndoe")
+        response = admin_client.post(
+            reverse("admin:auth_user_password_change", args=[user.pk]),
+            {
+                "password1": "another_secret_password",
+                "password2": "another_secret_password",
+            },
+        )
+        assert response.status_code == 302
+        response = user_api_client.get(view_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+
 
 class TestAccountRetrieveView:
     view = AccountRetrieveView
@@ -60,6 +136,7 @@ class TestAccountRetrieveView:
         assert "detail" in response.data
         assert response.data["detail"].code == "permission_denied"
 
+    @pytest.mark.query_budget(3, duplicates=0)
     def test_admin_request_with_valid_data(
         self,
         admin_api_client,
@@ -70,16 +147,57 @@ class TestAccountRetrieveView:
         # 200: request succeeded
         assert response.status_code == 200
 
+    def test_update_changes_etag(self, admin_api_client):
+        view_url = self.view_url()
+        client = admin_api_client
+        etag = client.get(view_url)["ETag"]
+        response = client.get(view_url, HTTP_IF_NONE_MATCH=etag)
+        # 304: not modified
+        assert response.status_code == 304
+
+        serializer = AccountSerializer(
+            AccountSerializer.Meta.model.objects.get(pk=1),
+            data={"first_name": "Changed"},
+            partial=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        response = client.get(view_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.data["first_name"] == "Changed"
+
     def test_admin_request_with_non_existent_user_data(self, admin_api_client):
         view_url = self.view_url(2)
         client = admin_api_client
         response = client.get(view_url)
         # 404: requested item is not found
         assert response.status_code == 404
+        assert "ETag" not in response
         # response contains errors
         assert "detail" in response.data
         assert response.data["detail"].code == "not_found"
 
+    def test_soft_deleted_account_has_no_etag(
+        self, admin_api_client, django_user_model, regular_user_data
+    ):
+        user = django_user_model.objects.create_user(**regular_user_data)
+        view_url = self.view_url(user.pk)
+        client = admin_api_client
+        assert client.get(view_url)["ETag"]
+
+        soft_delete_accounts([user.pk])
+        user.refresh_from_db()
+        response = client.get(view_url)
+        # 404: requested item is not found
+        assert response.status_code == 404
+        assert "ETag" not in response
+        assert "Last-Modified" not in response
+        # Validators of the deleted account don't turn into 304 Not Modified
+        response = client.get(
+            view_url, HTTP_IF_NONE_MATCH=f'"{user.pk}-{user.version}"'
+        )
+        assert response.status_code == 404
+
 
 class TestAccountListView:
     view = AccountListView
@@ -115,8 +233,188 @@ class TestAccountListView:
         response = client.get(view_url)
         # 200: request succeeded
         assert response.status_code == 200
-        assert isinstance(response.data, list)
-        assert len(response.data) == 1
+        assert isinstance(response.data["results"], list)
+        assert len(response.data["results"]) == 1
+        assert response.data["next"] is None
+        assert "count" not in response.data
+
+    @pytest.mark.query_budget(2, duplicates=0)
+    def test_pages_follow_cursors(
+        self, admin_api_client, django_user_model, django_assert_num_queries
+    ):
+        django_user_model.objects.bulk_create(
+            django_user_model(username=f"user{index}") for index in range(5)
+        )
+        client = admin_api_client
+        url = f"{self.view_url()}?page_size=2"
+        ids = []
+        while url:
+            # Authentication and the page, no COUNT(*)
+            with django_assert_num_queries(2):
+                response = client.get(url)
+            assert response.status_code == 200
+            assert len(response.data["results"]) <= 2
+            ids += [account["id"] for account in response.data["results"]]
+            url = response.data["next"]
+        assert len(ids) == 6
+        assert ids == sorted(ids)
+
+    def test_count_on_request(self, admin_api_client):
+        view_url = self.view_url()
+        client = admin_api_client
+        response = client.get(view_url, {"with_count": "true"})
+        assert response.status_code == 200
+        assert response.data["count"] == 1
+
+    @pytest.fixture
+    def accounts(self, django_user_model):
+        return django_user_model.objects.bulk_create(
+            [
+                django_user_model(
+                    username="jane.roe",
+                    first_name="Jane",
+                    last_name="Roe",
+                    email="jane@corp.example",
+                    last_login="2022-11-01T10:00:00Z",
+                ),
+                django_user_model(
+                    username="jack",
+                    first_name="Jack",
+                    last_name="Doe",
+                    email="jack.doe@Corp.example",
+                    is_active=False,
+                ),
+                django_user_model(
+                    username="zoe",
+                    first_name="Zoë",
+                    last_name="Smith",
+                    email="zoe@other.example",
+                    last_login="2022-12-01T10:00:00Z",
+                ),
+            ]
+        )
+
+    def usernames(self, response):
+        assert response.status_code == 200
+        return sorted(account["username"] for account in response.data["results"])
+
+    @pytest.mark.query_budget(2, duplicates=0)
+    def test_filters(self, admin_api_client, accounts):
+        view_url = self.view_url()
+        client = admin_api_client
+        response = client.get(view_url, {"is_active": "false"})
+        assert self.usernames(response) == ["jack"]
+        response = client.get(view_url, {"email_domain": "CORP.example"})
+        assert self.usernames(response) == ["jack", "jane.roe"]
+        response = client.get(
+            view_url,
+            {
+                "last_login_after": "2022-10-01T00:00:00Z",
+                "last_login_before": "2022-12-01T10:00:00Z",
+            },
+        )
+        assert self.usernames(response) == ["jane.roe"]
+
+    def test_invalid_filter(self, admin_api_client):
+        view_url = self.view_url()
+        client = admin_api_client
+        response = client.get(view_url, {"last_login_after": "yesterday"})
+        # 400: bad request
+        assert response.status_code == 400
+        assert "last_login_after" in response.data
+
+    @pytest.mark.parametrize("backend", ["prefix", "fts5"])
+    def test_search(self, settings, admin_api_client, accounts, backend):
+        settings.ACCOUNT_SEARCH_BACKEND = backend
+        view_url = self.view_url()
+        client = admin_api_client
+        response = client.get(view_url, {"search": "ja"})
+        assert self.usernames(response) == ["jack", "jane.roe"]
+        # Every term matches the prefix of a field
+        response = client.get(view_url, {"search": "JA ro"})
+        assert self.usernames(response) == ["jane.roe"]
+        response = client.get(view_url, {"search": "zoë"})
+        assert self.usernames(response) == ["zoe"]
+        response = client.get(view_url, {"search": 'oe"*'})
+        assert self.usernames(response) == []
+
+    def test_admin_search(self, client, django_user_model, accounts):
+        superuser = django_user_model.objects.create_superuser(
+            username="root", email="root@example.com", password="password"
+        )
+        client.force_login(superuser)
+        response = client.get("/admin/account/user/", {"q": "smi"})
+        assert response.status_code == 200
+        assert [user.username for user in response.context["cl"].result_list] == [
+            "zoe"
+        ]
+
+
+class TestAccountExportView:
+    view = AccountExportView
+
+    def view_url(self):
+        return reverse_lazy(self.view.name)
+
+    def content(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_authentication_required(self, client):
+        view_url = self.view_url()
+        response = client.get(view_url)
+        # 401: unauthorized request
+        assert response.status_code == 401
+
+    def test_authenticated_regular_user_has_no_permission(self, user_api_client):
+        view_url = self.view_url()
+        client = user_api_client
+        response = client.get(view_url)
+        # 403: request is forbidden
+        assert response.status_code == 403
+
+    def test_ndjson_matches_account_serializer(
+        self, settings, admin_api_client, django_user_model, django_assert_num_queries
+    ):
+        settings.ACCOUNT_EXPORT = {"CHUNK_SIZE": 2}
+        django_user_model.objects.bulk_create(
+            django_user_model(username=f"user{index}") for index in range(4)
+        )
+        django_user_model.objects.filter(username="user0").update(
+            last_login="2022-12-01T10:00:00Z"
+        )
+        client = admin_api_client
+        # Authentication and a single query for all the accounts
+        with django_assert_num_queries(2):
+            response = client.get(self.view_url())
+            content = self.content(response)
+        assert response.status_code == 200
+        assert response.streaming
+        assert response["Content-Type"] == "application/x-ndjson"
+        expected = AccountPreviewSerializer(
+            django_user_model.objects.order_by("id"), many=True
+        ).data
+        assert [json.loads(line) for line in content.splitlines()] == expected
+
+    def test_csv_with_field_projection(self, admin_api_client, admin_user_data):
+        client = admin_api_client
+        response = client.get(
+            self.view_url(), {"format": "csv", "fields": "username,is_staff,last_login"}
+        )
+        assert response.status_code == 200
+        assert response["Content-Type"] == "text/csv; charset=utf-8"
+        assert 'filename="accounts.csv"' in response["Content-Disposition"]
+        rows = list(csv.reader(io.StringIO(self.content(response))))
+        assert rows == [
+            ["username", "is_staff", "last_login"],
+            [admin_user_data["username"], "true", ""],
+        ]
+
+    def test_unknown_field(self, admin_api_client):
+        client = admin_api_client
+        response = client.get(self.view_url(), {"fields": "username,password"})
+        # 400: bad request
+        assert response.status_code == 400
+        assert response.data["fields"][0].code == "invalid_fields"
 
 
 class TestAccountCreateView:
@@ -154,6 +452,7 @@ class TestAccountCreateView:
         assert "detail" in response.data
         assert response.data["detail"].code == "permission_denied"
 
+    @pytest.mark.query_budget(3)
     def test_superuser_request_with_valid_data(
         self, regular_user_data, super_api_client
     ):
@@ -179,6 +478,215 @@ class TestAccountCreateView:
         assert "detail" in response.data
         assert response.data["detail"].code == "invalid_password"
 
+    def test_password_is_hashed_in_hashing_pool(
+        self, settings, regular_user_data, super_api_client, django_user_model
+    ):
+        settings.PASSWORD_HASHING_POOL = {
+            **settings.PASSWORD_HASHING_POOL,
+            "ENABLED": True,
+            "MAX_WORKERS": 1,
+        }
+        view_url = self.view_url()
+        client = super_api_client
+        response = client.post(view_url, regular_user_data)
+        assert response.status_code == 201
+        user = django_user_model.objects.get(pk=response.data["id"])
+        assert user.check_password(regular_user_data["password"])
+
+
+class TestAccountBulkCreateView:
+    view = AccountBulkCreateView
+
+    def view_url(self):
+        return reverse_lazy(self.view.name)
+
+    def accounts(self, *usernames):
+        return [
+            {
+                "username": username,
+                "first_name": "Bulk",
+                "last_name": "User",
+                "email": f"{username}@example.com",
+                "password": "super_secret_password",
+            }
+            for username in usernames
+        ]
+
+    def test_authenticated_admin_user_has_no_permission(self, admin_api_client):
+        view_url = self.view_url()
+        client = admin_api_client
+        response = client.post(view_url, self.accounts("jane"), format="json")
+        # 403: forbidden request
+        assert response.status_code == 403
+
+    @pytest.mark.query_budget(5, duplicates=0)
+    def test_superuser_request_with_valid_data(
+        self, super_api_client, django_user_model, django_assert_max_num_queries
+    ):
+        view_url = self.view_url()
+        client = super_api_client
+        # Authentication, the username check and the insert
+        with django_assert_max_num_queries(5):
+            response = client.post(
+                view_url, self.accounts("jane", "jack"), format="json"
+            )
+        # 201: request items created
+        assert response.status_code == 201
+        assert response.data["created"] == 2
+        assert [result["account"]["username"] for result in response.data["results"]] == [
+            "jane",
+            "jack",
+        ]
+        jane = django_user_model.objects.get(username="jane")
+        assert response.data["results"][0]["account"]["id"] == jane.pk
+        assert jane.check_password("super_secret_password")
+
+    def test_atomic_request_creates_nothing_on_errors(
+        self, super_api_client, django_user_model, super_user_data
+    ):
+        view_url = self.view_url()
+        client = super_api_client
+        accounts = self.accounts("jane", super_user_data["username"], "jack", "jane")
+        accounts[2]["password"] = "password"
+        response = client.post(view_url, accounts, format="json")
+        # 400: bad request
+        assert response.status_code == 400
+        assert response.data["created"] == 0
+        statuses = [result["status"] for result in response.data["results"]]
+        assert statuses == ["skipped", "failed", "failed", "failed"]
+        assert "username" in response.data["results"][1]["errors"]
+        assert response.data["results"][2]["errors"]["password"][0].code == (
+            "invalid_password"
+        )
+        assert "username" in response.data["results"][3]["errors"]
+        assert not django_user_model.objects.filter(username="jane").exists()
+
+    def test_best_effort_ndjson_request(self, super_api_client, django_user_model):
+        view_url = f"{self.view_url()}?mode=best_effort"
+        client = super_api_client
+        accounts = self.accounts("jane", "jack")
+        accounts[1]["email"] = "not an email"
+        body = "\n".join(json.dumps(account) for account in accounts)
+        response = client.post(
+            view_url, body, content_type="application/x-ndjson"
+        )
+        # 207: some of the items were created
+        assert response.status_code == 207
+        assert [result["status"] for result in response.data["results"]] == [
+            "created",
+            "failed",
+        ]
+        assert "email" in response.data["results"][1]["errors"]
+        assert django_user_model.objects.filter(username="jane").exists()
+
+    def test_password_hashing_pool(
+        self, settings, super_api_client, django_user_model
+    ):
+        settings.PASSWORD_HASHING_POOL = {
+            **settings.PASSWORD_HASHING_POOL,
+            "ENABLED": True,
+            "MAX_WORKERS": 2,
+        }
+        view_url = self.view_url()
+        client = super_api_client
+        response = client.post(view_url, self.accounts("jane", "jack"), format="json")
+        assert response.status_code == 201
+        user = django_user_model.objects.get(username="jack")
+        assert user.check_password("super_secret_password")
+
+
+class TestAccountBulkUpdateView:
+    view = AccountBulkUpdateView
+
+    def view_url(self):
+        return reverse_lazy(self.view.name)
+
+    @pytest.fixture
+    def accounts(self, django_user_model):
+        return django_user_model.objects.bulk_create(
+            django_user_model(username=f"user{index}", email=f"user{index}@old.example")
+            for index in range(3)
+        )
+
+    def test_authenticated_admin_user_has_no_permission(self, admin_api_client):
+        view_url = self.view_url()
+        client = admin_api_client
+        response = client.patch(
+            view_url, {"ids": [1], "changes": {"is_staff": True}}, format="json"
+        )
+        # 403: request is forbidden
+        assert response.status_code == 403
+
+    @pytest.mark.usefixtures("tokens_issued_earlier")
+    def test_deactivation_revokes_tokens(
+        self, settings, super_api_client, accounts, django_user_model
+    ):
+        settings.ACCOUNT_BULK = {**settings.ACCOUNT_BULK, "BATCH_SIZE": 1}
+        refresh_tokens = [RefreshToken.for_user(account) for account in accounts]
+        view_url = self.view_url()
+        client = super_api_client
+        ids = [account.pk for account in accounts[:2]]
+        response = client.patch(
+            view_url, {"ids": ids, "changes": {"is_active": False}}, format="json"
+        )
+        assert response.status_code == 200
+        assert response.data == {"updated": 2, "blacklisted_tokens": 2}
+        assert [is_token_revoked(token) for token in refresh_tokens] == [
+            True,
+            True,
+            False,
+        ]
+        deactivated = django_user_model.objects.filter(pk__in=ids)
+        assert all(not account.is_active for account in deactivated)
+        assert all(account.version == 1 for account in deactivated)
+        assert BlacklistedToken.objects.count() == 2
+
+    @pytest.mark.query_budget(6)
+    def test_email_domain_change_by_filter(
+        self, super_api_client, accounts, django_user_model
+    ):
+        view_url = self.view_url()
+        client = super_api_client
+        response = client.patch(
+            view_url,
+            {
+                "filter": {"email_domain": "old.example"},
+                "changes": {"email_domain": "new.example"},
+            },
+            format="json",
+        )
+        assert response.status_code == 200
+        assert response.data["updated"] == 3
+        assert sorted(
+            django_user_model.objects.filter(
+                email__endswith="@new.example"
+            ).values_list("username", flat=True)
+        ) == ["user0", "user1", "user2"]
+
+    def test_password_cannot_be_changed_in_bulk(self, super_api_client, accounts):
+        view_url = self.view_url()
+        client = super_api_client
+        response = client.patch(
+            view_url,
+            {"ids": [accounts[0].pk], "changes": {"password": "another_password"}},
+            format="json",
+        )
+        # 400: bad request
+        assert response.status_code == 400
+        assert "password" in response.data["changes"]
+
+    def test_accounts_selected_by_ids_or_filter(self, super_api_client, accounts):
+        view_url = self.view_url()
+        client = super_api_client
+        response = client.patch(
+            view_url,
+            {"ids": [1], "filter": {"is_staff": False}, "changes": {"is_staff": True}},
+            format="json",
+        )
+        # 400: bad request
+        assert response.status_code == 400
+        assert "non_field_errors" in response.data
+
 
 class TestAccountUpdateView:
     view = AccountUpdateView
@@ -272,6 +780,7 @@ class TestAccountDestroyView:
         assert "detail" in response.data
         assert response.data["detail"].code == "permission_denied"
 
+    @pytest.mark.query_budget(8)
     def test_superuser_request_with_valid_data(
         self, regular_user_data, super_api_client
     ):
@@ -281,6 +790,30 @@ class TestAccountDestroyView:
 
         assert response.status_code == 204
 
+    @pytest.mark.usefixtures("tokens_issued_earlier")
+    def test_soft_delete(
+        self, settings, super_api_client, django_user_model, regular_user_data
+    ):
+        settings.ACCOUNT_SOFT_DELETE = True
+        user = django_user_model.objects.create_user(**regular_user_data)
+        refresh = RefreshToken.for_user(user)
+        view_url = self.view_url(user.pk)
+        client = super_api_client
+        response = client.delete(view_url)
+        assert response.status_code == 204
+
+        user.refresh_from_db()
+        assert user.deleted_at is not None
+        assert not user.is_active
+        assert is_token_revoked(refresh)
+        # Soft deleted accounts are gone for the account views
+        response = client.get(reverse(AccountRetrieveView.name, kwargs={"pk": user.pk}))
+        assert response.status_code == 404
+        response = client.get(reverse(AccountListView.name))
+        assert user.pk not in [account["id"] for account in response.data["results"]]
+        response = client.delete(view_url)
+        assert response.status_code == 404
+
     def test_superuser_request_with_non_existent_user_data(self, super_api_client):
         view_url = self.view_url(2)
         client = super_api_client
@@ -290,3 +823,32 @@ class TestAccountDestroyView:
         # response contains errors
         assert "detail" in response.data
         assert response.data["detail"].code == "not_found"
+
+
+class TestAccountTokenRevocation:
+    @pytest.mark.usefixtures("tokens_issued_earlier")
+    def test_password_change_revokes_tokens(
+        self, super_api_client, django_user_model, regular_user_data
+    ):
+        user = django_user_model.objects.create_user(**regular_user_data)
+        refresh = RefreshToken.for_user(user)
+        view_url = reverse(AccountUpdateView.name, kwargs={"pk": user.pk})
+        client = super_api_client
+        response = client.put(
+            view_url, {**regular_user_data, "password": "another_secret_password"}
+        )
+        assert response.status_code == 200
+
+        user.refresh_from_db()
+        assert user.token_epoch is not None
+        assert is_token_revoked(refresh)
+        assert is_token_revoked(refresh.access_token)
+
+    @pytest.mark.usefixtures("tokens_issued_earlier")
+    def test_deactivation_revokes_tokens(self, django_user_model, regular_user_data):
+        user = django_user_model.objects.create_user(**regular_user_data)
+        refresh = RefreshToken.for_user(user)
+        serializer = AccountSerializer(user, data={"is_active": False}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        assert is_token_revoked(refresh)
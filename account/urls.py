@@ -1,7 +1,8 @@
 from django.urls import path
 
-from .views import (AccountCreateView, AccountDestroyView, AccountListView,
-                    AccountRetrieveView, AccountUpdateView,
+from .views import (AccountBulkCreateView, AccountBulkUpdateView,
+                    AccountCreateView, AccountDestroyView, AccountExportView,
+                    AccountListView, AccountRetrieveView, AccountUpdateView,
                     PersonalAccountView)
 
 urlpatterns = [
@@ -10,6 +11,19 @@ urlpatterns = [
     path(
         "management/create/", AccountCreateView.as_view(), name=AccountCreateView.name
     ),
+    path(
+        "management/bulk/create/",
+        AccountBulkCreateView.as_view(),
+        name=AccountBulkCreateView.name,
+    ),
+    path(
+        "management/bulk/update/",
+        AccountBulkUpdateView.as_view(),
+        name=AccountBulkUpdateView.name,
+    ),
+    path(
+        "management/export/", AccountExportView.as_view(), name=AccountExportView.name
+    ),
     path(
         "management/<int:pk>/",
         AccountRetrieveView.as_view(),
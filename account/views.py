@@ -1,55 +1,149 @@
-from drf_yasg.utils import swagger_auto_schema
+from functools import wraps
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import generics, status
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from auth.epochs import forget_token_epochs
+from auth.snapshots import get_user_snapshot, invalidate_user_snapshots
+from conf import docs
+from conf.docs import swagger_auto_schema
+from conf.parsers import FastJSONParser
+
+from .fastpath import ValuesSerializer
+from .filters import AccountFilterBackend
 from .models import User as AccountUser
+from .pagination import AccountCursorPagination
+from .parsers import NDJSONParser
 from .permissions import IsSuperUser
+from .renderers import CSVRenderer, NDJSONRenderer
 from .serializers import (
     AccountPreviewSerializer,
     AccountSerializer,
+    BulkAccountSerializer,
+    BulkAccountUpdateSerializer,
     PersonalAccountSerializer,
 )
+from .services import (
+    CREATED,
+    FAILED,
+    create_accounts,
+    soft_delete_accounts,
+    update_accounts,
+)
+
+
+def account_snapshot(request, pk=None):
+    """
+    Returns the cached snapshot (see ``auth.snapshots``) of the requested
+    account, or of the user's own account without ``pk``. Conditional GETs
+    are answered from its version without loading the row. Missing and soft
+    deleted accounts have no snapshot.
+    """
+    if not hasattr(request, "_account_snapshot"):
+        user_id = request.user.id if pk is None else pk
+        snapshot = get_user_snapshot(
+            user_id, timeout=settings.ACCOUNT_ETAG_CACHE_TIMEOUT
+        )
+        if snapshot is not None and snapshot.get("deleted_at") is not None:
+            snapshot = None
+        request._account_snapshot = snapshot
+    return request._account_snapshot
+
+
+def account_etag(request, pk=None):
+    snapshot = account_snapshot(request, pk)
+    if snapshot is None:
+        return None
+    user_id = request.user.id if pk is None else pk
+    return f'"{user_id}-{snapshot["version"]}"'
+
+
+def account_last_modified(request, pk=None):
+    snapshot = account_snapshot(request, pk)
+    if snapshot is None:
+        return None
+    return snapshot.get("updated_at")
+
+
+def conditional_account_view(view):
+    """
+    Sends ETag and Last-Modified, and answers matching If-None-Match and
+    If-Modified-Since headers with 304 Not Modified. Error responses don't
+    carry the validators.
+    """
+    conditional_view = condition(
+        etag_func=account_etag, last_modified_func=account_last_modified
+    )(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        if response.status_code >= 400:
+            del response["ETag"]
+            del response["Last-Modified"]
+        return response
+
+    return wrapper
+
+
+conditional_account = method_decorator(conditional_account_view)
 
 
 class PersonalAccountView(APIView):
     name = "personal_account"
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
     permission_classes = (IsAuthenticated,)
 
-    def get_object(self, request):
-        user_id = request.user.id
-        try:
-            return AccountUser.objects.get(pk=user_id)
-        except AccountUser.DoesNotExist:
+    def get_object(self, request, serializer):
+        queryset = AccountUser.objects.alive().filter(pk=request.user.id)
+        account = serializer.values(queryset).first()
+        if account is None:
             raise NotFound(detail="Account not found.", code="account_not_found")
+        return account
 
     @swagger_auto_schema(
         tags=["account"],
         operation_summary="Personal Account",
         operation_description="Shows account details of the logged in user",
     )
+    @conditional_account
     def get(self, request):
-        account = self.get_object(request)
-        serializer = PersonalAccountSerializer(account)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Same representation as PersonalAccountSerializer, without the model
+        serializer = ValuesSerializer(PersonalAccountSerializer)
+        account = self.get_object(request, serializer)
+        return Response(
+            serializer.to_representation(account), status=status.HTTP_200_OK
+        )
 
 
 class AccountRetrieveView(generics.RetrieveAPIView):
     name = "account_retrieve"
-    queryset = AccountUser.objects.all()
-    authentication_classes = (JWTAuthentication,)
+    queryset = AccountUser.objects.alive()
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
     permission_classes = (IsAdminUser,)
     serializer_class = AccountPreviewSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        serializer = ValuesSerializer(self.serializer_class)
+        queryset = serializer.values(self.get_queryset())
+        account = get_object_or_404(queryset, pk=kwargs[self.lookup_field])
+        return Response(serializer.to_representation(account))
+
     @swagger_auto_schema(
         tags=["account"],
         operation_summary="Retrieve Account by User ID",
         operation_description="Retrieves user account by user ID",
     )
+    @conditional_account
     def get(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
 
@@ -57,7 +151,7 @@ class AccountRetrieveView(generics.RetrieveAPIView):
 class AccountCreateView(generics.CreateAPIView):
     name = "account_create"
     queryset = AccountUser.objects.all()
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
     permission_classes = (IsSuperUser,)
     serializer_class = AccountSerializer
 
@@ -83,26 +177,215 @@ class AccountCreateView(generics.CreateAPIView):
         return self.create(request, *args, **kwargs)
 
 
+class AccountBulkCreateView(APIView):
+    """
+    Creates the accounts of a JSON array or an NDJSON stream in one request,
+    see ``account.services.create_accounts``.
+
+    ``?mode=atomic`` (the default) creates nothing unless every account is
+    valid, ``?mode=best_effort`` creates the valid ones.
+    """
+
+    name = "account_bulk_create"
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = (IsSuperUser,)
+    parser_classes = (FastJSONParser, NDJSONParser)
+    modes = ("atomic", "best_effort")
+
+    def get_items(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError(
+                {"non_field_errors": ["Expected a non-empty list of accounts."]},
+                code="invalid",
+            )
+        max_items = settings.ACCOUNT_BULK["MAX_ITEMS"]
+        if len(items) > max_items:
+            raise ValidationError(
+                {
+                    "non_field_errors": [
+                        f"Ensure there are no more than {max_items} accounts."
+                    ]
+                },
+                code="max_length",
+            )
+        return items
+
+    def get_mode(self, request):
+        mode = request.query_params.get("mode", self.modes[0])
+        if mode not in self.modes:
+            raise ValidationError(
+                {"mode": [f"Choose from: {', '.join(self.modes)}."]}, code="invalid"
+            )
+        return mode
+
+    @swagger_auto_schema(
+        tags=["account"],
+        operation_summary="Bulk Create Accounts",
+        operation_description="Creates user accounts from a JSON array or an "
+        "NDJSON stream (application/x-ndjson) and returns the result of each one. "
+        "?mode=atomic (default) creates all or none, ?mode=best_effort creates "
+        "the valid accounts",
+        request_body=BulkAccountSerializer(many=True),
+        manual_parameters=[
+            docs.Parameter(
+                "mode",
+                docs.IN_QUERY,
+                type=docs.TYPE_STRING,
+                enum=list(modes),
+            ),
+        ],
+    )
+    def post(self, request, *args, **kwargs):
+        mode = self.get_mode(request)
+        items = self.get_items(request)
+        results = create_accounts(items, atomic=mode == "atomic")
+        created = sum(result["status"] == CREATED for result in results)
+        if created == len(results):
+            response_status = status.HTTP_201_CREATED
+        elif not created:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+        data = {
+            "created": created,
+            "failed": sum(result["status"] == FAILED for result in results),
+            "results": results,
+        }
+        return Response(data, status=response_status)
+
+
+class AccountBulkUpdateView(APIView):
+    """
+    Changes the same fields of many accounts, selected by ID or by filter,
+    see ``account.services.update_accounts``.
+    """
+
+    name = "account_bulk_update"
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = (IsSuperUser,)
+
+    @swagger_auto_schema(
+        tags=["account"],
+        operation_summary="Bulk Update Accounts",
+        operation_description="Applies the same changes to the accounts with the "
+        "given IDs or matching the given filter. Deactivated accounts have their "
+        "tokens revoked",
+        request_body=BulkAccountUpdateSerializer,
+    )
+    def patch(self, request, *args, **kwargs):
+        serializer = BulkAccountUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        result = update_accounts(
+            data["changes"], ids=data.get("ids"), filters=data.get("filter")
+        )
+        return Response(result, status=status.HTTP_200_OK)
+
+
 class AccountListView(generics.ListAPIView):
     name = "account_list"
-    queryset = AccountUser.objects.all()
-    authentication_classes = (JWTAuthentication,)
+    queryset = AccountUser.objects.alive()
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
     permission_classes = (IsAdminUser,)
     serializer_class = AccountPreviewSerializer
+    pagination_class = AccountCursorPagination
+    filter_backends = (AccountFilterBackend,)
+
+    def list(self, request, *args, **kwargs):
+        # Pages of values() dicts, represented without building model instances
+        serializer = ValuesSerializer(self.serializer_class)
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(serializer.many(page))
 
     @swagger_auto_schema(
         tags=["account"],
         operation_summary="Accounts List",
-        operation_description="Displays a list of existing user accounts",
+        operation_description="Displays a page of existing user accounts, ordered by ID, "
+        "optionally filtered and searched by prefix",
     )
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
 
+class AccountExportView(APIView):
+    """
+    Streams every account, ordered by ID, as NDJSON or CSV.
+
+    The rows are read as tuples of the requested fields through a database
+    cursor, ``ACCOUNT_EXPORT["CHUNK_SIZE"]`` at a time, and rendered with the
+    field representations of ``AccountPreviewSerializer`` without building
+    model instances, so memory use doesn't grow with the table.
+    """
+
+    name = "account_export"
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (NDJSONRenderer, CSVRenderer)
+    serializer_class = AccountPreviewSerializer
+    fields_query_param = "fields"
+
+    def get_fields(self, request):
+        available = self.serializer_class.Meta.fields
+        requested = request.query_params.get(self.fields_query_param)
+        if not requested:
+            return list(available)
+        fields = [field.strip() for field in requested.split(",") if field.strip()]
+        unknown = [field for field in fields if field not in available]
+        if unknown or not fields:
+            raise ValidationError(
+                {
+                    self.fields_query_param: [
+                        f"Choose from: {', '.join(available)}.",
+                    ]
+                },
+                code="invalid_fields",
+            )
+        return list(dict.fromkeys(fields))
+
+    def get_rows(self, fields, chunk_size):
+        serializer = ValuesSerializer(self.serializer_class, fields)
+        queryset = serializer.values_list(AccountUser.objects.alive().order_by("id"))
+        for row in queryset.iterator(chunk_size=chunk_size):
+            yield serializer.convert_row(row)
+
+    @swagger_auto_schema(
+        tags=["account"],
+        operation_summary="Export Accounts",
+        operation_description="Streams all user accounts ordered by ID as NDJSON "
+        "(default) or CSV (?format=csv)",
+        manual_parameters=[
+            docs.Parameter(
+                "fields",
+                docs.IN_QUERY,
+                description="Comma separated subset of the account fields",
+                type=docs.TYPE_STRING,
+            ),
+        ],
+        responses={status.HTTP_200_OK: AccountPreviewSerializer},
+    )
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields(request)
+        chunk_size = settings.ACCOUNT_EXPORT["CHUNK_SIZE"]
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        response = StreamingHttpResponse(
+            renderer.stream(fields, self.get_rows(fields, chunk_size), chunk_size),
+            content_type=content_type,
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="accounts.{renderer.format}"'
+        return response
+
+
 class AccountUpdateView(generics.UpdateAPIView):
     name = "account_update"
-    queryset = AccountUser.objects.all()
-    authentication_classes = (JWTAuthentication,)
+    queryset = AccountUser.objects.alive()
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
     permission_classes = (IsSuperUser,)
     serializer_class = AccountSerializer
 
@@ -147,11 +430,21 @@ class AccountUpdateView(generics.UpdateAPIView):
 
 class AccountDestroyView(generics.DestroyAPIView):
     name = "account_destroy"
-    queryset = AccountUser.objects.all()
-    authentication_classes = (JWTAuthentication,)
+    queryset = AccountUser.objects.alive()
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
     permission_classes = (IsSuperUser,)
     serializer_class = AccountSerializer
 
+    def perform_destroy(self, instance):
+        if settings.ACCOUNT_SOFT_DELETE:
+            # The reaper deletes the account and its related rows later
+            soft_delete_accounts([instance.pk])
+            return
+        user_id = instance.pk
+        instance.delete()
+        invalidate_user_snapshots([user_id])
+        forget_token_epochs([user_id])
+
     @swagger_auto_schema(
         tags=["account"],
         operation_summary="Delete Account",
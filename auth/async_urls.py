@@ -0,0 +1,25 @@
+from django.urls import path
+
+from .async_views import (
+    AsyncLogoutAllView,
+    AsyncLogoutView,
+    AsyncTokenObtainPairView,
+    AsyncTokenRefreshView,
+    AsyncTokenVerificationView,
+)
+
+urlpatterns = [
+    path("token/", AsyncTokenObtainPairView.as_view(), name="async_token_obtain_pair"),
+    path("token/refresh/", AsyncTokenRefreshView.as_view(), name="async_token_refresh"),
+    path(
+        "token/verify/",
+        AsyncTokenVerificationView.as_view(),
+        name="async_token_verify",
+    ),
+    path("logout/", AsyncLogoutView.as_view(), name="async_logout_user"),
+    path(
+        "logout_all/",
+        AsyncLogoutAllView.as_view(),
+        name="async_logout_all_user_devices",
+    ),
+]
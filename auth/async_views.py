@@ -0,0 +1,234 @@
+"""
+Native async versions of the token views, for deployments served over ASGI.
+
+The views are plain Django views with async handlers, so a request doesn't
+hold a worker thread while it waits for the database or the cache. Queries
+go through Django's async ORM, password hashing and token signing run in
+the executor (or the hashing pool, see ``auth/hashing.py``) and stay off
+the event loop. Logins go through the ``AUTHENTICATION_BACKENDS``, see
+``auth.backends.aauthenticate()``. Requests and responses match the
+views in ``auth/views.py``.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, JsonResponse
+from django.utils.translation import gettext_lazy as _
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import UntypedToken
+
+from .backends import aauthenticate
+from .epochs import ais_token_revoked, arevoke_user_tokens
+from .metrics import TOKENS, TOKENS_REJECTED, token_rejected
+from .revocation import get_revocation_backend
+from .services import arecord_login
+from .throttling import LoginIPThrottle, LoginUsernameThrottle
+from .tokens import RefreshToken, ablacklist_token, averify_token, decode_token
+
+WWW_AUTHENTICATE = '{} realm="api"'.format(jwt_settings.AUTH_HEADER_TYPES[0])
+
+
+def _encode_tokens(refresh):
+    return {"refresh": str(refresh), "access": str(refresh.access_token)}
+
+
+def _encode_access_token(refresh):
+    return {"access": str(refresh.access_token)}
+
+
+# Signing doesn't touch the database, any thread will do
+encode_tokens = sync_to_async(_encode_tokens, thread_sensitive=False)
+encode_access_token = sync_to_async(_encode_access_token, thread_sensitive=False)
+
+
+class AsyncAPIView(View):
+    """
+    Base class of the async token views: parses JSON or form bodies,
+    authenticates with the configured authentication classes when
+    ``authentication_required`` is set, and renders API exceptions the way
+    DRF does.
+    """
+
+    authentication_required = False
+    required_fields = ()
+    throttle_classes = ()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Token requests aren't cookie based, like DRF views
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if self.authentication_required:
+                request.user, request.auth = await self.authenticate(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+    async def authenticate(self, request):
+        for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+            authenticator = authentication_class()
+            if hasattr(authenticator, "aauthenticate"):
+                result = await authenticator.aauthenticate(request)
+            else:
+                result = await sync_to_async(authenticator.authenticate)(request)
+            if result is not None:
+                return result
+        raise exceptions.NotAuthenticated()
+
+    def handle_exception(self, exc):
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+        response = JsonResponse(data, status=exc.status_code, safe=False)
+        if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+            response["WWW-Authenticate"] = WWW_AUTHENTICATE
+        if getattr(exc, "wait", None):
+            response["Retry-After"] = "%d" % exc.wait
+        return response
+
+    def _check_throttles(self, request):
+        waits = []
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request, self):
+                waits.append(throttle.wait())
+        if waits:
+            raise exceptions.Throttled(max(waits))
+
+    async def check_throttles(self, request):
+        # The counters may live in a remote cache
+        await sync_to_async(self._check_throttles, thread_sensitive=False)(request)
+
+    def get_data(self, request):
+        if request.content_type == "application/json":
+            try:
+                data = json.loads(request.body or b"{}")
+            except ValueError as exc:
+                raise exceptions.ParseError(f"JSON parse error - {exc}")
+            if not isinstance(data, dict):
+                raise exceptions.ParseError()
+        else:
+            data = request.POST
+
+        errors = {}
+        for field in self.required_fields:
+            value = data.get(field)
+            if value is None:
+                errors[field] = [_("This field is required.")]
+            elif not isinstance(value, str) or not value.strip():
+                errors[field] = [_("This field may not be blank.")]
+        if errors:
+            raise exceptions.ValidationError(errors)
+        return data
+
+    async def decode_refresh_token(self, raw_token):
+        try:
+            refresh = await sync_to_async(decode_token, thread_sensitive=False)(
+                RefreshToken, raw_token
+            )
+            await averify_token(refresh)
+        except TokenError as exc:
+            token_rejected(exc)
+            raise InvalidToken(exc.args[0])
+        return refresh
+
+
+class AsyncTokenObtainPairView(AsyncAPIView):
+    required_fields = ("username", "password")
+    throttle_classes = (LoginIPThrottle, LoginUsernameThrottle)
+
+    async def post(self, request):
+        # Like DRF's Request.data, read by the throttles
+        request.data = data = self.get_data(request)
+        await self.check_throttles(request)
+        user_model = get_user_model()
+        user = await aauthenticate(
+            request,
+            **{
+                user_model.USERNAME_FIELD: data["username"],
+                "password": data["password"],
+            },
+        )
+        # Like simplejwt's serializer, for backends that accept inactive users
+        if user is not None and user.is_active:
+            if jwt_settings.UPDATE_LAST_LOGIN:
+                await arecord_login(user)
+            refresh = await sync_to_async(RefreshToken.for_user)(user)
+            return JsonResponse(await encode_tokens(refresh))
+
+        raise exceptions.AuthenticationFailed(
+            _("No active account found with the given credentials"),
+            "no_active_account",
+        )
+
+
+class AsyncTokenRefreshView(AsyncAPIView):
+    required_fields = ("refresh",)
+
+    async def post(self, request):
+        refresh = await self.decode_refresh_token(self.get_data(request)["refresh"])
+        TOKENS.inc(event="refreshed")
+        if not jwt_settings.ROTATE_REFRESH_TOKENS:
+            return JsonResponse(await encode_access_token(refresh))
+
+        if jwt_settings.BLACKLIST_AFTER_ROTATION:
+            await ablacklist_token(refresh)
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        return JsonResponse(await encode_tokens(refresh))
+
+
+class AsyncTokenVerificationView(AsyncAPIView):
+    authentication_required = True
+    required_fields = ("token",)
+
+    async def post(self, request):
+        raw_token = self.get_data(request)["token"]
+        try:
+            token = await sync_to_async(UntypedToken, thread_sensitive=False)(raw_token)
+        except TokenError as exc:
+            token_rejected(exc)
+            raise InvalidToken(exc.args[0])
+
+        if await ais_token_revoked(token):
+            TOKENS_REJECTED.inc(reason="token_revoked")
+            raise exceptions.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [_("Token has been revoked")]}
+            )
+        jti = token.get(jwt_settings.JTI_CLAIM)
+        if await get_revocation_backend().ais_revoked(jti):
+            TOKENS_REJECTED.inc(reason="token_blacklisted")
+            raise exceptions.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [_("Token is blacklisted")]}
+            )
+        TOKENS.inc(event="verified")
+        return JsonResponse({})
+
+
+class AsyncLogoutView(AsyncAPIView):
+    authentication_required = True
+    required_fields = ("refresh",)
+
+    async def post(self, request):
+        refresh = await self.decode_refresh_token(self.get_data(request)["refresh"])
+        await ablacklist_token(refresh)
+        return JsonResponse({})
+
+
+class AsyncLogoutAllView(AsyncAPIView):
+    authentication_required = True
+
+    async def get(self, request):
+        await arevoke_user_tokens([request.user.id])
+        return HttpResponse(status=status.HTTP_205_RESET_CONTENT)
@@ -0,0 +1,165 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .epochs import is_token_revoked
+from .metrics import token_rejected
+from .snapshots import get_user_snapshot
+from .tokens import VERSION_CLAIM
+
+
+class RevocableJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that also rejects tokens issued before the user's
+    token epoch.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+
+        # The user row is already loaded, so the epoch is checked without the cache
+        if user.token_epoch is not None and is_token_revoked(
+            validated_token, user.token_epoch
+        ):
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+
+        return user
+
+    def authenticate(self, request):
+        try:
+            return super().authenticate(request)
+        except AuthenticationFailed as exc:
+            token_rejected(exc)
+            raise
+
+    async def aauthenticate(self, request):
+        """
+        Async version of ``authenticate()`` for views served under ASGI. The
+        token is validated in the calling thread, only the user lookup awaits.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        try:
+            validated_token = self.get_validated_token(raw_token)
+            return await self.aget_user(validated_token), validated_token
+        except AuthenticationFailed as exc:
+            token_rejected(exc)
+            raise
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = await self.user_model.objects.aget(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if user.token_epoch is not None and is_token_revoked(
+            validated_token, user.token_epoch
+        ):
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+
+        return user
+
+
+class ClaimsUser(TokenUser):
+    """
+    A stateless user built from the token claims. When a snapshot of the
+    account is available it takes precedence over the claims, which may have
+    been issued for an older version of the account.
+    """
+
+    def __init__(self, token, snapshot=None):
+        super().__init__(token)
+        self.snapshot = snapshot
+
+    def _value(self, name, default):
+        if self.snapshot is not None:
+            return self.snapshot[name]
+        return self.token.get(name, default)
+
+    @property
+    def username(self):
+        return self._value("username", "")
+
+    @property
+    def is_staff(self):
+        return self._value("is_staff", False)
+
+    @property
+    def is_superuser(self):
+        return self._value("is_superuser", False)
+
+
+class ClaimsJWTAuthentication(RevocableJWTAuthentication):
+    """
+    JWT authentication that builds the request user from the signed token
+    claims instead of loading the user row on every request.
+
+    With ``CLAIMS_AUTHENTICATION["SNAPSHOT_TIMEOUT"]`` set, a cached snapshot
+    of the account is checked as well, so deactivated, deleted and changed
+    accounts are noticed within the timeout. Without it the claims are
+    trusted until the token expires, and only the cached token epoch is
+    checked. Tokens issued without authorization claims are authenticated
+    against the database.
+    """
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+
+        snapshot = None
+        if settings.CLAIMS_AUTHENTICATION["SNAPSHOT_TIMEOUT"]:
+            snapshot = get_user_snapshot(self._get_user_id(validated_token))
+            if snapshot is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            if not snapshot["is_active"]:
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            revoked = snapshot["token_epoch"] is not None and is_token_revoked(
+                validated_token, snapshot["token_epoch"]
+            )
+            if snapshot["version"] == validated_token[VERSION_CLAIM]:
+                # The claims are current, no need to consult the snapshot
+                snapshot = None
+        else:
+            revoked = is_token_revoked(validated_token)
+
+        if revoked:
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+
+        return ClaimsUser(validated_token, snapshot)
+
+    async def aget_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return await super().aget_user(validated_token)
+        # Snapshots and epochs are cached, the thread is only needed on a miss
+        return await sync_to_async(self.get_user)(validated_token)
+
+    def _get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
@@ -0,0 +1,109 @@
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_login_failed
+from django.core.exceptions import PermissionDenied
+
+from . import hashing
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ``ModelBackend`` that checks passwords in the hashing pool when it is
+    enabled, see ``auth/hashing.py``.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if hashing.get_hashing_executor() is None:
+            return super().authenticate(
+                request, username=username, password=password, **kwargs
+            )
+
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = user_model._default_manager.get_by_natural_key(username)
+        except user_model.DoesNotExist:
+            # Hash anyway, so unknown usernames take as long as wrong passwords
+            hashing.make_password(password)
+            return None
+
+        if not hashing.check_password(password, user.password):
+            return None
+        if hashing.must_update(user.password):
+            user.password = hashing.make_password(password)
+            user.save(update_fields=["password"])
+        if self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        """
+        Async version of ``authenticate()``, see ``aauthenticate()``. The
+        password is hashed in the executor or the hashing pool.
+        """
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await user_model._default_manager.aget(
+                **{user_model.USERNAME_FIELD: username}
+            )
+        except user_model.DoesNotExist:
+            # Hash anyway, so unknown usernames take as long as wrong passwords
+            await hashing.amake_password(password)
+            return None
+
+        if not await hashing.acheck_password(password, user.password):
+            return None
+        if hashing.must_update(user.password):
+            user.password = await hashing.amake_password(password)
+            await user_model._default_manager.filter(pk=user.pk).aupdate(
+                password=user.password
+            )
+        if self.user_can_authenticate(user):
+            return user
+        return None
+
+
+async def aauthenticate(request=None, **credentials):
+    """
+    Async version of ``django.contrib.auth.authenticate()``: tries the
+    ``AUTHENTICATION_BACKENDS`` in order, awaiting the ``aauthenticate()`` of
+    the backends that have one and running the others in a thread, and sends
+    ``user_login_failed`` if none of them accepts the credentials.
+    """
+    # The backend lookup and credential cleaning of authenticate()
+    for backend, backend_path in auth._get_backends(return_tuples=True):
+        try:
+            inspect.signature(backend.authenticate).bind(request, **credentials)
+        except TypeError:
+            # This backend doesn't accept these credentials as arguments
+            continue
+        try:
+            if hasattr(backend, "aauthenticate"):
+                user = await backend.aauthenticate(request, **credentials)
+            else:
+                user = await sync_to_async(backend.authenticate)(request, **credentials)
+        except PermissionDenied:
+            # This backend says to stop in our tracks
+            break
+        if user is None:
+            continue
+        user.backend = backend_path
+        return user
+
+    await sync_to_async(user_login_failed.send)(
+        sender=auth.__name__,
+        credentials=auth._clean_credentials(credentials),
+        request=request,
+    )
+    return None
@@ -0,0 +1,357 @@
+"""
+Worker-wide index of blacklisted token ids.
+
+The index is a Bloom filter kept in a snapshot file that every worker process
+maps into memory with ``MAP_SHARED``. A negative answer from the filter means
+the token is definitely not blacklisted, so only filter hits have to be
+confirmed with SQL.
+
+Tokens blacklisted on this host are added to the shared mapping right away
+(see ``account.apps``), tokens blacklisted elsewhere are picked up by the
+incremental refresh which reads ``BlacklistedToken`` rows by primary key.
+"""
+import fcntl
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models import Max
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"JWTBLIDX"
+FORMAT_VERSION = 1
+# magic, format version, hash count, bit count, item count, watermark, built at
+HEADER = struct.Struct("<8sIIQQQd")
+
+
+class BloomFilter:
+    """
+    A Bloom filter over a writable buffer, using double hashing of a single
+    BLAKE2b digest to derive the bit positions.
+    """
+
+    def __init__(self, buffer, bit_count, hash_count, offset=0):
+        self.buffer = buffer
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.offset = offset
+
+    @staticmethod
+    def optimal_size(capacity, error_rate):
+        """
+        Returns the ``(bit_count, hash_count)`` pair for the given capacity and
+        false positive rate.
+        """
+        capacity = max(int(capacity), 1)
+        bit_count = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        # Round up to whole 64 bit words
+        bit_count = max(64, (bit_count + 63) // 64 * 64)
+        hash_count = max(1, round(bit_count / capacity * math.log(2)))
+        return bit_count, hash_count
+
+    @staticmethod
+    def capacity_for(bit_count, error_rate):
+        """
+        Returns the number of items a filter of ``bit_count`` bits holds before
+        its false positive rate exceeds ``error_rate``.
+        """
+        return int(-bit_count * math.log(2) ** 2 / math.log(error_rate))
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.bit_count
+
+    def add(self, key):
+        buffer, offset = self.buffer, self.offset
+        for position in self._positions(key):
+            buffer[offset + (position >> 3)] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        buffer, offset = self.buffer, self.offset
+        for position in self._positions(key):
+            if not buffer[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class BlacklistIndex:
+    """
+    Shared Bloom filter snapshot of the blacklisted token ids.
+
+    Lookups never touch the database. The snapshot is refreshed incrementally
+    by whichever worker notices it is older than ``refresh_interval`` and is
+    rebuilt from the live (not yet expired) blacklist rows every
+    ``rebuild_interval`` seconds or when it runs over capacity.
+    """
+
+    def __init__(
+        self,
+        path,
+        capacity=1_000_000,
+        error_rate=0.001,
+        refresh_interval=30,
+        rebuild_interval=3600,
+        stat_interval=1,
+        lookback=1000,
+    ):
+        self.path = os.fspath(path)
+        self.lock_path = f"{self.path}.lock"
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.stat_interval = stat_interval
+        self.lookback = lookback
+
+        self._lock = threading.Lock()
+        self._mmap = None
+        self._filter = None
+        self._inode = None
+        self._checked_at = 0.0
+        self._refreshed_at = 0.0
+
+    # Lookups
+
+    def might_contain(self, jti):
+        """
+        Returns ``False`` if the token id is certainly not blacklisted. Returns
+        ``True`` if the token may be blacklisted or if the index is unusable,
+        in which case the caller must confirm with the database.
+        """
+        try:
+            self._ensure_fresh()
+            return jti in self._filter
+        except Exception:
+            logger.exception("Blacklist index lookup failed")
+            return True
+
+    def add(self, jti):
+        """
+        Adds a token id to the shared snapshot, visible to every worker that
+        maps the same file.
+        """
+        self.add_many([jti])
+
+    def add_many(self, jtis):
+        try:
+            self._ensure_fresh()
+            with self._file_lock():
+                added = 0
+                for jti in jtis:
+                    self._filter.add(jti)
+                    added += 1
+                self._write_header(count=self._header()[4] + added)
+        except Exception:
+            logger.exception("Unable to add tokens to the blacklist index")
+
+    # Maintenance
+
+    def refresh(self, force_rebuild=False):
+        """
+        Brings the snapshot up to date with the ``BlacklistedToken`` table.
+        Only rows past the snapshot watermark (minus ``lookback`` ids, to catch
+        transactions that committed out of order) are read.
+        """
+        with self._file_lock():
+            if self._map():
+                # A missing snapshot has just been built from scratch
+                self._refreshed_at = time.monotonic()
+                return
+            _, _, _, bit_count, count, watermark, built_at = self._header()
+            capacity = BloomFilter.capacity_for(bit_count, self.error_rate)
+            max_id = BlacklistedToken.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+            if (
+                force_rebuild
+                or max_id < watermark
+                or count > capacity
+                or time.time() - built_at > self.rebuild_interval
+            ):
+                self._rebuild()
+            elif max_id > watermark:
+                rows = (
+                    BlacklistedToken.objects.filter(
+                        id__gt=max(watermark - self.lookback, 0)
+                    )
+                    .order_by("id")
+                    .values_list("id", "token__jti")
+                )
+                added = 0
+                for row_id, jti in rows.iterator(chunk_size=2000):
+                    self._filter.add(jti)
+                    if row_id > watermark:
+                        added += 1
+                self._write_header(count=count + added, watermark=max_id)
+        self._refreshed_at = time.monotonic()
+
+    def _rebuild(self):
+        live_rows = BlacklistedToken.objects.filter(
+            token__expires_at__gt=aware_utcnow()
+        )
+        live_count = live_rows.count()
+        capacity = max(self.capacity, live_count * 2)
+        bit_count, hash_count = BloomFilter.optimal_size(capacity, self.error_rate)
+        buffer = bytearray(HEADER.size + bit_count // 8)
+        bloom = BloomFilter(buffer, bit_count, hash_count, offset=HEADER.size)
+
+        watermark = 0
+        rows = live_rows.order_by("id").values_list("id", "token__jti")
+        for row_id, jti in rows.iterator(chunk_size=2000):
+            bloom.add(jti)
+            watermark = row_id
+        watermark = max(
+            watermark,
+            BlacklistedToken.objects.aggregate(max_id=Max("id"))["max_id"] or 0,
+        )
+        HEADER.pack_into(
+            buffer,
+            0,
+            MAGIC,
+            FORMAT_VERSION,
+            hash_count,
+            bit_count,
+            live_count,
+            watermark,
+            time.time(),
+        )
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as tmp_file:
+            tmp_file.write(buffer)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, self.path)
+        self._filter = None
+        self._map()
+
+    # Snapshot file handling
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._filter is None or now - self._checked_at >= self.stat_interval:
+            with self._lock:
+                if self._filter is None or not self._is_current():
+                    if not os.path.exists(self.path):
+                        self.refresh(force_rebuild=True)
+                    else:
+                        with self._file_lock():
+                            self._map()
+                self._checked_at = now
+        if now - self._refreshed_at >= self.refresh_interval:
+            with self._lock:
+                if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                    self.refresh()
+
+    def _is_current(self):
+        try:
+            return os.stat(self.path).st_ino == self._inode
+        except FileNotFoundError:
+            return False
+
+    def _map(self):
+        """
+        Maps the snapshot file, building it when missing or unreadable. Returns
+        ``True`` if the snapshot was rebuilt. Must be called with the file lock
+        held.
+        """
+        if self._filter is not None and self._is_current():
+            return False
+        if not os.path.exists(self.path):
+            self._rebuild()
+            return True
+
+        with open(self.path, "r+b") as snapshot_file:
+            mapping = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_WRITE)
+            inode = os.fstat(snapshot_file.fileno()).st_ino
+        magic, version, hash_count, bit_count = HEADER.unpack_from(mapping, 0)[:4]
+        if magic != MAGIC or version != FORMAT_VERSION:
+            mapping.close()
+            self._rebuild()
+            return True
+
+        old_mapping = self._mmap
+        self._mmap = mapping
+        self._inode = inode
+        self._filter = BloomFilter(mapping, bit_count, hash_count, offset=HEADER.size)
+        if old_mapping is not None:
+            old_mapping.close()
+        return False
+
+    def _header(self):
+        return HEADER.unpack_from(self._mmap, 0)
+
+    def _write_header(self, count=None, watermark=None):
+        header = list(self._header())
+        if count is not None:
+            header[4] = count
+        if watermark is not None:
+            header[5] = watermark
+        HEADER.pack_into(self._mmap, 0, *header)
+
+    def _file_lock(self):
+        return _FileLock(self.lock_path)
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "a")
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_blacklist_index():
+    """
+    Returns the process wide ``BlacklistIndex``, or ``None`` if the index is
+    disabled in ``settings.BLACKLIST_INDEX``.
+    """
+    global _index
+
+    config = settings.BLACKLIST_INDEX
+    if not config["ENABLED"]:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = BlacklistIndex(
+                    config["PATH"],
+                    capacity=config["CAPACITY"],
+                    error_rate=config["ERROR_RATE"],
+                    refresh_interval=config["REFRESH_INTERVAL"],
+                    rebuild_interval=config["REBUILD_INTERVAL"],
+                )
+    return _index
+
+
+@receiver(setting_changed)
+def reset_blacklist_index(*, setting, **kwargs):
+    global _index
+
+    if setting == "BLACKLIST_INDEX":
+        _index = None
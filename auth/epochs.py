@@ -0,0 +1,172 @@
+"""
+Per-user token epochs.
+
+Revoking every token of a user is a single update of ``User.token_epoch``:
+any token issued before the epoch is rejected. Tokens record their issue time
+to the microsecond in the ``ISSUED_AT_CLAIM`` claim, see ``auth.tokens``.
+Tokens without it only have ``iat``, in whole seconds, and are kept when
+issued in the second of the epoch, as they may have been issued right after
+it, e.g. by a login after logout-all. The epoch of a user is cached, so
+checking a token doesn't query the database.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from .snapshots import ainvalidate_user_snapshots, invalidate_user_snapshots
+
+# Issue time of a token as a POSIX timestamp with microseconds
+ISSUED_AT_CLAIM = "iat_us"
+CACHE_KEY = "account:token_epoch:{}"
+# Cached for users that never had their tokens revoked
+NO_EPOCH = 0
+# Cached for users that don't exist, whose tokens are all revoked
+NO_USER = -1
+
+
+def _cache_key(user_id):
+    return CACHE_KEY.format(user_id)
+
+
+def cache_token_epoch(user_id, epoch):
+    """
+    Stores the given ``datetime`` (or ``None``) as the user's cached epoch.
+    """
+    value = epoch.timestamp() if epoch is not None else NO_EPOCH
+    cache.set(_cache_key(user_id), value, settings.TOKEN_EPOCH_CACHE_TIMEOUT)
+
+
+def cache_token_epochs(user_ids, epoch):
+    """
+    Stores the given ``datetime`` as the cached epoch of every user.
+    """
+    cache.set_many(
+        {_cache_key(user_id): epoch.timestamp() for user_id in user_ids},
+        settings.TOKEN_EPOCH_CACHE_TIMEOUT,
+    )
+
+
+def _epoch_value(row):
+    # Cached value for a (token_epoch,) row, or for a missing user
+    if row is None:
+        return NO_USER
+    return row[0].timestamp() if row[0] is not None else NO_EPOCH
+
+
+def _epoch_from_value(value):
+    if value == NO_USER:
+        return float("inf")
+    return value or None
+
+
+def _epoch_query(user_id):
+    return get_user_model().objects.filter(pk=user_id).values_list("token_epoch")
+
+
+def get_token_epoch(user_id):
+    """
+    Returns the user's token epoch as a POSIX timestamp, or ``None`` if the
+    user's tokens were never revoked. The epoch of a user that doesn't exist
+    is infinitely far in the future.
+    """
+    key = _cache_key(user_id)
+    value = cache.get(key)
+    if value is None:
+        value = _epoch_value(_epoch_query(user_id).first())
+        cache.set(key, value, settings.TOKEN_EPOCH_CACHE_TIMEOUT)
+    return _epoch_from_value(value)
+
+
+async def aget_token_epoch(user_id):
+    """
+    Async version of ``get_token_epoch()``.
+    """
+    key = _cache_key(user_id)
+    value = await cache.aget(key)
+    if value is None:
+        value = _epoch_value(await _epoch_query(user_id).afirst())
+        await cache.aset(key, value, settings.TOKEN_EPOCH_CACHE_TIMEOUT)
+    return _epoch_from_value(value)
+
+
+def _issued_before(token, epoch):
+    if epoch is None:
+        return False
+    issued_at = token.get(ISSUED_AT_CLAIM)
+    if issued_at is None:
+        issued_at = token.get("iat")
+        if epoch != float("inf"):
+            # Compared at the resolution of "iat"
+            epoch = int(epoch)
+    # Tokens without an "iat" claim can't be proven to be newer
+    return issued_at is None or issued_at < epoch
+
+
+def is_token_revoked(token, epoch=None):
+    """
+    Returns ``True`` if the token was issued before its user's token epoch,
+    or before its second for tokens without ``ISSUED_AT_CLAIM``. ``epoch``
+    may be passed as a ``datetime`` when the user row is already at hand,
+    otherwise the cached epoch is used.
+    """
+    try:
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        return False
+
+    if epoch is not None:
+        return _issued_before(token, epoch.timestamp())
+    return _issued_before(token, get_token_epoch(user_id))
+
+
+async def ais_token_revoked(token):
+    """
+    Async version of ``is_token_revoked()`` that checks the cached epoch.
+    """
+    try:
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        return False
+
+    return _issued_before(token, await aget_token_epoch(user_id))
+
+
+def revoke_user_tokens(user_ids):
+    """
+    Revokes every token issued so far to the given users with a single
+    ``UPDATE``. Returns the number of users updated.
+    """
+    user_ids = list(user_ids)
+    epoch = aware_utcnow()
+    updated = get_user_model().objects.filter(pk__in=user_ids).update(token_epoch=epoch)
+    cache_token_epochs(user_ids, epoch)
+    invalidate_user_snapshots(user_ids)
+    return updated
+
+
+async def arevoke_user_tokens(user_ids):
+    """
+    Async version of ``revoke_user_tokens()``.
+    """
+    user_ids = list(user_ids)
+    epoch = aware_utcnow()
+    updated = (
+        await get_user_model()
+        .objects.filter(pk__in=user_ids)
+        .aupdate(token_epoch=epoch)
+    )
+    await cache.aset_many(
+        {_cache_key(user_id): epoch.timestamp() for user_id in user_ids},
+        settings.TOKEN_EPOCH_CACHE_TIMEOUT,
+    )
+    await ainvalidate_user_snapshots(user_ids)
+    return updated
+
+
+def forget_token_epochs(user_ids):
+    """
+    Drops the cached epochs of the given users, e.g. after deleting them.
+    """
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
@@ -0,0 +1,298 @@
+"""
+Password hashing in a bounded process pool.
+
+PBKDF2 keeps a CPU busy for the whole hash, so checking passwords inline lets
+a burst of logins pin every request worker. With
+``settings.PASSWORD_HASHING_POOL["ENABLED"]`` the hashes run in a pool of
+processes instead, and no more than ``MAX_WORKERS + MAX_PENDING`` hashes are
+accepted at a time. Beyond that, requests are rejected right away with
+``503 Service Unavailable`` instead of queueing behind the burst.
+
+The pool, its limits and its metrics are per request worker process.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# Number of recent hash latencies the percentiles are computed from
+LATENCY_SAMPLES = 1024
+
+
+class HashingPoolBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many password checks in progress, try again later.")
+    default_code = "hashing_pool_busy"
+    # Sent as the Retry-After header by DRF's exception handler
+    wait = 1
+
+
+def _initialize_worker():
+    # Pool processes that weren't forked from a configured process need the
+    # settings, which select the password hashers
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+class HashingExecutor:
+    """
+    A process pool that accepts at most ``max_workers + max_pending`` jobs at
+    a time and raises ``HashingPoolBusy`` for the rest.
+    """
+
+    def __init__(self, max_workers=None, max_pending=64, timeout=10, start_method=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.start_method = start_method
+
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+
+        self._metrics_lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    context = multiprocessing.get_context(self.start_method)
+                    self._executor = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=context,
+                        initializer=_initialize_worker,
+                    )
+        return self._executor
+
+    def submit(self, func, *args):
+        """
+        Schedules ``func(*args)`` in the pool and returns its future. Raises
+        ``HashingPoolBusy`` if the pool is saturated.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._metrics_lock:
+                self._rejected += 1
+            raise HashingPoolBusy()
+
+        with self._metrics_lock:
+            self._in_flight += 1
+        submitted_at = time.perf_counter()
+
+        def done(future):
+            self._slots.release()
+            with self._metrics_lock:
+                self._in_flight -= 1
+                if not future.cancelled():
+                    self._completed += 1
+                    self._latencies.append(time.perf_counter() - submitted_at)
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            with self._metrics_lock:
+                self._in_flight -= 1
+            raise
+        future.add_done_callback(done)
+        return future
+
+    def _timed_out_error(self, future):
+        future.cancel()
+        with self._metrics_lock:
+            self._timed_out += 1
+        return HashingPoolBusy()
+
+    def run(self, func, *args):
+        future = self.submit(func, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            raise self._timed_out_error(future) from None
+
+    def run_many(self, func, arguments):
+        """
+        Runs ``func(*args)`` for every tuple in ``arguments`` and returns the
+        results in order. At most ``max_workers`` of the jobs are in the pool
+        at a time, so a batch doesn't take the slots of concurrent requests.
+        """
+        results = [None] * len(arguments)
+        pending = collections.deque()
+
+        def collect():
+            index, future = pending.popleft()
+            try:
+                results[index] = future.result(timeout=self.timeout)
+            except concurrent.futures.TimeoutError:
+                raise self._timed_out_error(future) from None
+
+        try:
+            for index, args in enumerate(arguments):
+                if len(pending) >= self.max_workers:
+                    collect()
+                pending.append((index, self.submit(func, *args)))
+            while pending:
+                collect()
+        finally:
+            for _index, future in pending:
+                future.cancel()
+        return results
+
+    async def arun(self, func, *args):
+        future = self.submit(func, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out_error(future) from None
+
+    def metrics(self):
+        """
+        Returns the current queue depth and counters of the pool along with
+        the percentiles of the recent hash latencies (queueing included), in
+        milliseconds.
+        """
+        with self._metrics_lock:
+            in_flight = self._in_flight
+            latencies = sorted(self._latencies)
+            metrics = {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "in_flight": in_flight,
+                "queue_depth": max(in_flight - self.max_workers, 0),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+            }
+        for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            value = 0.0
+            if latencies:
+                value = latencies[
+                    min(len(latencies) - 1, int(fraction * len(latencies)))
+                ]
+            metrics[f"latency_{name}_ms"] = round(value * 1000, 3)
+        return metrics
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hashing_executor():
+    """
+    Returns the process wide ``HashingExecutor``, or ``None`` if hashing runs
+    inline, see ``settings.PASSWORD_HASHING_POOL``.
+    """
+    global _executor
+
+    config = settings.PASSWORD_HASHING_POOL
+    if not config["ENABLED"]:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = HashingExecutor(
+                    max_workers=config["MAX_WORKERS"],
+                    max_pending=config["MAX_PENDING"],
+                    timeout=config["TIMEOUT"],
+                    start_method=config["START_METHOD"],
+                )
+    return _executor
+
+
+@receiver(setting_changed)
+def reset_hashing_executor(*, setting, **kwargs):
+    global _executor
+
+    if setting == "PASSWORD_HASHING_POOL":
+        with _executor_lock:
+            if _executor is not None:
+                _executor.shutdown()
+            _executor = None
+
+
+def check_password(password, encoded):
+    """
+    ``django.contrib.auth.hashers.check_password()`` in the hashing pool, if
+    enabled. Upgrading outdated hashes is left to the caller, see
+    ``must_update()``.
+    """
+    executor = get_hashing_executor()
+    if executor is None:
+        return hashers.check_password(password, encoded)
+    return executor.run(hashers.check_password, password, encoded)
+
+
+def make_password(password):
+    executor = get_hashing_executor()
+    if executor is None:
+        return hashers.make_password(password)
+    return executor.run(hashers.make_password, password)
+
+
+def make_passwords(passwords):
+    """
+    Hashes every password in ``passwords``, in parallel in the hashing pool
+    if enabled, and returns the hashes in order.
+    """
+    executor = get_hashing_executor()
+    if executor is None:
+        return [hashers.make_password(password) for password in passwords]
+    return executor.run_many(
+        hashers.make_password, [(password,) for password in passwords]
+    )
+
+
+async def acheck_password(password, encoded):
+    executor = get_hashing_executor()
+    if executor is None:
+        return await sync_to_async(hashers.check_password, thread_sensitive=False)(
+            password, encoded
+        )
+    return await executor.arun(hashers.check_password, password, encoded)
+
+
+async def amake_password(password):
+    executor = get_hashing_executor()
+    if executor is None:
+        return await sync_to_async(hashers.make_password, thread_sensitive=False)(
+            password
+        )
+    return await executor.arun(hashers.make_password, password)
+
+
+def must_update(encoded):
+    """
+    Returns ``True`` if a correct password hashed as ``encoded`` should be
+    hashed again with the preferred hasher or its current parameters.
+    """
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = hashers.get_hasher("default")
+    return hasher.algorithm != preferred.algorithm or hasher.must_update(encoded)
@@ -0,0 +1,33 @@
+"""
+Token counters, served with the other metrics at /metrics, see
+``conf/metrics.py``.
+"""
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from conf.metrics import Counter
+
+TOKENS = Counter(
+    "auth_tokens_total",
+    "Tokens issued, refreshed, verified and blacklisted.",
+    ["event"],
+)
+TOKENS_REJECTED = Counter(
+    "auth_tokens_rejected_total",
+    "Tokens rejected, by reason.",
+    ["reason"],
+)
+
+
+def token_rejected(exc):
+    """
+    Counts a token rejected with ``exc``, a ``TokenError`` or an
+    ``AuthenticationFailed``, by its code.
+    """
+    if isinstance(exc, TokenError):
+        reason = getattr(exc, "code", InvalidToken.default_code)
+    else:
+        reason = exc.get_codes()
+        if not isinstance(reason, str):
+            # simplejwt's InvalidToken carries the messages of every token class
+            reason = exc.default_code
+    TOKENS_REJECTED.inc(reason=reason)
@@ -0,0 +1,150 @@
+"""
+Batched removal of expired ``OutstandingToken`` and ``BlacklistedToken`` rows.
+
+The pruner walks ``OutstandingToken`` by primary key (keyset pagination), one
+window of ``batch_size`` ids at a time, and deletes the expired rows of each
+window in its own short transaction. Every batch is a primary key range scan
+of bounded size, whatever the share of expired rows, so the pruner can run
+next to live traffic on large tables.
+"""
+import time
+
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class PruneProgress:
+    def __init__(self, last_id=0):
+        self.last_id = last_id
+        self.scanned = 0
+        self.deleted = 0
+        self.batches = 0
+        self.finished = False
+        self.started_at = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def __str__(self):
+        return (
+            f"batches={self.batches} scanned={self.scanned} deleted={self.deleted} "
+            f"last_id={self.last_id} elapsed={self.elapsed:.1f}s"
+        )
+
+
+class TokenPruner:
+    """
+    Deletes expired tokens in batches until the table is exhausted or one of
+    the budgets runs out.
+
+    ``start_after`` resumes a previous run from the ``last_id`` it reported.
+    ``max_rows`` limits the number of deleted tokens and ``max_seconds`` the
+    run time, ``pause`` is slept between batches to leave room for live
+    traffic. ``on_batch`` is called with the ``PruneProgress`` after every
+    batch.
+    """
+
+    def __init__(
+        self,
+        batch_size=1000,
+        start_after=0,
+        max_rows=None,
+        max_seconds=None,
+        pause=0.0,
+        expired_before=None,
+        on_batch=None,
+    ):
+        self.batch_size = batch_size
+        self.start_after = start_after
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.pause = pause
+        self.expired_before = expired_before
+        self.on_batch = on_batch
+
+    def run(self):
+        progress = PruneProgress(last_id=self.start_after)
+        expired_before = self.expired_before or aware_utcnow()
+
+        while not self._budget_exhausted(progress):
+            window_size = self._window_size(progress)
+            window = list(
+                OutstandingToken.objects.filter(id__gt=progress.last_id)
+                .order_by("id")
+                .values_list("id", "expires_at")[:window_size]
+            )
+            if not window:
+                progress.finished = True
+                break
+
+            expired_ids = [
+                token_id
+                for token_id, expires_at in window
+                if expires_at <= expired_before
+            ]
+            if expired_ids:
+                progress.deleted += self.delete_tokens(expired_ids)
+            progress.scanned += len(window)
+            progress.last_id = window[-1][0]
+            progress.batches += 1
+            if self.on_batch is not None:
+                self.on_batch(progress)
+
+            # A window shortened by the row budget may still be full
+            if len(window) < window_size:
+                progress.finished = True
+                break
+            if self.pause:
+                time.sleep(self.pause)
+
+        return progress
+
+    @staticmethod
+    def delete_tokens(token_ids):
+        """
+        Deletes the given outstanding tokens and their blacklist entries in
+        one short transaction. Returns the number of outstanding tokens
+        deleted.
+        """
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=token_ids).delete()
+            _, deleted = OutstandingToken.objects.filter(id__in=token_ids).delete()
+        return deleted.get(OutstandingToken._meta.label, 0)
+
+    def _window_size(self, progress):
+        if self.max_rows is None:
+            return self.batch_size
+        # Never scan a window that could delete more than the row budget allows
+        return max(1, min(self.batch_size, self.max_rows - progress.deleted))
+
+    def _budget_exhausted(self, progress):
+        if self.max_rows is not None and progress.deleted >= self.max_rows:
+            return True
+        if self.max_seconds is not None and progress.elapsed >= self.max_seconds:
+            return True
+        return False
+
+
+def delete_user_tokens(user_ids, batch_size=1000):
+    """
+    Deletes the outstanding tokens of the given users and their blacklist
+    entries, ``batch_size`` tokens at a time by primary key, each batch in its
+    own short transaction. Returns the number of outstanding tokens deleted.
+    """
+    deleted = 0
+    last_id = 0
+    while True:
+        token_ids = list(
+            OutstandingToken.objects.filter(user_id__in=user_ids, id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not token_ids:
+            return deleted
+        deleted += TokenPruner.delete_tokens(token_ids)
+        last_id = token_ids[-1]
@@ -0,0 +1,167 @@
+"""
+Pluggable storage for revoked (blacklisted) tokens.
+
+The backend is chosen with ``settings.TOKEN_REVOCATION_BACKEND``:
+
+* ``ORMRevocationBackend`` keeps using the ``token_blacklist`` tables, with
+  the worker-wide blacklist index in front of them.
+* ``CacheRevocationBackend`` stores revoked token ids in a Django cache with
+  a timeout equal to the remaining token lifetime, so entries expire on their
+  own and lookups never reach the primary database.
+* ``LocMemRevocationBackend`` keeps revoked token ids in process memory and is
+  meant for tests.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .blacklist import get_blacklist_index
+
+
+class BaseRevocationBackend:
+    # Whether refresh tokens have to be recorded as OutstandingToken rows
+    tracks_outstanding_tokens = False
+
+    def __init__(self, **options):
+        self.options = options
+
+    def is_revoked(self, jti):
+        """
+        Returns ``True`` if the token with the given id has been revoked.
+        """
+        raise NotImplementedError()
+
+    def revoke(self, jti, expires_at, user_id=None, token=None):
+        """
+        Revokes the token with the given id until ``expires_at`` (a POSIX
+        timestamp, the token's "exp" claim). ``token`` is the encoded token.
+        """
+        raise NotImplementedError()
+
+    async def ais_revoked(self, jti):
+        return await sync_to_async(self.is_revoked)(jti)
+
+    async def arevoke(self, jti, expires_at, user_id=None, token=None):
+        await sync_to_async(self.revoke)(jti, expires_at, user_id=user_id, token=token)
+
+    @staticmethod
+    def remaining_lifetime(expires_at):
+        return max(int(expires_at - time.time()), 1)
+
+
+class ORMRevocationBackend(BaseRevocationBackend):
+    # The async methods run the sync ones in a thread: the index may have to
+    # refresh itself from the database, and Django's async ORM would run the
+    # queries in the same thread anyway.
+    tracks_outstanding_tokens = True
+
+    def is_revoked(self, jti):
+        index = get_blacklist_index()
+        # Only tokens the index can't rule out are looked up in the database
+        if index is not None and not index.might_contain(jti):
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def revoke(self, jti, expires_at, user_id=None, token=None):
+        outstanding_token, _ = OutstandingToken.objects.get_or_create(
+            jti=jti,
+            defaults={
+                "user_id": user_id,
+                "token": token or "",
+                "expires_at": datetime_from_epoch(expires_at),
+            },
+        )
+        BlacklistedToken.objects.get_or_create(token=outstanding_token)
+
+
+class CacheRevocationBackend(BaseRevocationBackend):
+    """
+    Options: ``CACHE_ALIAS`` (default ``"default"``) and ``KEY_PREFIX``.
+    """
+
+    def __init__(self, CACHE_ALIAS="default", KEY_PREFIX="revoked_token:", **options):
+        super().__init__(**options)
+        self.cache_alias = CACHE_ALIAS
+        self.key_prefix = KEY_PREFIX
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def is_revoked(self, jti):
+        return self.cache.get(f"{self.key_prefix}{jti}") is not None
+
+    def revoke(self, jti, expires_at, user_id=None, token=None):
+        self.cache.set(
+            f"{self.key_prefix}{jti}", 1, self.remaining_lifetime(expires_at)
+        )
+
+    async def ais_revoked(self, jti):
+        return await self.cache.aget(f"{self.key_prefix}{jti}") is not None
+
+    async def arevoke(self, jti, expires_at, user_id=None, token=None):
+        await self.cache.aset(
+            f"{self.key_prefix}{jti}", 1, self.remaining_lifetime(expires_at)
+        )
+
+
+class LocMemRevocationBackend(BaseRevocationBackend):
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def is_revoked(self, jti):
+        with self._lock:
+            expires_at = self._revoked.get(jti)
+            if expires_at is not None and expires_at <= time.time():
+                del self._revoked[jti]
+                return False
+            return expires_at is not None
+
+    def revoke(self, jti, expires_at, user_id=None, token=None):
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    # Nothing here blocks, so the async methods don't need a thread
+
+    async def ais_revoked(self, jti):
+        return self.is_revoked(jti)
+
+    async def arevoke(self, jti, expires_at, user_id=None, token=None):
+        self.revoke(jti, expires_at, user_id=user_id, token=token)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_revocation_backend():
+    global _backend
+
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = settings.TOKEN_REVOCATION_BACKEND
+                backend_class = import_string(config["BACKEND"])
+                _backend = backend_class(**config.get("OPTIONS", {}))
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_revocation_backend(*, setting, **kwargs):
+    global _backend
+
+    if setting == "TOKEN_REVOCATION_BACKEND":
+        _backend = None
@@ -1,8 +1,20 @@
-from django.conf import settings
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import (
+    TokenBlacklistSerializer,
+    TokenObtainPairSerializer,
+    TokenObtainSerializer,
+    TokenRefreshSerializer,
+)
 from rest_framework_simplejwt.settings import api_settings
-from rest_framework_simplejwt.tokens import BlacklistedToken, UntypedToken
+from rest_framework_simplejwt.tokens import UntypedToken
+
+from .epochs import is_token_revoked
+from .metrics import TOKENS, TOKENS_REJECTED, token_rejected
+from .revocation import get_revocation_backend
+from .services import record_login
+from .tokens import RefreshToken
 
 
 class TokenObtainPairResponseSerializer(serializers.Serializer):
@@ -26,17 +38,66 @@ class TokenRefreshResponseSerializer(serializers.Serializer):
         raise NotImplementedError()
 
 
-class TokenVerificationSerializer(serializers.Serializer):
-    token = serializers.CharField()
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        # Authenticates the user. The login is recorded before the tokens
+        # are issued, so that they carry the new account version.
+        data = TokenObtainSerializer.validate(self, attrs)
+        if api_settings.UPDATE_LAST_LOGIN:
+            record_login(self.user)
+
+        refresh = self.get_token(self.user)
+        data["refresh"] = str(refresh)
+        data["access"] = str(refresh.access_token)
+        return data
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RefreshToken
 
     def validate(self, attrs):
-        token = UntypedToken(attrs["token"])
+        try:
+            data = super().validate(attrs)
+        except TokenError as exc:
+            token_rejected(exc)
+            raise
+        TOKENS.inc(event="refreshed")
+        return data
 
-        if "rest_framework_simplejwt.token_blacklist" in settings.INSTALLED_APPS:
-            jti = token.get(api_settings.JTI_CLAIM)
-            if BlacklistedToken.objects.filter(token__jti=jti).exists():
-                raise ValidationError("Token is blacklisted")
 
+class RevocableTokenBlacklistSerializer(TokenBlacklistSerializer):
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        try:
+            return super().validate(attrs)
+        except TokenError as exc:
+            token_rejected(exc)
+            raise
+
+
+class TokenVerificationSerializer(serializers.Serializer):
+    token = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            token = UntypedToken(attrs["token"])
+        except TokenError as exc:
+            token_rejected(exc)
+            raise
+
+        if is_token_revoked(token):
+            TOKENS_REJECTED.inc(reason="token_revoked")
+            raise ValidationError("Token has been revoked")
+
+        jti = token.get(api_settings.JTI_CLAIM)
+        if get_revocation_backend().is_revoked(jti):
+            TOKENS_REJECTED.inc(reason="token_blacklisted")
+            raise ValidationError("Token is blacklisted")
+
+        TOKENS.inc(event="verified")
         return {}
 
 
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.constants import OnConflict
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from .blacklist import get_blacklist_index
+from .metrics import TOKENS
+from .snapshots import ainvalidate_user_snapshots, invalidate_user_snapshots
+
+
+def blacklist_user_tokens(user_ids):
+    """
+    Blacklists every unexpired refresh token of the given users.
+
+    The missing blacklist rows are written by a single ``INSERT ... SELECT``,
+    so the number of queries doesn't depend on the number of tokens. Rows
+    that already exist, including ones inserted by a concurrent logout, are
+    skipped by the database. Returns the number of tokens blacklisted.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+
+    now = aware_utcnow()
+    ops = connection.ops
+    outstanding_table = ops.quote_name(OutstandingToken._meta.db_table)
+    blacklisted_table = ops.quote_name(BlacklistedToken._meta.db_table)
+    user_placeholders = ", ".join(["%s"] * len(user_ids))
+    sql = (
+        f"{ops.insert_statement(on_conflict=OnConflict.IGNORE)} {blacklisted_table} "
+        f"({ops.quote_name('token_id')}, {ops.quote_name('blacklisted_at')}) "
+        f"SELECT o.{ops.quote_name('id')}, %s FROM {outstanding_table} o "
+        f"WHERE o.{ops.quote_name('user_id')} IN ({user_placeholders}) "
+        f"AND o.{ops.quote_name('expires_at')} > %s "
+        f"AND NOT EXISTS (SELECT 1 FROM {blacklisted_table} b "
+        f"WHERE b.{ops.quote_name('token_id')} = o.{ops.quote_name('id')}) "
+        f"{ops.on_conflict_suffix_sql([], OnConflict.IGNORE, [], [])}"
+    )
+    timestamp = ops.adapt_datetimefield_value(now)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [timestamp, *user_ids, timestamp])
+            blacklisted = cursor.rowcount
+
+        index = get_blacklist_index()
+        if index is not None and blacklisted:
+            # Tokens issued by a concurrent login after the INSERT are still
+            # valid, so the index only has to learn about the blacklisted ones
+            index.add_many(
+                OutstandingToken.objects.filter(
+                    user_id__in=user_ids,
+                    expires_at__gt=now,
+                    blacklistedtoken__isnull=False,
+                )
+                .order_by()
+                .values_list("jti", flat=True)
+            )
+
+    if blacklisted:
+        TOKENS.inc(blacklisted, event="blacklisted")
+    return blacklisted
+
+
+def _login_update(user):
+    now = aware_utcnow()
+    user.last_login = user.updated_at = now
+    user.version += 1
+    return get_user_model().objects.filter(pk=user.pk), {
+        "last_login": now,
+        "updated_at": now,
+        "version": F("version") + 1,
+    }
+
+
+def record_login(user):
+    """
+    Stores the login time like ``update_last_login()`` and bumps the account
+    version in the same ``UPDATE``, so that cached representations of the
+    account, which show the last login, are refreshed.
+    """
+    queryset, values = _login_update(user)
+    queryset.update(**values)
+    invalidate_user_snapshots([user.pk])
+
+
+async def arecord_login(user):
+    """
+    Async version of ``record_login()``.
+    """
+    queryset, values = _login_update(user)
+    await queryset.aupdate(**values)
+    await ainvalidate_user_snapshots([user.pk])
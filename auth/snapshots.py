@@ -0,0 +1,54 @@
+"""
+Short-lived cached snapshots of the user fields needed for authorization.
+
+A snapshot records the account ``version`` it was taken from. Changing an
+account bumps its version and drops the snapshot, so tokens whose claims
+were issued for an older version are authorized from fresh data.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+CACHE_KEY = "account:user_snapshot:{}"
+SNAPSHOT_FIELDS = (
+    "username",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "token_epoch",
+    "version",
+    "updated_at",
+    "deleted_at",
+)
+# Cached for users that don't exist, so repeated lookups stay cheap
+MISSING = "missing"
+
+
+def _cache_key(user_id):
+    return CACHE_KEY.format(user_id)
+
+
+def get_user_snapshot(user_id, timeout=None):
+    """
+    Returns a dict of ``SNAPSHOT_FIELDS`` for the user, or ``None`` if the
+    user doesn't exist. The snapshot is cached for ``timeout`` seconds,
+    ``CLAIMS_AUTHENTICATION["SNAPSHOT_TIMEOUT"]`` by default.
+    """
+    if timeout is None:
+        timeout = settings.CLAIMS_AUTHENTICATION["SNAPSHOT_TIMEOUT"]
+    key = _cache_key(user_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = (
+            get_user_model().objects.filter(pk=user_id).values(*SNAPSHOT_FIELDS).first()
+        ) or MISSING
+        cache.set(key, snapshot, timeout)
+    return None if snapshot == MISSING else snapshot
+
+
+def invalidate_user_snapshots(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+async def ainvalidate_user_snapshots(user_ids):
+    await cache.adelete_many([_cache_key(user_id) for user_id in user_ids])
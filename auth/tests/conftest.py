@@ -0,0 +1,31 @@
+import pytest
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+@pytest.fixture()
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture()
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username="johndoe",
+        first_name="John",
+        last_name="Doe",
+        email="johndoe@example.com",
+        password="super_secret_password",
+    )
+
+
+@pytest.fixture
+def refresh_token(user):
+    return RefreshToken.for_user(user)
+
+
+@pytest.fixture
+def user_api_client(api_client, refresh_token):
+    client = api_client
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh_token.access_token}")
+    return client
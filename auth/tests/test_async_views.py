@@ -0,0 +1,231 @@
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.urls import reverse_lazy
+
+from account.models import User
+from auth.tokens import RefreshToken
+
+
+@pytest.fixture
+def revocation_backend(request, settings):
+    settings.TOKEN_REVOCATION_BACKEND = {"BACKEND": request.param, "OPTIONS": {}}
+
+
+BACKENDS = [
+    "auth.revocation.ORMRevocationBackend",
+    "auth.revocation.CacheRevocationBackend",
+    "auth.revocation.LocMemRevocationBackend",
+]
+
+
+class TestAsyncTokenObtainPairView:
+    view_url = reverse_lazy("async_token_obtain_pair")
+
+    def test_valid_credentials(self, api_client, user):
+        response = api_client.post(
+            self.view_url,
+            {"username": "johndoe", "password": "super_secret_password"},
+            format="json",
+        )
+        assert response.status_code == 200
+        refresh = RefreshToken(response.json()["refresh"])
+        assert refresh["user_id"] == user.pk
+        assert refresh["username"] == "johndoe"
+        assert User.objects.get(pk=user.pk).last_login is not None
+
+    @pytest.mark.parametrize(
+        "username, password",
+        [("johndoe", "wrong_password"), ("janedoe", "super_secret_password")],
+    )
+    def test_invalid_credentials(self, api_client, user, username, password):
+        data = {"username": username, "password": password}
+        response = api_client.post(self.view_url, data, format="json")
+        expected = api_client.post(
+            reverse_lazy("token_obtain_pair"), data, format="json"
+        )
+        assert response.status_code == expected.status_code == 401
+        assert response.json() == expected.json()
+
+    def test_failed_login_sends_signal(self, api_client, user):
+        failures = []
+
+        def record(sender, credentials, **kwargs):
+            failures.append(credentials)
+
+        user_login_failed.connect(record)
+        try:
+            data = {"username": "johndoe", "password": "wrong_password"}
+            response = api_client.post(self.view_url, data, format="json")
+        finally:
+            user_login_failed.disconnect(record)
+        assert response.status_code == 401
+        assert failures == [{"username": "johndoe", "password": "********************"}]
+
+    def test_authentication_backends(self, settings, api_client, user):
+        # Sync backends run in a thread
+        settings.AUTHENTICATION_BACKENDS = ["django.contrib.auth.backends.ModelBackend"]
+        data = {"username": "johndoe", "password": "super_secret_password"}
+        response = api_client.post(self.view_url, data, format="json")
+        assert response.status_code == 200
+
+        # Backends that don't take a username and password are skipped
+        settings.AUTHENTICATION_BACKENDS = [
+            "django.contrib.auth.backends.RemoteUserBackend"
+        ]
+        response = api_client.post(self.view_url, data, format="json")
+        assert response.status_code == 401
+
+    def test_outdated_hash_is_upgraded(self, settings, api_client, user):
+        settings.PASSWORD_HASHERS = [
+            *settings.PASSWORD_HASHERS,
+            "django.contrib.auth.hashers.MD5PasswordHasher",
+        ]
+        user.password = make_password("super_secret_password", hasher="md5")
+        user.save()
+        data = {"username": "johndoe", "password": "super_secret_password"}
+        response = api_client.post(self.view_url, data, format="json")
+        assert response.status_code == 200
+        user.refresh_from_db()
+        assert not user.password.startswith("md5$")
+
+    def test_inactive_user(self, api_client, user):
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        response = api_client.post(
+            self.view_url,
+            {"username": "johndoe", "password": "super_secret_password"},
+            format="json",
+        )
+        assert response.status_code == 401
+
+    def test_missing_fields(self, api_client):
+        data = {"username": ""}
+        response = api_client.post(self.view_url, data, format="json")
+        expected = api_client.post(
+            reverse_lazy("token_obtain_pair"), data, format="json"
+        )
+        assert response.status_code == expected.status_code == 400
+        assert response.json() == expected.json()
+
+    def test_form_data(self, api_client, user):
+        response = api_client.post(
+            self.view_url,
+            {"username": "johndoe", "password": "super_secret_password"},
+        )
+        assert response.status_code == 200
+
+
+class TestAsyncTokenRefreshView:
+    view_url = reverse_lazy("async_token_refresh")
+
+    def test_refresh(self, api_client, refresh_token):
+        response = api_client.post(
+            self.view_url, {"refresh": str(refresh_token)}, format="json"
+        )
+        assert response.status_code == 200
+        assert set(response.json()) == {"access"}
+
+    def test_invalid_token(self, api_client, refresh_token):
+        # Swapping the signature for the one of another token must be rejected
+        header, payload, _ = str(refresh_token).split(".")
+        forged = ".".join(
+            [header, payload, str(refresh_token.access_token).split(".")[2]]
+        )
+        response = api_client.post(self.view_url, {"refresh": forged}, format="json")
+        assert response.status_code == 401
+        assert response["WWW-Authenticate"] == 'Bearer realm="api"'
+
+    def test_access_token_is_rejected(self, api_client, refresh_token):
+        response = api_client.post(
+            self.view_url, {"refresh": str(refresh_token.access_token)}, format="json"
+        )
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Token has wrong type"
+
+    @pytest.mark.usefixtures("tokens_issued_earlier")
+    def test_revoked_token(self, user_api_client, refresh_token):
+        client = user_api_client
+        assert (
+            client.get(reverse_lazy("async_logout_all_user_devices")).status_code == 205
+        )
+        response = client.post(
+            self.view_url, {"refresh": str(refresh_token)}, format="json"
+        )
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Token has been revoked"
+
+
+class TestAsyncTokenVerificationView:
+    view_url = reverse_lazy("async_token_verify")
+
+    def test_authentication_required(self, api_client, refresh_token):
+        response = api_client.post(
+            self.view_url, {"token": str(refresh_token)}, format="json"
+        )
+        assert response.status_code == 401
+
+    def test_valid_token(self, user_api_client, refresh_token):
+        response = user_api_client.post(
+            self.view_url, {"token": str(refresh_token)}, format="json"
+        )
+        assert response.status_code == 200
+        assert response.json() == {}
+
+    def test_blacklisted_token(self, user_api_client, refresh_token):
+        refresh_token.blacklist()
+        response = user_api_client.post(
+            self.view_url, {"token": str(refresh_token)}, format="json"
+        )
+        assert response.status_code == 400
+        assert response.json() == {"non_field_errors": ["Token is blacklisted"]}
+
+
+class TestAsyncLogoutView:
+    view_url = reverse_lazy("async_logout_user")
+
+    @pytest.mark.parametrize("revocation_backend", BACKENDS, indirect=True)
+    def test_logout(self, revocation_backend, user_api_client, user):
+        refresh_token = RefreshToken.for_user(user)
+        data = {"refresh": str(refresh_token)}
+        response = user_api_client.post(self.view_url, data, format="json")
+        assert response.status_code == 200
+
+        # The token is blacklisted for the sync views as well
+        response = user_api_client.post(reverse_lazy("token_refresh"), data)
+        assert response.status_code == 401
+        response = user_api_client.post(self.view_url, data, format="json")
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Token is blacklisted"
+
+
+class TestAsyncLogoutAllView:
+    view_url = reverse_lazy("async_logout_all_user_devices")
+
+    def test_authentication_required(self, api_client):
+        assert api_client.get(self.view_url).status_code == 401
+
+    @pytest.mark.usefixtures("tokens_issued_earlier")
+    def test_issued_tokens_are_revoked(self, user_api_client, user):
+        client = user_api_client
+        response = client.get(self.view_url)
+        assert response.status_code == 205
+        assert User.objects.get(pk=user.pk).token_epoch is not None
+
+        response = client.get(self.view_url)
+        assert response.status_code == 401
+        assert response.json()["code"] == "token_revoked"
+
+    @pytest.mark.usefixtures("tokens_issued_earlier")
+    def test_claims_authentication(self, settings, user_api_client, user):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_AUTHENTICATION_CLASSES": (
+                "auth.authentication.ClaimsJWTAuthentication",
+            ),
+        }
+        client = user_api_client
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}"
+        )
+        assert client.get(self.view_url).status_code == 205
+        assert client.get(self.view_url).status_code == 401
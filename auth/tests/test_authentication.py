@@ -0,0 +1,122 @@
+import pytest
+from django.urls import reverse_lazy
+
+from account.serializers import AccountSerializer
+from account.views import AccountListView, PersonalAccountView
+from auth.authentication import ClaimsJWTAuthentication
+from auth.snapshots import invalidate_user_snapshots
+from auth.tokens import RefreshToken
+from conf.views import WelcomeView
+
+
+@pytest.fixture
+def claims_authentication(monkeypatch):
+    for view in (WelcomeView, AccountListView, PersonalAccountView):
+        monkeypatch.setattr(view, "authentication_classes", (ClaimsJWTAuthentication,))
+
+
+@pytest.fixture
+def claims_api_client(api_client, user):
+    client = api_client
+    refresh = RefreshToken.for_user(user)
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+    return client
+
+
+class TestTokenClaims:
+    def test_obtained_tokens_carry_authorization_claims(self, api_client, user):
+        response = api_client.post(
+            reverse_lazy("token_obtain_pair"),
+            {"username": "johndoe", "password": "super_secret_password"},
+        )
+        assert response.status_code == 200
+        refresh = RefreshToken(response.data["refresh"])
+        assert refresh["username"] == "johndoe"
+        assert refresh["is_staff"] is False
+        assert refresh["is_superuser"] is False
+        # The login bumped the version the claims were taken from
+        user.refresh_from_db()
+        assert user.version == 1
+        assert refresh["ver"] == user.version
+
+
+class TestClaimsJWTAuthentication:
+    def test_read_only_endpoint_runs_no_queries(
+        self, claims_authentication, claims_api_client, django_assert_num_queries
+    ):
+        client = claims_api_client
+        # The first request caches the account snapshot
+        assert client.get(reverse_lazy("api_welcome_view")).status_code == 200
+        with django_assert_num_queries(0):
+            response = client.get(reverse_lazy("api_welcome_view"))
+        assert response.status_code == 200
+
+    def test_claims_only_mode_runs_no_queries(
+        self,
+        settings,
+        claims_authentication,
+        claims_api_client,
+        django_assert_num_queries,
+    ):
+        settings.CLAIMS_AUTHENTICATION = {"SNAPSHOT_TIMEOUT": 0}
+        client = claims_api_client
+        assert client.get(reverse_lazy("api_welcome_view")).status_code == 200
+        with django_assert_num_queries(0):
+            response = client.get(reverse_lazy("api_welcome_view"))
+        assert response.status_code == 200
+
+    def test_admin_permission_uses_claims(
+        self, claims_authentication, api_client, django_user_model
+    ):
+        admin = django_user_model.objects.create_user(
+            username="admin", password="super_secret_password", is_staff=True
+        )
+        refresh = RefreshToken.for_user(admin)
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = api_client.get(reverse_lazy(AccountListView.name))
+        assert response.status_code == 200
+
+    def test_regular_user_has_no_admin_permission(
+        self, claims_authentication, claims_api_client
+    ):
+        response = claims_api_client.get(reverse_lazy(AccountListView.name))
+        assert response.status_code == 403
+
+    def test_personal_account_is_served(
+        self, claims_authentication, claims_api_client, user
+    ):
+        response = claims_api_client.get(reverse_lazy(PersonalAccountView.name))
+        assert response.status_code == 200
+        assert response.data["id"] == user.id
+
+    def test_account_update_invalidates_snapshot(
+        self, claims_authentication, claims_api_client, user
+    ):
+        client = claims_api_client
+        assert client.get(reverse_lazy("api_welcome_view")).status_code == 200
+
+        serializer = AccountSerializer(user, data={"is_active": False}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        assert user.version == 1
+
+        response = client.get(reverse_lazy("api_welcome_view"))
+        assert response.status_code == 401
+
+    def test_deleted_user_is_rejected(
+        self, claims_authentication, claims_api_client, user
+    ):
+        client = claims_api_client
+        assert client.get(reverse_lazy("api_welcome_view")).status_code == 200
+        user_id = user.id
+        user.delete()
+        invalidate_user_snapshots([user_id])
+        response = client.get(reverse_lazy("api_welcome_view"))
+        assert response.status_code == 401
+        assert response.data["code"] == "user_not_found"
+
+    def test_tokens_without_claims_are_checked_against_database(
+        self, claims_authentication, user_api_client
+    ):
+        response = user_api_client.get(reverse_lazy("api_welcome_view"))
+        assert response.status_code == 200
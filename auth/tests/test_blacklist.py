@@ -0,0 +1,84 @@
+from django.urls import reverse_lazy
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from auth.blacklist import BlacklistIndex, BloomFilter, get_blacklist_index
+
+
+class TestBloomFilter:
+    def test_added_keys_are_found(self):
+        bit_count, hash_count = BloomFilter.optimal_size(1000, 0.001)
+        bloom = BloomFilter(bytearray(bit_count // 8), bit_count, hash_count)
+        keys = [f"jti-{i}" for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        assert all(key in bloom for key in keys)
+
+    def test_false_positive_rate(self):
+        bit_count, hash_count = BloomFilter.optimal_size(1000, 0.01)
+        bloom = BloomFilter(bytearray(bit_count // 8), bit_count, hash_count)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        assert false_positives < 300
+
+
+class TestBlacklistIndex:
+    def test_blacklisted_token_is_in_index(self, refresh_token):
+        index = get_blacklist_index()
+        assert not index.might_contain(refresh_token["jti"])
+        refresh_token.blacklist()
+        assert index.might_contain(refresh_token["jti"])
+
+    def test_incremental_refresh_picks_up_rows(self, user, refresh_token):
+        index = get_blacklist_index()
+        index.refresh(force_rebuild=True)
+        other = RefreshToken.for_user(user)
+        token = OutstandingToken.objects.get(jti=refresh_token["jti"])
+        # Bulk inserts don't send signals, so only the refresh can see them
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token)])
+        assert not index.might_contain(refresh_token["jti"])
+        index.refresh()
+        assert index.might_contain(refresh_token["jti"])
+        assert not index.might_contain(other["jti"])
+
+    def test_index_is_shared_through_snapshot_file(self, settings, refresh_token):
+        index = get_blacklist_index()
+        index.refresh(force_rebuild=True)
+        other_worker = BlacklistIndex(settings.BLACKLIST_INDEX["PATH"])
+        assert not other_worker.might_contain(refresh_token["jti"])
+        index.add(refresh_token["jti"])
+        assert other_worker.might_contain(refresh_token["jti"])
+
+
+class TestTokenVerificationView:
+    view_url = reverse_lazy("token_verify")
+
+    def test_valid_token_skips_blacklist_query(
+        self, user_api_client, refresh_token, django_assert_num_queries
+    ):
+        client = user_api_client
+        get_blacklist_index().refresh(force_rebuild=True)
+        client.post(self.view_url, {"token": str(refresh_token)})
+        # Only the authentication query is left once the token epoch is cached
+        with django_assert_num_queries(1):
+            response = client.post(self.view_url, {"token": str(refresh_token)})
+        assert response.status_code == 200
+
+    def test_blacklisted_token_is_rejected(self, user_api_client, refresh_token):
+        client = user_api_client
+        refresh_token.blacklist()
+        response = client.post(self.view_url, {"token": str(refresh_token)})
+        assert response.status_code == 400
+
+    def test_disabled_index_falls_back_to_database(
+        self, settings, user_api_client, refresh_token
+    ):
+        settings.BLACKLIST_INDEX = {**settings.BLACKLIST_INDEX, "ENABLED": False}
+        client = user_api_client
+        refresh_token.blacklist()
+        response = client.post(self.view_url, {"token": str(refresh_token)})
+        assert response.status_code == 400
@@ -0,0 +1,50 @@
+import pytest
+from rest_framework_simplejwt.tokens import AccessToken
+
+from auth.epochs import (
+    ISSUED_AT_CLAIM,
+    get_token_epoch,
+    is_token_revoked,
+    revoke_user_tokens,
+)
+from auth.tokens import RefreshToken
+
+
+class TestTokenEpoch:
+    def test_tokens_are_valid_without_epoch(self, user, refresh_token):
+        assert get_token_epoch(user.id) is None
+        assert not is_token_revoked(refresh_token)
+
+    @pytest.mark.usefixtures("tokens_issued_earlier")
+    def test_tokens_issued_before_epoch_are_revoked(self, user, refresh_token):
+        assert revoke_user_tokens([user.id]) == 1
+        assert is_token_revoked(refresh_token)
+        assert is_token_revoked(refresh_token.access_token)
+
+    def test_tokens_issued_in_the_second_of_epoch(self, user):
+        refresh = RefreshToken.for_user(user)
+        assert ISSUED_AT_CLAIM in refresh.access_token
+        revoke_user_tokens([user.id])
+        # Compared to the microsecond, within the second of "iat"
+        assert is_token_revoked(refresh)
+        assert is_token_revoked(refresh.access_token)
+        assert not is_token_revoked(RefreshToken.for_user(user))
+
+        # Tokens without the claim are kept in the second of the epoch
+        legacy = AccessToken.for_user(user)
+        legacy["iat"] = int(get_token_epoch(user.id))
+        assert not is_token_revoked(legacy)
+
+    def test_tokens_issued_after_epoch_are_valid(self, user, refresh_token):
+        revoke_user_tokens([user.id])
+        token = AccessToken.for_user(user)
+        token["iat"] = int(get_token_epoch(user.id)) + 1
+        assert not is_token_revoked(token)
+
+    def test_epoch_lookup_is_cached(self, user, django_assert_num_queries):
+        revoke_user_tokens([user.id])
+        with django_assert_num_queries(0):
+            assert get_token_epoch(user.id) is not None
+
+    def test_tokens_without_user_are_not_revoked(self):
+        assert not is_token_revoked(AccessToken())
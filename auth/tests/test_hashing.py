@@ -0,0 +1,137 @@
+import time
+
+import pytest
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.urls import reverse_lazy
+
+from auth.hashing import HashingExecutor, HashingPoolBusy, get_hashing_executor
+
+
+@pytest.fixture
+def hashing_pool(settings):
+    settings.PASSWORD_HASHING_POOL = {
+        **settings.PASSWORD_HASHING_POOL,
+        "ENABLED": True,
+        "MAX_WORKERS": 1,
+        "MAX_PENDING": 0,
+    }
+    return get_hashing_executor()
+
+
+@pytest.fixture
+def credentials(user):
+    return {"username": "johndoe", "password": "super_secret_password"}
+
+
+class TestHashingExecutor:
+    def test_run(self):
+        executor = HashingExecutor(max_workers=1, max_pending=0)
+        try:
+            assert executor.run(pow, 2, 10) == 1024
+            metrics = executor.metrics()
+        finally:
+            executor.shutdown()
+        assert metrics["completed"] == 1
+        assert metrics["in_flight"] == 0
+        assert metrics["latency_p99_ms"] > 0
+
+    def test_saturated_pool_rejects(self):
+        executor = HashingExecutor(max_workers=1, max_pending=1)
+        try:
+            futures = [executor.submit(time.sleep, 0.5) for _ in range(2)]
+            assert executor.metrics()["queue_depth"] == 1
+            with pytest.raises(HashingPoolBusy):
+                executor.submit(time.sleep, 0)
+            assert executor.metrics()["rejected"] == 1
+
+            for future in futures:
+                future.result()
+            # Finished jobs free their slots
+            assert executor.run(pow, 2, 2) == 4
+        finally:
+            executor.shutdown()
+
+    def test_run_many_within_pool_size(self):
+        executor = HashingExecutor(max_workers=1, max_pending=0)
+        try:
+            # A single slot is enough as the jobs run one after another
+            assert executor.run_many(pow, [(2, n) for n in range(5)]) == [
+                1,
+                2,
+                4,
+                8,
+                16,
+            ]
+            assert executor.metrics()["completed"] == 5
+        finally:
+            executor.shutdown()
+
+    def test_timeout(self):
+        executor = HashingExecutor(max_workers=1, max_pending=0, timeout=0.1)
+        try:
+            with pytest.raises(HashingPoolBusy):
+                executor.run(time.sleep, 1)
+            assert executor.metrics()["timed_out"] == 1
+        finally:
+            executor.shutdown()
+
+
+class TestTokenObtainWithHashingPool:
+    view_url = reverse_lazy("token_obtain_pair")
+
+    def test_login(self, hashing_pool, api_client, credentials):
+        response = api_client.post(self.view_url, credentials)
+        assert response.status_code == 200
+        assert hashing_pool.metrics()["completed"] == 1
+
+        response = api_client.post(
+            self.view_url, {**credentials, "password": "wrong_password"}
+        )
+        assert response.status_code == 401
+
+    def test_outdated_hash_is_upgraded(self, hashing_pool, api_client, user):
+        hasher = PBKDF2PasswordHasher()
+        user.password = hasher.encode(
+            "super_secret_password", hasher.salt(), iterations=1000
+        )
+        user.save()
+        response = api_client.post(
+            self.view_url,
+            {"username": "johndoe", "password": "super_secret_password"},
+        )
+        assert response.status_code == 200
+        user.refresh_from_db()
+        assert hasher.decode(user.password)["iterations"] == hasher.iterations
+
+    @pytest.mark.parametrize(
+        "url",
+        [reverse_lazy("token_obtain_pair"), reverse_lazy("async_token_obtain_pair")],
+    )
+    def test_saturated_pool(self, hashing_pool, api_client, credentials, url):
+        busy = hashing_pool.submit(time.sleep, 1)
+        response = api_client.post(url, credentials, format="json")
+        busy.result()
+        assert response.status_code == 503
+        assert response["Retry-After"] == "1"
+
+
+class TestHashingMetricsView:
+    view_url = reverse_lazy("hashing_metrics")
+
+    def test_admin_required(self, user_api_client):
+        assert user_api_client.get(self.view_url).status_code == 403
+
+    def test_disabled(self, user_api_client, user):
+        user.is_staff = True
+        user.save()
+        response = user_api_client.get(self.view_url)
+        assert response.status_code == 200
+        assert response.data == {"enabled": False}
+
+    def test_metrics(self, hashing_pool, user_api_client, user):
+        user.is_staff = True
+        user.save()
+        response = user_api_client.get(self.view_url)
+        assert response.status_code == 200
+        assert response.data["enabled"] is True
+        assert response.data["queue_depth"] == 0
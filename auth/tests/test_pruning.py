@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from auth.pruning import TokenPruner
+
+
+@pytest.fixture
+def tokens(user):
+    """
+    Six outstanding tokens, every other one expired, the first two
+    blacklisted.
+    """
+    tokens = [RefreshToken.for_user(user) for _ in range(6)]
+    expired_jtis = [token["jti"] for token in tokens[::2]]
+    OutstandingToken.objects.filter(jti__in=expired_jtis).update(
+        expires_at=aware_utcnow() - timedelta(minutes=1)
+    )
+    for token in tokens[:2]:
+        token.blacklist()
+    return tokens
+
+
+class TestTokenPruner:
+    def test_expired_tokens_are_deleted(self, tokens):
+        progress = TokenPruner(batch_size=4).run()
+        assert progress.finished
+        assert progress.deleted == 3
+        assert progress.scanned == 6
+        assert OutstandingToken.objects.count() == 3
+        assert not OutstandingToken.objects.filter(
+            expires_at__lte=aware_utcnow()
+        ).exists()
+        # Only the blacklist entry of the live token is left
+        assert BlacklistedToken.objects.get().token.jti == tokens[1]["jti"]
+
+    def test_row_budget_stops_and_resumes(self, tokens):
+        progress = TokenPruner(batch_size=1, max_rows=2).run()
+        assert not progress.finished
+        assert progress.deleted == 2
+        assert OutstandingToken.objects.count() == 4
+
+        progress = TokenPruner(batch_size=1, start_after=progress.last_id).run()
+        assert progress.finished
+        assert progress.deleted == 1
+        assert OutstandingToken.objects.count() == 3
+
+    def test_row_budget_below_batch_size(self, tokens):
+        # The window shrinks to the budget, which doesn't end the pass
+        progress = TokenPruner(batch_size=4, max_rows=1).run()
+        assert not progress.finished
+        assert progress.deleted == 1
+        assert progress.scanned == 1
+        assert OutstandingToken.objects.count() == 5
+
+        progress = TokenPruner(batch_size=4, start_after=progress.last_id).run()
+        assert progress.finished
+        assert progress.deleted == 2
+        assert OutstandingToken.objects.count() == 3
+
+    def test_progress_is_reported_per_batch(self, tokens):
+        reports = []
+        TokenPruner(batch_size=2, on_batch=lambda p: reports.append(p.batches)).run()
+        assert reports == [1, 2, 3]
+
+
+class TestPruneTokensCommand:
+    def test_state_file_records_position(self, tokens, tmp_path):
+        state_file = tmp_path / "prune.state"
+        call_command("prune_tokens", batch_size=1, max_rows=1, state_file=state_file)
+        assert OutstandingToken.objects.count() == 5
+        assert int(state_file.read_text()) > 0
+
+        call_command("prune_tokens", state_file=state_file)
+        assert OutstandingToken.objects.count() == 3
+        # A finished pass starts over next time
+        assert state_file.read_text() == "0\n"
+
+    def test_row_budget_below_batch_size_resumes(self, tokens, tmp_path):
+        state_file = tmp_path / "prune.state"
+        call_command("prune_tokens", batch_size=4, max_rows=1, state_file=state_file)
+        assert OutstandingToken.objects.count() == 5
+        assert int(state_file.read_text()) > 0
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+from django.urls import reverse_lazy
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from auth.revocation import (
+    CacheRevocationBackend,
+    LocMemRevocationBackend,
+    ORMRevocationBackend,
+    get_revocation_backend,
+)
+from auth.tokens import RefreshToken
+
+BACKENDS = [
+    "auth.revocation.ORMRevocationBackend",
+    "auth.revocation.CacheRevocationBackend",
+    "auth.revocation.LocMemRevocationBackend",
+]
+
+
+@pytest.fixture(params=BACKENDS)
+def revocation_backend(request, settings):
+    settings.TOKEN_REVOCATION_BACKEND = {"BACKEND": request.param, "OPTIONS": {}}
+    return get_revocation_backend()
+
+
+class TestRevocationBackends:
+    def test_revoked_token_is_reported(self, revocation_backend, user):
+        token = RefreshToken.for_user(user)
+        assert not revocation_backend.is_revoked(token["jti"])
+        token.blacklist()
+        assert revocation_backend.is_revoked(token["jti"])
+
+    def test_backend_is_chosen_in_settings(self, revocation_backend):
+        backend_classes = (
+            ORMRevocationBackend,
+            CacheRevocationBackend,
+            LocMemRevocationBackend,
+        )
+        assert isinstance(revocation_backend, backend_classes)
+
+    def test_outstanding_tokens_are_only_tracked_for_orm(
+        self, revocation_backend, user
+    ):
+        RefreshToken.for_user(user)
+        assert OutstandingToken.objects.exists() == (
+            revocation_backend.tracks_outstanding_tokens
+        )
+
+    def test_logout_revokes_refresh_token(self, revocation_backend, api_client, user):
+        refresh = RefreshToken.for_user(user)
+        client = api_client
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = client.post(reverse_lazy("logout_user"), {"refresh": str(refresh)})
+        assert response.status_code == 200
+
+        response = client.post(reverse_lazy("token_verify"), {"token": str(refresh)})
+        assert response.status_code == 400
+
+        client.credentials()
+        response = client.post(reverse_lazy("token_refresh"), {"refresh": str(refresh)})
+        assert response.status_code == 401
+
+
+class TestExpiringBackends:
+    def test_cache_entry_lives_as_long_as_the_token(self):
+        backend = CacheRevocationBackend()
+        backend.revoke("jti", time.time() + 60)
+        assert backend.is_revoked("jti")
+        assert backend.remaining_lifetime(time.time() + 60) in (59, 60)
+
+    def test_locmem_entry_expires_with_the_token(self):
+        backend = LocMemRevocationBackend()
+        backend.revoke("jti", time.time() - 1)
+        assert not backend.is_revoked("jti")
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from auth.blacklist import get_blacklist_index
+from auth.services import blacklist_user_tokens
+
+# Savepoint, INSERT ... SELECT, blacklist index update and release
+BLACKLIST_QUERY_BUDGET = 4
+
+
+class TestBlacklistUserTokens:
+    def test_all_user_tokens_are_blacklisted(self, user, refresh_token):
+        tokens = [RefreshToken.for_user(user) for _ in range(3)]
+        assert blacklist_user_tokens([user.id]) == 4
+        for token in tokens:
+            assert BlacklistedToken.objects.filter(token__jti=token["jti"]).exists()
+            assert get_blacklist_index().might_contain(token["jti"])
+
+    def test_expired_tokens_are_skipped(self, user, refresh_token):
+        OutstandingToken.objects.filter(jti=refresh_token["jti"]).update(
+            expires_at=aware_utcnow() - timedelta(minutes=1)
+        )
+        assert blacklist_user_tokens([user.id]) == 0
+        assert not BlacklistedToken.objects.exists()
+
+    def test_repeated_blacklisting_is_idempotent(self, user, refresh_token):
+        assert blacklist_user_tokens([user.id]) == 1
+        assert blacklist_user_tokens([user.id]) == 0
+        assert BlacklistedToken.objects.count() == 1
+
+    def test_other_users_tokens_are_kept(self, user, django_user_model):
+        other_user = django_user_model.objects.create_user(
+            username="janedoe", password="super_secret_password"
+        )
+        other_token = RefreshToken.for_user(other_user)
+        blacklist_user_tokens([user.id])
+        assert not BlacklistedToken.objects.filter(
+            token__jti=other_token["jti"]
+        ).exists()
+
+    def test_query_count_does_not_depend_on_token_count(
+        self, user, refresh_token, django_assert_num_queries
+    ):
+        get_blacklist_index().refresh(force_rebuild=True)
+        with django_assert_num_queries(BLACKLIST_QUERY_BUDGET):
+            blacklist_user_tokens([user.id])
+
+        for _ in range(50):
+            RefreshToken.for_user(user)
+        with django_assert_num_queries(BLACKLIST_QUERY_BUDGET):
+            assert blacklist_user_tokens([user.id]) == 50
@@ -0,0 +1,118 @@
+from unittest import mock
+
+import pytest
+from django.urls import reverse_lazy
+
+from auth.throttling import LoginUsernameThrottle, SlidingWindowRateThrottle
+
+
+@pytest.fixture
+def throttle_rates(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": {"login_ip": "5/min", "login_username": "3/min"},
+    }
+
+
+@pytest.fixture
+def timer():
+    now = [6000.0]
+    with mock.patch.object(SlidingWindowRateThrottle, "timer", lambda self: now[0]):
+        yield now
+
+
+def login(client, url, username="johndoe", password="wrong_password", ip="10.0.0.1"):
+    return client.post(
+        url,
+        {"username": username, "password": password},
+        format="json",
+        REMOTE_ADDR=ip,
+    )
+
+
+@pytest.mark.parametrize(
+    "url", [reverse_lazy("token_obtain_pair"), reverse_lazy("async_token_obtain_pair")]
+)
+class TestLoginThrottling:
+    def test_username_limit(self, throttle_rates, timer, api_client, user, url):
+        for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+            assert login(api_client, url, ip=ip).status_code == 401
+
+        # Over the limit, even with the right password and from another IP
+        response = login(
+            api_client, url, password="super_secret_password", ip="10.0.0.4"
+        )
+        assert response.status_code == 429
+        assert int(response["Retry-After"]) == 60
+
+        # Other usernames are not affected
+        assert login(api_client, url, username="janedoe").status_code == 401
+
+    def test_ip_limit(self, throttle_rates, timer, api_client, db, url):
+        for index in range(5):
+            response = login(api_client, url, username=f"user{index}")
+            assert response.status_code == 401
+        assert login(api_client, url, username="user5").status_code == 429
+        assert login(api_client, url, ip="10.0.0.2").status_code == 401
+
+    def test_throttled_requests_skip_hashing(
+        self, throttle_rates, timer, api_client, user, url
+    ):
+        for _ in range(3):
+            login(api_client, url)
+        with mock.patch(
+            "django.contrib.auth.hashers.PBKDF2PasswordHasher.encode"
+        ) as encode:
+            assert login(api_client, url).status_code == 429
+        encode.assert_not_called()
+
+    def test_list_body(self, throttle_rates, timer, api_client, db, url):
+        response = api_client.post(url, [{"username": "johndoe"}], format="json")
+        # 400: the body is not an object
+        assert response.status_code == 400
+
+    def test_sliding_window(self, throttle_rates, timer, api_client, user, url):
+        for _ in range(3):
+            login(api_client, url)
+        # A quarter into the next window, the previous one counts 3 * 0.75
+        timer[0] += 75
+        assert login(api_client, url).status_code == 401
+        response = login(api_client, url)
+        assert response.status_code == 429
+        assert int(response["Retry-After"]) == 5
+        timer[0] += 6
+        assert login(api_client, url).status_code == 401
+
+
+class TestSlidingWindowRateThrottle:
+    def test_wait(self, throttle_rates, timer):
+        throttle = LoginUsernameThrottle()
+        request = mock.Mock(data={"username": "johndoe"})
+        for _ in range(3):
+            assert throttle.allow_request(request, None)
+        assert not throttle.allow_request(request, None)
+        assert throttle.wait() == 60
+
+        # 3 * (1 - 0.25) + 1 = 3.25, a third of the window has to pass
+        timer[0] += 75
+        assert throttle.allow_request(request, None)
+        assert not throttle.allow_request(request, None)
+        assert throttle.wait() == 5
+
+    def test_local_counters_fallback(self, throttle_rates, timer):
+        throttle = LoginUsernameThrottle()
+        request = mock.Mock(data={"username": "fallback"})
+        with mock.patch("auth.throttling.caches") as caches:
+            caches.__getitem__.side_effect = ConnectionError()
+            for _ in range(3):
+                assert throttle.allow_request(request, None)
+            assert not throttle.allow_request(request, None)
+
+    def test_disabled(self, settings, timer):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"login_username": None},
+        }
+        throttle = LoginUsernameThrottle()
+        request = mock.Mock(data={"username": "johndoe"})
+        assert all(throttle.allow_request(request, None) for _ in range(100))
@@ -0,0 +1,86 @@
+import pytest
+from django.urls import reverse_lazy
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from account.models import User
+from account.serializers import AccountSerializer
+
+# Authentication and the token epoch update
+LOGOUT_ALL_QUERY_BUDGET = 2
+
+
+class TestLogoutAllView:
+    view_url = reverse_lazy("logout_all_user_devices")
+
+    def test_authentication_required(self, api_client):
+        response = api_client.get(self.view_url)
+        # 401: unauthorized request
+        assert response.status_code == 401
+
+    def test_token_epoch_is_set(self, user_api_client, user):
+        client = user_api_client
+        response = client.get(self.view_url)
+        # 205: reset content
+        assert response.status_code == 205
+        assert User.objects.get(pk=user.pk).token_epoch is not None
+
+    @pytest.mark.usefixtures("tokens_issued_earlier")
+    def test_issued_tokens_are_revoked(self, user_api_client, user, refresh_token):
+        client = user_api_client
+        other_device = RefreshToken.for_user(user)
+        assert client.get(self.view_url).status_code == 205
+
+        # Access tokens are rejected by authentication
+        response = client.get(self.view_url)
+        assert response.status_code == 401
+        assert response.data["code"] == "token_revoked"
+
+        # Refresh tokens can't be refreshed any more
+        client.credentials()
+        for token in (refresh_token, other_device):
+            response = client.post(
+                reverse_lazy("token_refresh"), {"refresh": str(token)}
+            )
+            assert response.status_code == 401
+
+    def test_login_right_after_logout_all(self, api_client, user_api_client):
+        # "iat" is in whole seconds, tokens issued in the second of the token
+        # epoch are valid
+        for _ in range(5):
+            assert user_api_client.get(self.view_url).status_code == 205
+            response = api_client.post(
+                reverse_lazy("token_obtain_pair"),
+                {"username": "johndoe", "password": "super_secret_password"},
+            )
+            assert response.status_code == 200
+            user_api_client.credentials(
+                HTTP_AUTHORIZATION=f"Bearer {response.data['access']}"
+            )
+            assert (
+                user_api_client.get(reverse_lazy("api_welcome_view")).status_code == 200
+            )
+
+    def test_login_right_after_password_change(self, api_client, user):
+        for index in range(5):
+            password = f"new_secret_password_{index}"
+            AccountSerializer().update(user, {"password": password})
+            response = api_client.post(
+                reverse_lazy("token_obtain_pair"),
+                {"username": "johndoe", "password": password},
+            )
+            assert response.status_code == 200
+            api_client.credentials(
+                HTTP_AUTHORIZATION=f"Bearer {response.data['access']}"
+            )
+            assert api_client.get(reverse_lazy("api_welcome_view")).status_code == 200
+            api_client.credentials()
+
+    def test_query_count_does_not_depend_on_token_count(
+        self, user_api_client, user, django_assert_num_queries
+    ):
+        client = user_api_client
+        for _ in range(50):
+            RefreshToken.for_user(user)
+        with django_assert_num_queries(LOGOUT_ALL_QUERY_BUDGET):
+            response = client.get(self.view_url)
+        assert response.status_code == 205
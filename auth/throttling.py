@@ -0,0 +1,158 @@
+"""
+Login throttling, checked before the user lookup and the password hash.
+
+``SimpleRateThrottle`` keeps a list of request timestamps per key and rewrites
+it on every request. These throttles keep two integer counters per key
+instead, for the current and the previous fixed window, and estimate the
+requests in the sliding window ending now by weighting the previous count
+with its overlap. Counters are incremented atomically in the cache (shared by
+the workers when the cache is). If the cache fails, the counters are kept in
+process memory until it recovers.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections.abc import Mapping
+
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+
+class LocalCounters:
+    """
+    In-process fallback for the cache counters, with the same ``get_many()``
+    and ``incr()`` semantics.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: self._counters[key][0]
+                for key in keys
+                if key in self._counters and self._counters[key][1] > now
+            }
+
+    def incr(self, key, timeout):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._counters) > 10_000:
+                self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+            count, expires_at = self._counters.get(key, (0, now + timeout))
+            if expires_at <= now:
+                count, expires_at = 0, now + timeout
+            self._counters[key] = (count + 1, expires_at)
+            return count + 1
+
+
+local_counters = LocalCounters()
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    cache_alias = "default"
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    def get_rate(self):
+        # Read the rates on every instantiation, so they follow setting changes
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window, position = divmod(self.now, self.duration)
+        current_key = f"{self.key}:{int(window)}"
+        previous_key = f"{self.key}:{int(window) - 1}"
+        counts = self._get_counts([current_key, previous_key])
+        self.current = counts.get(current_key, 0)
+        self.previous = counts.get(previous_key, 0)
+        # Share of the window elapsed
+        self.elapsed = position / self.duration
+
+        if self.previous * (1 - self.elapsed) + self.current >= self.num_requests:
+            return self.throttle_failure()
+        self._incr(current_key)
+        return True
+
+    def wait(self):
+        """
+        Returns the seconds until the estimate drops below the limit, if no
+        further requests are allowed in the meantime.
+        """
+        if self.current < self.num_requests:
+            # The previous window's weight has to fall enough
+            share = 1 - (self.num_requests - self.current) / self.previous
+            return self._seconds(share - self.elapsed)
+        # The current window has to become the previous one first
+        share = 1 - self.num_requests / self.current
+        return self._seconds(1 - self.elapsed + share)
+
+    def _seconds(self, windows):
+        # Rounded first, so float error doesn't add a second
+        return max(math.ceil(round(windows * self.duration, 6)), 1)
+
+    def _get_counts(self, keys):
+        try:
+            return caches[self.cache_alias].get_many(keys)
+        except Exception:
+            logger.exception("Throttle counters unavailable, using local counters")
+            return local_counters.get_many(keys)
+
+    def _incr(self, key):
+        # Counters outlive their window, which is read as the previous one next
+        timeout = self.duration * 2
+        try:
+            cache = caches[self.cache_alias]
+            cache.add(key, 0, timeout)
+            return cache.incr(key)
+        except Exception:
+            logger.exception("Throttle counters unavailable, using local counters")
+            return local_counters.incr(key, timeout)
+
+
+class LoginIPThrottle(SlidingWindowRateThrottle):
+    """
+    Limits login attempts per client IP address (see ``NUM_PROXIES`` when
+    running behind a proxy).
+    """
+
+    scope = "login_ip"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident(request),
+        }
+
+
+class LoginUsernameThrottle(SlidingWindowRateThrottle):
+    """
+    Limits login attempts per username, whether or not the user exists.
+    """
+
+    scope = "login_username"
+
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, Mapping):
+            # Left to the serializer to reject
+            return None
+        username = request.data.get("username")
+        if not isinstance(username, str) or not username:
+            return None
+        # Hashed to bound the key length
+        ident = hashlib.sha256(username.strip().lower().encode()).hexdigest()[:32]
+        return self.cache_format % {"scope": self.scope, "ident": ident}
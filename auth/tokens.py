@@ -0,0 +1,112 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .epochs import ISSUED_AT_CLAIM, ais_token_revoked, is_token_revoked
+from .metrics import TOKENS
+from .revocation import get_revocation_backend
+
+# Account version the authorization claims of a token were taken from
+VERSION_CLAIM = "ver"
+AUTHORIZATION_CLAIMS = ("username", "is_staff", "is_superuser")
+
+
+class TokenRevoked(TokenError):
+    code = "token_revoked"
+
+
+class TokenBlacklisted(TokenError):
+    code = "token_blacklisted"
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    Refresh token that is no longer valid once its user's token epoch has
+    passed its issue time, which it records to the microsecond.
+
+    Tokens carry the user's authorization flags and account version, which
+    are copied to the access tokens created from them. Blacklisting goes
+    through the configured revocation backend.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        if get_revocation_backend().tracks_outstanding_tokens:
+            token = super().for_user(user)
+        else:
+            # Skip BlacklistMixin, which records an OutstandingToken row
+            token = super(tokens.BlacklistMixin, cls).for_user(user)
+        for claim in AUTHORIZATION_CLAIMS:
+            token[claim] = getattr(user, claim)
+        token[VERSION_CLAIM] = user.version
+        TOKENS.inc(event="issued")
+        return token
+
+    def set_iat(self, claim="iat", at_time=None):
+        super().set_iat(claim, at_time)
+        if claim == "iat":
+            # "iat" is in whole seconds, too coarse for the token epochs
+            at_time = at_time or self.current_time
+            self.payload[ISSUED_AT_CLAIM] = at_time.timestamp()
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+
+        if is_token_revoked(self):
+            raise TokenRevoked(_("Token has been revoked"))
+
+    def check_blacklist(self):
+        if get_revocation_backend().is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenBlacklisted(_("Token is blacklisted"))
+
+    def blacklist(self):
+        get_revocation_backend().revoke(
+            self.payload[api_settings.JTI_CLAIM],
+            self.payload["exp"],
+            user_id=self.payload.get(api_settings.USER_ID_CLAIM),
+            token=str(self),
+        )
+        TOKENS.inc(event="blacklisted")
+
+
+def decode_token(token_class, raw_token):
+    """
+    Decodes ``raw_token`` as a ``token_class`` and runs the checks that don't
+    need IO: signature, expiry, id and type. Async callers await the
+    blacklist and token epoch checks with ``averify_token()``.
+    """
+    # Read the payload without verify(), which checks the blacklist
+    # synchronously, then check the signature separately
+    token = token_class(raw_token, verify=False)
+    try:
+        token.token_backend.decode(raw_token, verify=True)
+    except TokenBackendError:
+        raise TokenError(_("Token is invalid or expired"))
+    tokens.Token.verify(token)
+    return token
+
+
+async def averify_token(token):
+    """
+    Async version of the blacklist and token epoch checks of
+    ``RefreshToken.verify()``.
+    """
+    if await get_revocation_backend().ais_revoked(token[api_settings.JTI_CLAIM]):
+        raise TokenBlacklisted(_("Token is blacklisted"))
+
+    if await ais_token_revoked(token):
+        raise TokenRevoked(_("Token has been revoked"))
+
+
+async def ablacklist_token(token):
+    """
+    Async version of ``RefreshToken.blacklist()``.
+    """
+    await get_revocation_backend().arevoke(
+        token.payload[api_settings.JTI_CLAIM],
+        token.payload["exp"],
+        user_id=token.payload.get(api_settings.USER_ID_CLAIM),
+        token=str(token),
+    )
+    TOKENS.inc(event="blacklisted")
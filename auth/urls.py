@@ -4,6 +4,7 @@ from .views import (
     DecoratedTokenObtainPairView,
     DecoratedTokenRefreshView,
     DecoratedTokenVerificationView,
+    HashingMetricsView,
     LogoutAllView,
     LogoutView,
 )
@@ -16,4 +17,5 @@ urlpatterns = [
     ),
     path("logout/", LogoutView.as_view(), name="logout_user"),
     path("logout_all/", LogoutAllView.as_view(), name="logout_all_user_devices"),
+    path("hashing/metrics/", HashingMetricsView.as_view(), name="hashing_metrics"),
 ]
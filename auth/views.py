@@ -1,13 +1,8 @@
-from drf_yasg.utils import swagger_auto_schema
-from rest_framework import serializers, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.token_blacklist.models import (
-    BlacklistedToken,
-    OutstandingToken,
-)
 from rest_framework_simplejwt.views import (
     TokenBlacklistView,
     TokenObtainPairView,
@@ -15,16 +10,28 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
 )
 
+from conf.docs import swagger_auto_schema
+
+from .epochs import revoke_user_tokens
+from .hashing import get_hashing_executor
 from .serializers import (
+    ClaimsTokenObtainPairSerializer,
+    RevocableTokenBlacklistSerializer,
+    RevocableTokenRefreshSerializer,
     TokenBlacklistResponseSerializer,
     TokenObtainPairResponseSerializer,
     TokenRefreshResponseSerializer,
     TokenVerificationResponseSerializer,
     TokenVerificationSerializer,
 )
+from .throttling import LoginIPThrottle, LoginUsernameThrottle
 
 
 class DecoratedTokenObtainPairView(TokenObtainPairView):
+    serializer_class = ClaimsTokenObtainPairSerializer
+    # Checked before the credentials, so throttled attempts cost no hash
+    throttle_classes = (LoginIPThrottle, LoginUsernameThrottle)
+
     @swagger_auto_schema(
         tags=["auth"],
         operation_summary="Obtain Tokens Pair",
@@ -38,6 +45,8 @@ class DecoratedTokenObtainPairView(TokenObtainPairView):
 
 
 class DecoratedTokenRefreshView(TokenRefreshView):
+    serializer_class = RevocableTokenRefreshSerializer
+
     @swagger_auto_schema(
         tags=["auth"],
         operation_summary="Refresh Token",
@@ -52,7 +61,7 @@ class DecoratedTokenRefreshView(TokenRefreshView):
 
 class DecoratedTokenVerificationView(TokenVerifyView):
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
     serializer_class = TokenVerificationSerializer
 
     @swagger_auto_schema(
@@ -68,8 +77,9 @@ class DecoratedTokenVerificationView(TokenVerifyView):
 
 
 class LogoutView(TokenBlacklistView):
+    serializer_class = RevocableTokenBlacklistSerializer
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
 
     @swagger_auto_schema(
         tags=["auth"],
@@ -85,20 +95,33 @@ class LogoutView(TokenBlacklistView):
 
 class LogoutAllView(APIView):
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
 
     @swagger_auto_schema(
         tags=["auth"],
         operation_summary="Logout All User Connections",
-        operation_description="Logs out the user by blacklisting all existing user's refresh tokens",
+        operation_description="Logs out the user by revoking all tokens issued to the user so far",
         responses={
             status.HTTP_205_RESET_CONTENT: "",
         },
     )
     def get(self, request):
-        user_id = request.user.id
-        tokens = OutstandingToken.objects.filter(user_id=user_id)
-        for token in tokens:
-            t, _ = BlacklistedToken.objects.get_or_create(token=token)
-
+        revoke_user_tokens([request.user.id])
         return Response(status=status.HTTP_205_RESET_CONTENT)
+
+
+class HashingMetricsView(APIView):
+    permission_classes = (IsAdminUser,)
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+
+    @swagger_auto_schema(
+        tags=["auth"],
+        operation_summary="Password Hashing Pool Metrics",
+        operation_description="Queue depth, counters and hash latency of the password hashing pool "
+        "of the worker process serving the request",
+    )
+    def get(self, request):
+        executor = get_hashing_executor()
+        if executor is None:
+            return Response({"enabled": False})
+        return Response({"enabled": True, **executor.metrics()})
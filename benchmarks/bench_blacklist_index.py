@@ -0,0 +1,132 @@
+"""
+Token verification throughput with and without the blacklist index.
+
+Seeds the benchmark database with the requested number of blacklisted tokens
+and measures ``TokenVerificationSerializer`` on tokens that are not
+blacklisted (the common case on the gateway path) and on blacklisted ones.
+
+    python -m benchmarks.bench_blacklist_index --rows 10000 1000000 10000000
+"""
+import argparse
+import uuid
+from datetime import timedelta
+
+from benchmarks.common import DEFAULT_DB, emit, measure, setup_django
+
+SEED_CHUNK = 50_000
+
+
+def seed_blacklist(rows):
+    """
+    Makes sure exactly ``rows`` blacklisted tokens exist, using raw batched
+    inserts so that seeding millions of rows stays tolerable.
+    """
+    from django.db import connection, transaction
+    from rest_framework_simplejwt.token_blacklist.models import (
+        BlacklistedToken,
+        OutstandingToken,
+    )
+    from rest_framework_simplejwt.utils import aware_utcnow
+
+    BlacklistedToken.objects.all().delete()
+    OutstandingToken.objects.all().delete()
+
+    now = aware_utcnow()
+    expires_at = now + timedelta(days=1)
+    outstanding_table = OutstandingToken._meta.db_table
+    blacklisted_table = BlacklistedToken._meta.db_table
+    blacklisted_jtis = []
+    for start in range(0, rows, SEED_CHUNK):
+        size = min(SEED_CHUNK, rows - start)
+        jtis = [uuid.uuid4().hex for _ in range(size)]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {outstanding_table} (id, jti, token, created_at, expires_at) "
+                "VALUES (%s, %s, '', %s, %s)",
+                [
+                    (start + offset + 1, jti, now, expires_at)
+                    for offset, jti in enumerate(jtis)
+                ],
+            )
+            cursor.executemany(
+                f"INSERT INTO {blacklisted_table} (id, token_id, blacklisted_at) "
+                "VALUES (%s, %s, %s)",
+                [
+                    (start + offset + 1, start + offset + 1, now)
+                    for offset in range(size)
+                ],
+            )
+        blacklisted_jtis.extend(jtis[:10])
+    return blacklisted_jtis
+
+
+def run(rows, iterations):
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext, override_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from auth.blacklist import get_blacklist_index
+    from auth.serializers import TokenVerificationSerializer
+
+    blacklisted_jtis = seed_blacklist(rows)
+    clean_tokens = [str(AccessToken()) for _ in range(100)]
+
+    def blacklisted_token(jti):
+        token = AccessToken()
+        token["jti"] = jti
+        return str(token)
+
+    blacklisted_tokens = [blacklisted_token(jti) for jti in blacklisted_jtis[:10]]
+
+    def verify(tokens):
+        position = 0
+
+        def call():
+            nonlocal position
+            serializer = TokenVerificationSerializer(
+                data={"token": tokens[position % len(tokens)]}
+            )
+            serializer.is_valid()
+            position += 1
+
+        return call
+
+    def queries_per_call(call):
+        with CaptureQueriesContext(connection) as queries:
+            call()
+        return len(queries)
+
+    results = {"rows": rows}
+    for enabled in (False, True):
+        config = {**settings.BLACKLIST_INDEX, "ENABLED": enabled}
+        with override_settings(BLACKLIST_INDEX=config):
+            if enabled:
+                get_blacklist_index().refresh(force_rebuild=True)
+            label = "with_index" if enabled else "without_index"
+            clean = verify(clean_tokens)
+            clean()
+            results[label] = {
+                "valid_tokens": measure(clean, iterations),
+                "blacklisted_tokens": measure(verify(blacklisted_tokens), iterations),
+                "queries_per_valid_verify": queries_per_call(clean),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000]
+    )
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    setup_django(args.db, BLACKLIST_INDEX_PATH=f"{args.db}.blacklist.idx")
+    emit([run(rows, args.iterations) for rows in args.rows], args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Throughput, latency and SQL queries of every route in auth/urls.py and
+account/urls.py.
+
+Seeds ``--users`` accounts, then drives each endpoint:
+
+* ``in-process``: ``--iterations`` sequential requests through the Django test
+  client, counting the SQL queries of each request.
+* ``live``: ``--concurrency`` keep-alive connections against a locally started
+  server (``--server``) for ``--duration`` seconds. Queries are not visible
+  from outside the server.
+
+Endpoints that consume their input (logout, logout_all, create, delete) get a
+fresh token, account or username for every request. In live mode
+``--live-pool`` of them are prepared up front and reused once exhausted, which
+shows up as error statuses.
+
+    python -m benchmarks.bench_endpoints --users 10000 --output results.json
+
+The results carry the current git commit so runs can be compared.
+"""
+import argparse
+import itertools
+import json
+import subprocess
+import time
+
+from benchmarks.common import BASE_DIR, DEFAULT_DB, emit, setup_django, summarize
+from benchmarks.loadgen import Server, http_request, run_load
+
+PASSWORD = "benchmark-password"
+ENDPOINTS = (
+    "token_obtain",
+    "token_refresh",
+    "token_verify",
+    "logout",
+    "logout_all",
+    "personal_account",
+    "account_list",
+    "account_retrieve",
+    "account_create",
+    "account_update",
+    "account_destroy",
+)
+# Throttling would reject most of the repeated logins
+SERVER_ENV = {"LOGIN_IP_THROTTLE_RATE": "", "LOGIN_USERNAME_THROTTLE_RATE": ""}
+
+
+class Dataset:
+    """
+    The seeded accounts, with a superuser and a regular user that the
+    requests authenticate as.
+    """
+
+    def __init__(self, size):
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.hashers import make_password
+
+        self.user_model = get_user_model()
+        self.password_hash = make_password(PASSWORD)
+        self.superuser = self._get_or_create(
+            "bench-superuser", is_staff=True, is_superuser=True
+        )
+        self.user = self._get_or_create("bench-user")
+
+        existing = self.user_model.objects.filter(
+            username__startswith="bench-account-"
+        ).count()
+        self._bulk_create(f"bench-account-{index}" for index in range(existing, size))
+        self.account_ids = list(
+            self.user_model.objects.filter(username__startswith="bench-account-")
+            .order_by("pk")
+            .values_list("pk", flat=True)[:size]
+        )
+        self._sequence = itertools.count(int(time.time() * 1000))
+
+    def _get_or_create(self, username, **fields):
+        user, _ = self.user_model.objects.get_or_create(
+            username=username, defaults={"password": self.password_hash, **fields}
+        )
+        return user
+
+    def _bulk_create(self, usernames):
+        return self.user_model.objects.bulk_create(
+            (
+                self.user_model(
+                    username=username,
+                    email=f"{username}@example.com",
+                    password=self.password_hash,
+                )
+                for username in usernames
+            ),
+            batch_size=1000,
+        )
+
+    def unique_username(self):
+        return f"bench-new-{next(self._sequence)}"
+
+    def disposable_accounts(self, count):
+        """
+        Returns ``count`` new accounts for the requests that delete them.
+        """
+        names = [f"bench-disposable-{next(self._sequence)}" for _ in range(count)]
+        self._bulk_create(names)
+        return list(self.user_model.objects.filter(username__in=names))
+
+    def tokens(self, user):
+        from auth.tokens import RefreshToken
+
+        return RefreshToken.for_user(user)
+
+    def bearer(self, user):
+        return {"Authorization": f"Bearer {self.tokens(user).access_token}"}
+
+
+def build_requests(endpoint, dataset, count):
+    """
+    Returns ``count`` requests to ``endpoint`` as ``(method, path, data,
+    headers)`` tuples.
+    """
+    from django.urls import reverse
+
+    superuser = dataset.bearer(dataset.superuser)
+    user = dataset.bearer(dataset.user)
+    refresh = str(dataset.tokens(dataset.user))
+    account_id = dataset.account_ids[len(dataset.account_ids) // 2]
+
+    if endpoint == "token_obtain":
+        data = {"username": dataset.user.username, "password": PASSWORD}
+        return [("POST", reverse("token_obtain_pair"), data, {})] * count
+    if endpoint == "token_refresh":
+        return [("POST", reverse("token_refresh"), {"refresh": refresh}, {})] * count
+    if endpoint == "token_verify":
+        data = {"token": refresh}
+        return [("POST", reverse("token_verify"), data, user)] * count
+    if endpoint == "logout":
+        return [
+            ("POST", reverse("logout_user"), {"refresh": str(token)}, user)
+            for token in (dataset.tokens(dataset.user) for _ in range(count))
+        ]
+    if endpoint == "logout_all":
+        # Every request revokes the tokens of its own account
+        return [
+            ("GET", reverse("logout_all_user_devices"), None, dataset.bearer(account))
+            for account in dataset.disposable_accounts(count)
+        ]
+    if endpoint == "personal_account":
+        return [("GET", reverse("personal_account"), None, user)] * count
+    if endpoint == "account_list":
+        return [("GET", reverse("account_list"), None, superuser)] * count
+    if endpoint == "account_retrieve":
+        path = reverse("account_retrieve", args=[account_id])
+        return [("GET", path, None, superuser)] * count
+    if endpoint == "account_create":
+        return [
+            (
+                "POST",
+                reverse("account_create"),
+                {
+                    "username": dataset.unique_username(),
+                    "first_name": "New",
+                    "last_name": "Account",
+                    "email": "new@example.com",
+                    "password": PASSWORD,
+                },
+                superuser,
+            )
+            for _ in range(count)
+        ]
+    if endpoint == "account_update":
+        path = reverse("account_update", args=[account_id])
+        data = {
+            "username": dataset.user_model.objects.get(pk=account_id).username,
+            "first_name": "Updated",
+            "last_name": "Account",
+            "email": "updated@example.com",
+            "password": PASSWORD,
+            "is_active": True,
+            "is_staff": False,
+        }
+        return [("PUT", path, data, superuser)] * count
+    if endpoint == "account_destroy":
+        return [
+            ("DELETE", reverse("account_destroy", args=[account.pk]), None, superuser)
+            for account in dataset.disposable_accounts(count)
+        ]
+    raise ValueError(f"Unknown endpoint {endpoint}")
+
+
+def bench_in_process(endpoint, dataset, iterations):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    requests = build_requests(endpoint, dataset, iterations)
+    samples, statuses, queries = [], {}, []
+    started = time.perf_counter()
+    for method, path, data, headers in requests:
+        extra = {
+            f"HTTP_{name.upper().replace('-', '_')}": value
+            for name, value in headers.items()
+        }
+        with CaptureQueriesContext(connection) as context:
+            call_started = time.perf_counter()
+            response = client.generic(
+                method,
+                path,
+                "" if data is None else json.dumps(data),
+                content_type="application/json",
+                **extra,
+            )
+            samples.append(time.perf_counter() - call_started)
+        queries.append(len(context.captured_queries))
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    result = summarize(samples, time.perf_counter() - started)
+    result["statuses"] = {str(code): count for code, count in sorted(statuses.items())}
+    result["queries_per_request"] = round(sum(queries) / len(queries), 2)
+    result["max_queries"] = max(queries)
+    return result
+
+
+def bench_live(server, endpoint, dataset, pool_size, concurrency, duration):
+    raw_requests = [
+        http_request(
+            method,
+            path,
+            server.port,
+            data,
+            headers=[f"{name}: {value}" for name, value in headers.items()],
+        )
+        for method, path, data, headers in build_requests(endpoint, dataset, pool_size)
+    ]
+    requests = itertools.cycle(raw_requests)
+    return run_load(server.port, lambda: next(requests), concurrency, duration)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=("in-process", "live"),
+        default=("in-process", "live"),
+    )
+    parser.add_argument("--users", type=int, default=1000, help="Seeded accounts")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--server", choices=("wsgi", "asgi"), default="wsgi")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--live-pool", type=int, default=2000)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    setup_django(args.db, DEBUG=False, **SERVER_ENV)
+    dataset = Dataset(args.users)
+    results = {
+        "config": {
+            "commit": git_commit(),
+            **{
+                name: getattr(args, name)
+                for name in ("users", "iterations", "server", "workers", "threads")
+            },
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+        }
+    }
+
+    if "in-process" in args.modes:
+        results["in_process"] = {
+            endpoint: bench_in_process(endpoint, dataset, args.iterations)
+            for endpoint in args.endpoints
+        }
+    if "live" in args.modes:
+        with Server(
+            args.server, workers=args.workers, threads=args.threads, env=SERVER_ENV
+        ) as server:
+            results["live"] = {
+                endpoint: bench_live(
+                    server,
+                    endpoint,
+                    dataset,
+                    args.live_pool,
+                    args.concurrency,
+                    args.duration,
+                )
+                for endpoint in args.endpoints
+            }
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
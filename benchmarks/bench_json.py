@@ -0,0 +1,121 @@
+"""
+JSON rendering and parsing with DRF's ``JSONRenderer``/``JSONParser`` and
+with the orjson based ``FastJSONRenderer``/``FastJSONParser`` of ``conf``.
+
+Measures a token pair response, a token request body and account list pages
+of each of ``--rows`` accounts, shaped like the ``AccountListView`` output.
+
+    python -m benchmarks.bench_json --rows 100 1000 10000
+"""
+import argparse
+import io
+
+from benchmarks.common import DEFAULT_DB, emit, measure, setup_django
+
+TOKEN = (
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJ0b2tlbl90eXBlIjoiYWNjZXNzIiwiZXhwIjox"
+    "NjcxOTA1NjAwLCJpYXQiOjE2NzE5MDQ3MDAsImp0aSI6IjEyMzQ1Njc4OTBhYmNkZWYiLCJ1c2VyX2"
+    "lkIjoxfQ.c2lnbmF0dXJlLXNpZ25hdHVyZS1zaWduYXR1cmU"
+)
+
+
+def account_page(rows):
+    from rest_framework.utils.serializer_helpers import ReturnList
+
+    return {
+        "next": "http://testserver/api/v1/account/management/list/?cursor=cD0xMDA%3D",
+        "previous": None,
+        "results": ReturnList(
+            [
+                {
+                    "id": index,
+                    "username": f"bench-account-{index}",
+                    "first_name": "Bench",
+                    "last_name": f"Account {index}",
+                    "email": f"bench-account-{index}@example.com",
+                    "is_active": True,
+                    "is_staff": index % 10 == 0,
+                    "last_login": "2022-12-24T18:30:05.123456Z" if index % 2 else None,
+                }
+                for index in range(1, rows + 1)
+            ],
+            serializer=None,
+        ),
+    }
+
+
+def bench_pair(name, stdlib, fast, iterations):
+    assert stdlib() == fast(), f"{name}: the results differ"
+    results = {
+        "stdlib": measure(stdlib, iterations),
+        "orjson": measure(fast, iterations),
+    }
+    results["speedup"] = round(
+        results["stdlib"]["mean_ms"] / results["orjson"]["mean_ms"], 2
+    )
+    return results
+
+
+def bench_render(data, iterations):
+    from rest_framework.renderers import JSONRenderer
+
+    from conf.renderers import FastJSONRenderer
+
+    stdlib, fast = JSONRenderer(), FastJSONRenderer()
+    return bench_pair(
+        "render",
+        lambda: stdlib.render(data, "application/json"),
+        lambda: fast.render(data, "application/json"),
+        iterations,
+    )
+
+
+def bench_parse(body, iterations):
+    from rest_framework.parsers import JSONParser
+
+    from conf.parsers import FastJSONParser
+
+    stdlib, fast = JSONParser(), FastJSONParser()
+    return bench_pair(
+        "parse",
+        lambda: stdlib.parse(io.BytesIO(body)),
+        lambda: fast.parse(io.BytesIO(body)),
+        iterations,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10_000])
+    parser.add_argument("--iterations", type=int, default=10_000)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    setup_django(args.db, migrate=False)
+    from rest_framework.renderers import JSONRenderer
+
+    results = {
+        "config": {"iterations": args.iterations},
+        "token_pair": {
+            "render": bench_render(
+                {"access": TOKEN, "refresh": TOKEN}, args.iterations
+            ),
+            "parse": bench_parse(
+                JSONRenderer().render({"refresh": TOKEN}), args.iterations
+            ),
+        },
+    }
+    for rows in args.rows:
+        page = account_page(rows)
+        # Fewer iterations for the larger pages, so every size takes about as long
+        iterations = max(1, args.iterations * 10 // rows)
+        results[f"account_list_{rows}"] = {
+            "render": bench_render(page, iterations),
+            "parse": bench_parse(JSONRenderer().render(page), iterations),
+        }
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Legitimate login latency during a credential stuffing attack.
+
+Starts the WSGI server behind a simulated proxy (``NUM_PROXIES=1``, client
+addresses in ``X-Forwarded-For``) and runs three scenarios:
+
+* ``baseline``: legitimate logins only.
+* ``attack-unthrottled``: legitimate logins while ``--attackers`` connections
+  try wrong passwords for random usernames from ``--attacker-ips`` addresses,
+  with login throttling disabled.
+* ``attack-throttled``: the same attack with the configured throttle rates
+  (``--ip-rate`` and ``--username-rate``, the settings by default).
+
+Legitimate clients log in as one of ``--users`` users, each from its own
+address, once every ``--interval`` seconds per connection.
+
+    python -m benchmarks.bench_login_throttle --duration 20 --attackers 64
+
+The throttles only help once the attack exceeds their rates, so on a small
+machine lower ``--ip-rate`` below what the workers can hash.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import uuid
+
+from benchmarks.common import DEFAULT_DB, emit, setup_django
+from benchmarks.loadgen import Server, http_request, run_clients
+
+PASSWORD = "benchmark-password"
+LOGIN_PATH = "/api/v1/auth/token/"
+SCENARIOS = ("baseline", "attack-unthrottled", "attack-throttled")
+UNTHROTTLED = {"LOGIN_IP_THROTTLE_RATE": "", "LOGIN_USERNAME_THROTTLE_RATE": ""}
+
+
+def create_users(count):
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    user_model = get_user_model()
+    usernames = [f"legit{index}" for index in range(count)]
+    existing = set(
+        user_model.objects.filter(username__in=usernames).values_list(
+            "username", flat=True
+        )
+    )
+    password = make_password(PASSWORD)
+    user_model.objects.bulk_create(
+        user_model(username=username, password=password)
+        for username in usernames
+        if username not in existing
+    )
+    return usernames
+
+
+def legit_requests(port, usernames):
+    logins = itertools.cycle(
+        http_request(
+            "POST",
+            LOGIN_PATH,
+            port,
+            {"username": username, "password": PASSWORD},
+            headers=[f"X-Forwarded-For: 10.1.{index // 250}.{index % 250 + 1}"],
+        )
+        for index, username in enumerate(usernames)
+    )
+    return lambda: next(logins)
+
+
+def attack_requests(port, ip_count):
+    ips = [f"10.66.{index // 250}.{index % 250 + 1}" for index in range(ip_count)]
+
+    def next_request():
+        return http_request(
+            "POST",
+            LOGIN_PATH,
+            port,
+            {"username": f"victim-{uuid.uuid4().hex[:8]}", "password": "guess"},
+            headers=[f"X-Forwarded-For: {random.choice(ips)}"],
+        )
+
+    return next_request
+
+
+def run_scenario(scenario, args, usernames):
+    env = {"NUM_PROXIES": 1}
+    if args.cache_url:
+        env["CACHE_URL"] = args.cache_url
+    if scenario == "attack-unthrottled":
+        env.update(UNTHROTTLED)
+    else:
+        if args.ip_rate:
+            env["LOGIN_IP_THROTTLE_RATE"] = args.ip_rate
+        if args.username_rate:
+            env["LOGIN_USERNAME_THROTTLE_RATE"] = args.username_rate
+    with Server("wsgi", workers=args.workers, threads=args.threads, env=env) as server:
+        groups = {
+            "legit": (legit_requests(server.port, usernames), args.legit, args.interval)
+        }
+        if scenario != "baseline":
+            groups["attack"] = (
+                attack_requests(server.port, args.attacker_ips),
+                args.attackers,
+                0,
+            )
+        return asyncio.run(run_clients(server.port, groups, args.duration))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument(
+        "--legit", type=int, default=2, help="Legitimate client connections"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=1, help="Seconds between legitimate logins"
+    )
+    parser.add_argument("--attackers", type=int, default=64)
+    parser.add_argument("--attacker-ips", type=int, default=1)
+    parser.add_argument("--ip-rate", help="Login throttle rate per IP, e.g. 10/min")
+    parser.add_argument("--username-rate", help="Login throttle rate per username")
+    parser.add_argument(
+        "--cache-url",
+        help="Cache holding the throttle counters, shared by the workers unless "
+        "it is the default local memory cache",
+    )
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    setup_django(args.db, DEBUG=False)
+    usernames = create_users(args.users)
+    results = {
+        scenario: run_scenario(scenario, args, usernames) for scenario in args.scenarios
+    }
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Per request cost of the middleware of the stateless API with the full
+middleware stack and with the route-scoped one of ``ROUTE_MIDDLEWARE``.
+
+Requests ``WelcomeView`` and token verify in-process with a bearer token,
+with ``ROUTE_MIDDLEWARE`` reduced to its ``/`` route (``full``: sessions,
+CSRF, authentication and messages on every request) and as configured
+(``scoped``).
+
+    python -m benchmarks.bench_route_middleware --iterations 5000
+"""
+import argparse
+
+from benchmarks.common import DEFAULT_DB, emit, measure, setup_django
+
+USERNAME = "benchmark"
+ENDPOINTS = ("welcome", "verify")
+
+
+def build_request(endpoint, access):
+    from django.urls import reverse
+
+    if endpoint == "welcome":
+        return "get", reverse("api_welcome_view"), None
+    return "post", reverse("token_verify"), {"token": access}
+
+
+def bench_stack(route_middleware, endpoint, access, iterations):
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    with override_settings(ROUTE_MIDDLEWARE=route_middleware):
+        # The middleware is loaded by the first request of a client
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        method, path, data = build_request(endpoint, access)
+        request = getattr(client, method)
+
+        def call():
+            response = request(path, data, format="json")
+            assert response.status_code == 200, response.status_code
+
+        measure(call, max(1, iterations // 10))
+        return measure(call, iterations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    setup_django(args.db, DEBUG=False)
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+
+    from auth.tokens import RefreshToken
+
+    user_model = get_user_model()
+    user = user_model.objects.filter(username=USERNAME).first()
+    if user is None:
+        user = user_model.objects.create_user(username=USERNAME)
+    access = str(RefreshToken.for_user(user).access_token)
+
+    stacks = {
+        "full": {"/": settings.ROUTE_MIDDLEWARE["/"]},
+        "scoped": settings.ROUTE_MIDDLEWARE,
+    }
+    results = {}
+    for endpoint in args.endpoints:
+        results[endpoint] = {
+            name: bench_stack(route_middleware, endpoint, access, args.iterations)
+            for name, route_middleware in stacks.items()
+        }
+        results[endpoint]["saving_us"] = round(
+            (
+                results[endpoint]["full"]["p50_ms"]
+                - results[endpoint]["scoped"]["p50_ms"]
+            )
+            * 1000,
+            1,
+        )
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
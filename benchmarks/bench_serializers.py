@@ -0,0 +1,92 @@
+"""
+Account list serialization with ``AccountPreviewSerializer`` and with the
+``values()`` read path of ``account.fastpath``.
+
+Seeds the benchmark database with the largest of ``--rows`` accounts, then
+fetches, represents and renders the first ``rows`` of them to JSON both ways,
+checking that the bytes are identical.
+
+    python -m benchmarks.bench_serializers --rows 10000 100000
+"""
+import argparse
+from datetime import timedelta
+
+from benchmarks.common import DEFAULT_DB, emit, measure, setup_django
+
+SEED_CHUNK = 5000
+
+
+def seed_accounts(rows):
+    from django.contrib.auth import get_user_model
+    from rest_framework_simplejwt.utils import aware_utcnow
+
+    user_model = get_user_model()
+    queryset = user_model.objects.filter(username__startswith="bench-serializer-")
+    existing = queryset.count()
+    now = aware_utcnow()
+    for start in range(existing, rows, SEED_CHUNK):
+        user_model.objects.bulk_create(
+            user_model(
+                username=f"bench-serializer-{index}",
+                first_name="Bench",
+                last_name=f"Account {index}",
+                email=f"bench-serializer-{index}@example.com",
+                # Half of the accounts have logged in
+                last_login=now - timedelta(seconds=index) if index % 2 else None,
+            )
+            for index in range(start, min(rows, start + SEED_CHUNK))
+        )
+    return queryset.order_by("id")
+
+
+def bench_rows(queryset, rows, iterations):
+    from rest_framework.renderers import JSONRenderer
+
+    from account.fastpath import ValuesSerializer
+    from account.serializers import AccountPreviewSerializer
+
+    queryset = queryset[:rows]
+    renderer = JSONRenderer()
+
+    def model_serializer():
+        data = AccountPreviewSerializer(queryset.all(), many=True).data
+        return renderer.render(data)
+
+    def values_serializer():
+        serializer = ValuesSerializer(AccountPreviewSerializer)
+        return renderer.render(serializer.many(serializer.values(queryset.all())))
+
+    assert model_serializer() == values_serializer(), "The JSON differs"
+    results = {
+        "model_serializer": measure(model_serializer, iterations),
+        "values_serializer": measure(values_serializer, iterations),
+    }
+    results["speedup"] = round(
+        results["model_serializer"]["mean_ms"]
+        / results["values_serializer"]["mean_ms"],
+        2,
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    queryset = seed_accounts(max(args.rows))
+    results = {
+        "config": {"iterations": args.iterations},
+        "rows": {
+            str(rows): bench_rows(queryset, rows, args.iterations) for rows in args.rows
+        },
+    }
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Cold start of a worker process: import time and resident memory.
+
+Every run starts a fresh interpreter that sets up Django, builds the WSGI
+application and imports the URLconf with all the views, as a worker does
+before serving its first request, once per ``--profiles``:
+
+* ``docs``: ``API_DOCS_ENABLED=true``, the Swagger UI and schema are served.
+* ``production``: ``API_DOCS_ENABLED=false``.
+
+    python -m benchmarks.bench_startup --runs 20
+
+Reports the median and best import time, the resident set size after the
+imports and whether ``drf_yasg`` was imported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import BASE_DIR, DEFAULT_DB, emit
+
+PROFILES = {"docs": "true", "production": "false"}
+
+WORKER = """
+import json, sys, time
+
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+
+get_wsgi_application()
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+
+rss_kb = 0
+with open("/proc/self/status") as status:
+    for line in status:
+        if line.startswith("VmRSS:"):
+            rss_kb = int(line.split()[1])
+print(json.dumps({
+    "seconds": elapsed,
+    "rss_kb": rss_kb,
+    "modules": len(sys.modules),
+    "drf_yasg": "drf_yasg" in sys.modules,
+}))
+"""
+
+
+def start_worker(db_path, docs_enabled):
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "conf.settings",
+        "DB_URL": f"sqlite:///{db_path}",
+        "DEBUG": "false",
+        "API_DOCS_ENABLED": docs_enabled,
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER],
+        cwd=BASE_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def bench_profile(db_path, docs_enabled, runs):
+    samples = [start_worker(db_path, docs_enabled) for _ in range(runs)]
+    seconds = [sample["seconds"] for sample in samples]
+    return {
+        "runs": runs,
+        "median_ms": round(statistics.median(seconds) * 1000, 1),
+        "min_ms": round(min(seconds) * 1000, 1),
+        "rss_mb": round(statistics.median(s["rss_kb"] for s in samples) / 1024, 1),
+        "modules": samples[-1]["modules"],
+        "drf_yasg_imported": samples[-1]["drf_yasg"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument(
+        "--profiles", nargs="+", choices=PROFILES, default=list(PROFILES)
+    )
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    # Start one worker first, so the runs don't measure a cold disk cache
+    start_worker(args.db, PROFILES[args.profiles[0]])
+    results = {
+        profile: bench_profile(args.db, PROFILES[profile], args.runs)
+        for profile in args.profiles
+    }
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
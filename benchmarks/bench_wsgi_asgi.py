@@ -0,0 +1,118 @@
+"""
+Throughput and tail latency of the auth endpoints under WSGI and ASGI.
+
+Starts each server in turn on the benchmark database and drives it with an
+asyncio HTTP/1.1 client holding ``--concurrency`` keep-alive connections:
+
+* ``wsgi``: the sync views (``auth/views.py``) under gunicorn's threaded
+  workers.
+* ``asgi``: the async views (``auth/async_views.py``) under uvicorn.
+* ``asgi-sync``: the sync views under uvicorn, where every request borrows a
+  thread from Django's sync-to-async executor.
+
+    python -m benchmarks.bench_wsgi_asgi --concurrency 64 256 --duration 10
+
+Token obtain is dominated by password hashing and the SQLite database
+serializes the ``last_login`` writes, so it mostly measures the CPU.
+"""
+import argparse
+import os
+
+from benchmarks.common import DEFAULT_DB, emit, setup_django
+from benchmarks.loadgen import Server, http_request, run_load
+
+USERNAME = "benchmark"
+PASSWORD = "benchmark-password"
+ENDPOINTS = ("obtain", "refresh", "verify")
+SERVERS = ("wsgi", "asgi", "asgi-sync")
+
+
+def build_requests(prefix, port):
+    """
+    Returns the raw HTTP request of every endpoint, for the views mounted at
+    ``prefix``.
+    """
+    from django.contrib.auth import get_user_model
+
+    from auth.tokens import RefreshToken
+
+    user_model = get_user_model()
+    user = user_model.objects.filter(username=USERNAME).first()
+    if user is None:
+        user = user_model.objects.create_user(username=USERNAME, password=PASSWORD)
+    refresh = RefreshToken.for_user(user)
+    authorization = f"Authorization: Bearer {refresh.access_token}"
+
+    return {
+        "obtain": http_request(
+            "POST",
+            f"{prefix}token/",
+            port,
+            {"username": USERNAME, "password": PASSWORD},
+        ),
+        "refresh": http_request(
+            "POST", f"{prefix}token/refresh/", port, {"refresh": str(refresh)}
+        ),
+        "verify": http_request(
+            "POST",
+            f"{prefix}token/verify/",
+            port,
+            {"token": str(refresh)},
+            headers=[authorization],
+        ),
+    }
+
+
+def bench_server(server, endpoints, concurrencies, duration, workers, threads):
+    kind = "wsgi" if server == "wsgi" else "asgi"
+    prefix = "/api/v1/auth/async/" if server == "asgi" else "/api/v1/auth/"
+    results = {}
+    # Logins would be throttled long before the measurements end
+    env = {"LOGIN_IP_THROTTLE_RATE": "", "LOGIN_USERNAME_THROTTLE_RATE": ""}
+    with Server(kind, workers=workers, threads=threads, env=env) as running:
+        requests = build_requests(prefix, running.port)
+        for endpoint in endpoints:
+            # Warm up the workers: connections, caches and the blacklist index
+            run_load(running.port, requests[endpoint], workers * 2, 1)
+            results[endpoint] = {
+                concurrency: run_load(
+                    running.port, requests[endpoint], concurrency, duration
+                )
+                for concurrency in concurrencies
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--servers", nargs="+", choices=SERVERS, default=SERVERS)
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[64, 256])
+    parser.add_argument(
+        "--duration", type=float, default=10, help="Seconds per measurement"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--threads", type=int, default=8, help="Threads per gunicorn worker"
+    )
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    setup_django(args.db, DEBUG=False)
+    results = {
+        server: bench_server(
+            server,
+            args.endpoints,
+            args.concurrency,
+            args.duration,
+            args.workers,
+            args.threads,
+        )
+        for server in args.servers
+    }
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Benchmarks run against their own SQLite database (``--db``) so they never
+touch the development database. Import this module and call ``setup_django``
+before importing anything that needs Django settings.
+"""
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DB = BASE_DIR / "var" / "benchmark.sqlite3"
+
+
+def setup_django(db_path=DEFAULT_DB, migrate=True, **env):
+    """
+    Configures Django against the benchmark database and applies migrations.
+    Extra keyword arguments are exported as environment variables first, so
+    they can switch settings that are read from the environment.
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    os.environ["DB_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "conf.settings")
+    for name, value in env.items():
+        os.environ[name] = str(value)
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+
+    import django
+
+    django.setup()
+
+    if migrate:
+        from django.core.management import call_command
+
+        call_command("migrate", verbosity=0, interactive=False)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    position = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[position]
+
+
+def summarize(samples, elapsed=None):
+    """
+    Returns throughput and latency percentiles (in milliseconds) for a list of
+    per-operation durations given in seconds.
+    """
+    elapsed = elapsed if elapsed is not None else sum(samples)
+    return {
+        "count": len(samples),
+        "ops_per_second": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 4),
+    }
+
+
+def measure(func, iterations):
+    """
+    Calls ``func`` ``iterations`` times and returns the summarized timings.
+    """
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - call_started)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def emit(results, output=None):
+    """
+    Prints the results as JSON and optionally writes them to ``output``.
+    """
+    document = json.dumps(results, indent=2, sort_keys=True, default=str)
+    print(document)
+    if output:
+        Path(output).write_text(document + "\n")
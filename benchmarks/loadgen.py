@@ -0,0 +1,225 @@
+"""
+Load generation against a locally started server.
+
+``Server`` starts gunicorn (``wsgi``) or uvicorn (``asgi``) on a free port,
+``run_load`` drives it with an asyncio HTTP/1.1 client holding keep-alive
+connections and summarizes the latencies of the responses.
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BASE_DIR, summarize
+
+HOST = "127.0.0.1"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """
+    Context manager running ``conf.wsgi`` under gunicorn's threaded workers
+    (``kind="wsgi"``) or ``conf.asgi`` under uvicorn (``kind="asgi"``). ``env``
+    is added to the environment of the server.
+    """
+
+    def __init__(self, kind, workers=1, threads=8, env=None):
+        self.kind = kind
+        self.workers = workers
+        self.threads = threads
+        self.env = env or {}
+        self.port = free_port()
+        self.process = None
+
+    def command(self):
+        if self.kind == "wsgi":
+            return [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "conf.wsgi:application",
+                "--bind",
+                f"{HOST}:{self.port}",
+                "--workers",
+                str(self.workers),
+                "--worker-class",
+                "gthread",
+                "--threads",
+                str(self.threads),
+                "--log-level",
+                "warning",
+            ]
+        return [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "conf.asgi:application",
+            "--host",
+            HOST,
+            "--port",
+            str(self.port),
+            "--workers",
+            str(self.workers),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ]
+
+    def __enter__(self):
+        env = {**os.environ, **{name: str(value) for name, value in self.env.items()}}
+        self.process = subprocess.Popen(self.command(), cwd=BASE_DIR, env=env)
+        try:
+            self.wait_until_listening()
+        except BaseException:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+    def wait_until_listening(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(
+                    f"Server exited with status {self.process.returncode}"
+                )
+            try:
+                socket.create_connection((HOST, self.port), timeout=0.5).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError(f"Server didn't listen on port {self.port} in {timeout}s")
+
+
+def http_request(method, path, port, data=None, headers=()):
+    """
+    Returns a raw HTTP/1.1 request, with ``data`` sent as a JSON body.
+    """
+    body = json.dumps(data).encode() if data is not None else b""
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {HOST}:{port}", *headers]
+    if data is not None:
+        lines += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+async def read_response(reader):
+    """
+    Reads a response and returns its status code and body.
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed by the server")
+    status = int(status_line.split()[1])
+    length, chunked = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+    body = b""
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            body += (await reader.readexactly(size + 2))[:-2]
+            if size == 0:
+                break
+    elif length:
+        body = await reader.readexactly(length)
+    return status, body
+
+
+class LoadResult:
+    def __init__(self):
+        self.samples = []
+        self.statuses = {}
+
+    def add(self, status, duration=None):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if duration is not None:
+            self.samples.append(duration)
+
+    def summary(self, elapsed):
+        result = summarize(self.samples, elapsed)
+        result["statuses"] = {
+            str(status): count for status, count in sorted(self.statuses.items())
+        }
+        return result
+
+
+async def client(port, next_request, deadline, result, interval=0):
+    """
+    Sends ``next_request()`` over one keep-alive connection until
+    ``deadline``, at most one request every ``interval`` seconds.
+    """
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        if writer is None:
+            reader, writer = await asyncio.open_connection(HOST, port)
+        started = time.perf_counter()
+        try:
+            writer.write(next_request())
+            await writer.drain()
+            status, _ = await read_response(reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            result.add("error")
+            writer.close()
+            reader = writer = None
+            continue
+        finished = time.perf_counter()
+        result.add(status, finished - started)
+        if interval:
+            await asyncio.sleep(max(interval - (finished - started), 0))
+    if writer is not None:
+        writer.close()
+
+
+def as_supplier(request):
+    if callable(request):
+        return request
+    return lambda: request
+
+
+async def run_clients(port, groups, duration):
+    """
+    Runs groups of clients side by side for ``duration`` seconds. ``groups``
+    maps a name to ``(request, concurrency, interval)``, where ``request`` is
+    the raw request or a function returning the next one. Returns the summary
+    of every group.
+    """
+    results = {name: LoadResult() for name in groups}
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            client(port, as_supplier(request), deadline, results[name], interval)
+            for name, (request, concurrency, interval) in groups.items()
+            for _ in range(concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    return {name: result.summary(elapsed) for name, result in results.items()}
+
+
+def run_load(port, request, concurrency, duration):
+    """
+    Sends ``request`` over ``concurrency`` connections as fast as the server
+    answers for ``duration`` seconds.
+    """
+    groups = {"load": (request, concurrency, 0)}
+    return asyncio.run(run_clients(port, groups, duration))["load"]
@@ -0,0 +1,82 @@
+"""
+Stand-ins for the drf_yasg helpers used by the views, so that workers don't
+import drf_yasg, and what it imports, until the OpenAPI schema is generated
+or the Swagger UI is served, or at all with ``API_DOCS["ENABLED"]`` off.
+
+``swagger_auto_schema`` records its arguments, which are handed to drf_yasg's
+by ``apply_schema_overrides()`` before the schema is generated, see
+``conf.schema``. drf_yasg objects in its arguments are declared with
+``Parameter``.
+"""
+from django.utils.module_loading import import_string
+
+# drf_yasg.openapi constants
+IN_QUERY = "query"
+TYPE_STRING = "string"
+
+# The (view method, swagger_auto_schema arguments) not handed to drf_yasg yet
+_overrides = []
+
+
+class Parameter:
+    """
+    A ``drf_yasg.openapi.Parameter``, created when the overrides are applied.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+
+    def resolve(self):
+        from drf_yasg import openapi
+
+        return openapi.Parameter(*self.args, **self.kwargs)
+
+
+def swagger_auto_schema(**overrides):
+    """
+    Records the ``drf_yasg.utils.swagger_auto_schema`` arguments of a view
+    method.
+    """
+
+    def decorator(view_method):
+        _overrides.append((view_method, overrides))
+        return view_method
+
+    return decorator
+
+
+def _resolve(value):
+    if isinstance(value, Parameter):
+        return value.resolve()
+    if isinstance(value, list):
+        return [_resolve(item) for item in value]
+    return value
+
+
+def apply_schema_overrides():
+    """
+    Applies the recorded ``swagger_auto_schema`` arguments with drf_yasg.
+    """
+    from drf_yasg.utils import swagger_auto_schema as drf_yasg_swagger_auto_schema
+
+    while _overrides:
+        view_method, overrides = _overrides.pop()
+        overrides = {name: _resolve(value) for name, value in overrides.items()}
+        drf_yasg_swagger_auto_schema(**overrides)(view_method)
+
+
+def lazy_view(import_path):
+    """
+    Returns a view that imports the view at ``import_path`` on its first
+    request.
+    """
+    view = None
+
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(import_path)
+        return view(request, *args, **kwargs)
+
+    return wrapper
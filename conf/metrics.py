@@ -0,0 +1,398 @@
+"""
+Prometheus metrics shared by the worker processes of a server.
+
+Every process writes its samples to its own memory-mapped file in
+``settings.METRICS["DIRECTORY"]``, so updating a metric is a dictionary
+lookup and a write to memory, without any locking between processes. The
+metrics endpoint reads the files of all the processes and adds up their
+samples: counters and histograms keep the counts of processes that have
+exited, gauges only count the processes that are still running.
+
+The directory must be emptied when the server starts, before the workers
+are forked, or the counters carry on from the previous run.
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import request_finished, setting_changed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+FILE_SUFFIX = ".metrics"
+
+_registry = {}
+_store = None
+_store_lock = threading.Lock()
+
+
+class MetricsFile:
+    """
+    Float values by key, in a memory-mapped file that only one process
+    writes to.
+
+    The file starts with the number of bytes used, followed by entries of a
+    4 byte key length, the UTF-8 key padded to 8 bytes and an 8 byte double.
+    New entries are written before the used size is moved past them, so
+    readers never see partial entries.
+    """
+
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        self._file = open(path, "a+b")
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            self._file.truncate(self.INITIAL_SIZE)
+            size = self.INITIAL_SIZE
+        self._capacity = size
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._lock = threading.Lock()
+        self._positions = {}
+        self._used = struct.unpack_from("<i", self._map, 0)[0]
+        if self._used == 0:
+            self._used = 8
+            struct.pack_into("<i", self._map, 0, self._used)
+        for key, _value, position in self._entries(self._map, self._used):
+            self._positions[key] = position
+
+    @staticmethod
+    def _entries(data, used):
+        position = 8
+        while position < used:
+            length = struct.unpack_from("<i", data, position)[0]
+            position += 4
+            key = bytes(data[position : position + length]).decode()  # noqa: E203
+            position += length + (8 - (4 + length) % 8) % 8
+            yield key, struct.unpack_from("<d", data, position)[0], position
+            position += 8
+
+    @classmethod
+    def read(cls, path):
+        """
+        Returns the values of the file at ``path`` by key.
+        """
+        data = Path(path).read_bytes()
+        if len(data) < 8:
+            return {}
+        used = struct.unpack_from("<i", data, 0)[0]
+        return {key: value for key, value, _position in cls._entries(data, used)}
+
+    def _position(self, key):
+        position = self._positions.get(key)
+        if position is not None:
+            return position
+        encoded = key.encode()
+        padding = (8 - (4 + len(encoded)) % 8) % 8
+        entry = struct.pack(f"<i{len(encoded) + padding}sd", len(encoded), encoded, 0.0)
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._map[self._used : self._used + len(entry)] = entry  # noqa: E203
+        self._used += len(entry)
+        struct.pack_into("<i", self._map, 0, self._used)
+        position = self._used - 8
+        self._positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        with self._lock:
+            position = self._position(key)
+            value = struct.unpack_from("<d", self._map, position)[0]
+            struct.pack_into("<d", self._map, position, value + amount)
+
+    def add_many(self, amounts):
+        """
+        Adds the ``(key, amount)`` pairs of ``amounts``.
+        """
+        with self._lock:
+            for key, amount in amounts:
+                position = self._position(key)
+                value = struct.unpack_from("<d", self._map, position)[0]
+                struct.pack_into("<d", self._map, position, value + amount)
+
+    def set(self, key, value):
+        with self._lock:
+            struct.pack_into("<d", self._map, self._position(key), value)
+
+    def keys(self):
+        return list(self._positions)
+
+    def reset(self, keys):
+        """
+        Sets the values of the entries of ``keys`` that exist to 0.
+        """
+        with self._lock:
+            for key in keys:
+                position = self._positions.get(key)
+                if position is not None:
+                    struct.pack_into("<d", self._map, position, 0.0)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def get_store():
+    """
+    Returns the ``MetricsFile`` of the current process, or ``None`` when
+    metrics are disabled.
+    """
+    global _store
+    if _store is None and settings.METRICS["ENABLED"]:
+        with _store_lock:
+            if _store is None:
+                directory = Path(settings.METRICS["DIRECTORY"])
+                directory.mkdir(parents=True, exist_ok=True)
+                store = MetricsFile(directory / f"{os.getpid()}{FILE_SUFFIX}")
+                # The file may be left by an exited process with the same
+                # PID, whose counts carry on but whose gauges don't
+                store.reset(key for key in store.keys() if _is_gauge_key(key))
+                _store = store
+    return _store
+
+
+def _is_gauge_key(key):
+    metric = _registry.get(json.loads(key)[0])
+    return metric is not None and metric.type == "gauge"
+
+
+def _forget_store():
+    # A forked process writes to a file of its own
+    global _store
+    _store = None
+
+
+os.register_at_fork(after_in_child=_forget_store)
+
+
+@receiver(setting_changed)
+def reset_store(*, setting, **kwargs):
+    if setting == "METRICS" and _store is not None:
+        _store.close()
+        _forget_store()
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._keys = {}
+        _registry[name] = self
+
+    def _key(self, suffix, labels):
+        # Keys are cached, as JSON encoding them is the slow part of an update
+        cache_key = (suffix, *(labels[name] for name in self.labelnames))
+        key = self._keys.get(cache_key)
+        if key is None:
+            key = self._keys[cache_key] = json.dumps([self.name, *cache_key])
+        return key
+
+    def samples(self, values):
+        """
+        Yields the ``(sample name suffix, labels, value)`` samples of the
+        aggregated ``values``, by the ``(suffix, *label values)`` of their
+        keys.
+        """
+        for (suffix, *labelvalues), value in sorted(values.items()):
+            yield suffix, dict(zip(self.labelnames, labelvalues)), value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        store = get_store()
+        if store is not None:
+            store.add(self._key("", labels), amount)
+
+
+class Gauge(Metric):
+    """
+    A gauge summed over the running processes.
+    """
+
+    type = "gauge"
+
+    def inc(self, amount=1, **labels):
+        store = get_store()
+        if store is not None:
+            store.add(self._key("", labels), amount)
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        store = get_store()
+        if store is not None:
+            store.set(self._key("", labels), value)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}
+
+    def _series_keys(self, labels):
+        labelvalues = tuple(labels[name] for name in self.labelnames)
+        keys = self._series.get(labelvalues)
+        if keys is None:
+            bucket_keys = tuple(
+                self._key(f"bucket:{index}", labels)
+                for index in range(len(self.buckets))
+            )
+            keys = self._series[labelvalues] = (
+                bucket_keys,
+                self._key("sum", labels),
+                self._key("count", labels),
+            )
+        return keys
+
+    def observe(self, value, **labels):
+        store = get_store()
+        if store is None:
+            return
+        bucket_keys, sum_key, count_key = self._series_keys(labels)
+        # Only the bucket of the value is counted, the endpoint adds them up
+        bucket_key = bucket_keys[bisect.bisect_left(self.buckets, value)]
+        store.add_many(((bucket_key, 1), (sum_key, value), (count_key, 1)))
+
+    def samples(self, values):
+        series = {}
+        for (suffix, *labelvalues), value in values.items():
+            series.setdefault(tuple(labelvalues), {})[suffix] = value
+        for labelvalues, samples in sorted(series.items()):
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets):
+                cumulative += samples.get(f"bucket:{index}", 0.0)
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield "_sum", labels, samples.get("sum", 0.0)
+            yield "_count", labels, samples.get("count", 0.0)
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect(directory=None):
+    """
+    Returns the samples of all the processes that wrote to ``directory``,
+    added up by metric name and ``(suffix, *label values)``.
+    """
+    directory = Path(directory or settings.METRICS["DIRECTORY"])
+    values = {}
+    for path in sorted(directory.glob(f"*{FILE_SUFFIX}")):
+        try:
+            running = _is_running(int(path.stem))
+        except ValueError:
+            continue
+        for key, value in MetricsFile.read(path).items():
+            name, *sample = json.loads(key)
+            metric = _registry.get(name)
+            if metric is None or (metric.type == "gauge" and not running):
+                continue
+            samples = values.setdefault(name, {})
+            sample = tuple(sample)
+            samples[sample] = samples.get(sample, 0.0) + value
+    return values
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def generate_latest(directory=None):
+    """
+    Returns the metrics of all the processes in the Prometheus text format.
+    """
+    lines = []
+    for name, values in sorted(collect(directory).items()):
+        metric = _registry[name]
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.type}")
+        for suffix, labels, value in metric.samples(values):
+            sample = name + suffix
+            if labels:
+                sample += "{%s}" % ",".join(
+                    f'{label}="{_escape(labelvalue)}"'
+                    for label, labelvalue in labels.items()
+                )
+            lines.append(f"{sample} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent serving requests, by view.",
+    ["view", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_CONNECTIONS_OPENED = Counter(
+    "db_connections_opened_total",
+    "Database connections opened, by database alias.",
+    ["alias"],
+)
+DB_CONNECTIONS_OPEN = Gauge(
+    "db_connections_open",
+    "Database connections held open after a request, by database alias.",
+    ["alias"],
+)
+
+# The aliases with a connection open in the current thread
+_connections = threading.local()
+
+
+def _open_aliases():
+    if not hasattr(_connections, "aliases"):
+        _connections.aliases = set()
+    return _connections.aliases
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    DB_CONNECTIONS_OPENED.inc(alias=connection.alias)
+    aliases = _open_aliases()
+    if connection.alias not in aliases:
+        aliases.add(connection.alias)
+        DB_CONNECTIONS_OPEN.inc(alias=connection.alias)
+
+
+@receiver(request_finished)
+def count_closed_connections(sender, **kwargs):
+    # Connected after close_old_connections(), so it sees the connections
+    # closed at the end of the request
+    aliases = _open_aliases()
+    for alias in list(aliases):
+        if connections[alias].connection is None:
+            aliases.discard(alias)
+            DB_CONNECTIONS_OPEN.dec(alias=alias)
@@ -0,0 +1,414 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import Signal, receiver
+from django.utils.module_loading import import_string
+
+from .metrics import REQUEST_LATENCY
+from .profiling import get_sampler, is_valid_trigger, write_profile
+
+logger = logging.getLogger(__name__)
+
+# Sent by QueryCountMiddleware after every request, with the view_name and
+# the QueryStats of the request
+query_stats_recorded = Signal()
+
+
+class QueryStats:
+    """
+    Counts the SQL queries run through the database connections it's
+    installed on as an execute wrapper, their total duration and the
+    statements run more than once, e.g. by an N+1 loop.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """
+        The number of queries that repeated an earlier statement, with the
+        same or different parameters.
+        """
+        return self.queries - len(self.statements)
+
+    def most_duplicated(self):
+        """
+        Returns the most repeated statement and its count, or ``None``.
+        """
+        if not self.duplicates:
+            return None
+        return self.statements.most_common(1)[0]
+
+
+# The QueryStats of the request being handled. A context variable rather than
+# an execute wrapper per request, as the queries of async views run in the
+# threads of sync_to_async(), which copies the context into them
+_query_stats = ContextVar("query_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper of every connection, counting the query in the
+    ``QueryStats`` of the current request, if any.
+    """
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def _install_query_recorder(sender, connection, **kwargs):
+    if settings.QUERY_COUNT["ENABLED"]:
+        install_query_recorder(connection)
+
+
+class HybridMiddleware:
+    """
+    Base class of middleware that run in the mode of the handler they wrap,
+    like Django's ``MiddlewareMixin``. Under ASGI ``__call__()`` hands over
+    to the coroutine ``__acall__()``, so the async views aren't adapted to
+    a thread per request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # What asgiref's markcoroutinefunction() does, which Django 4.1
+            # doesn't require
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        else:
+            self._is_coroutine = None
+
+
+def get_view_name(request):
+    """
+    Returns the ``name`` of the view class that handled ``request``, or the
+    URL name of other views.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+    view_class = getattr(match.func, "view_class", None)
+    return getattr(view_class, "name", None) or match.view_name
+
+
+class QueryCountMiddleware(HybridMiddleware):
+    """
+    Records the SQL queries of every request, per view, see ``QueryStats``.
+
+    With ``DEBUG`` they are sent in the ``X-DB-Queries``, ``X-DB-Time`` (in
+    milliseconds) and ``X-DB-Duplicate-Queries`` response headers, otherwise
+    logged by the ``conf.middleware`` logger. Queries run while a streaming
+    response is sent aren't counted.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_COUNT["ENABLED"]:
+            raise MiddlewareNotUsed()
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if self._is_coroutine:
+            return self.__acall__(request)
+        for connection in connections.all():
+            install_query_recorder(connection)
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        return self.record(request, response, stats)
+
+    async def __acall__(self, request):
+        # The connections of the threads running the queries get the recorder
+        # when they connect
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        return self.record(request, response, stats)
+
+    def record(self, request, response, stats):
+        view_name = get_view_name(request)
+        query_stats_recorded.send(
+            sender=self.__class__, request=request, view_name=view_name, stats=stats
+        )
+        if settings.DEBUG:
+            response["X-DB-Queries"] = str(stats.queries)
+            response["X-DB-Time"] = f"{stats.duration * 1000:.2f}"
+            response["X-DB-Duplicate-Queries"] = str(stats.duplicates)
+        else:
+            message = "view=%s status=%s queries=%d db_ms=%.2f duplicates=%d"
+            args = [
+                view_name,
+                response.status_code,
+                stats.queries,
+                stats.duration * 1000,
+                stats.duplicates,
+            ]
+            most_duplicated = stats.most_duplicated()
+            if most_duplicated is not None:
+                message += ' most_duplicated="%s" x%d'
+                args.extend(most_duplicated)
+            logger.info(message, *args)
+        return response
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """
+    Observes the time spent on every request in the
+    ``http_request_duration_seconds`` histogram, by view name, see
+    ``conf.metrics``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS["ENABLED"]:
+            raise MiddlewareNotUsed()
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if self._is_coroutine:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    def observe(self, request, response, started):
+        view_name = get_view_name(request)
+        if view_name is not None:
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started,
+                view=view_name,
+                method=request.method,
+                status=response.status_code,
+            )
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """
+    Profiles 1 in ``PROFILING["SAMPLE_RATE"]`` requests, and the requests
+    with a signed ``PROFILING["HEADER"]`` header (see
+    ``conf.profiling.make_trigger()``), with the sampling profiler of
+    ``conf.profiling``, and writes a profile per request.
+
+    Only the thread running the middleware is sampled. Under ASGI that's
+    the event loop, which runs the async views but also the tasks of other
+    requests, so it's sampled for one request at a time.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING["ENABLED"]:
+            raise MiddlewareNotUsed()
+        super().__init__(get_response)
+        self.requests = itertools.count(1)
+
+    def should_profile(self, request):
+        config = settings.PROFILING
+        trigger = request.headers.get(config["HEADER"])
+        if trigger is not None and is_valid_trigger(trigger):
+            return True
+        rate = config["SAMPLE_RATE"]
+        return bool(rate) and next(self.requests) % rate == 0
+
+    def __call__(self, request):
+        if self._is_coroutine:
+            return self.__acall__(request)
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        sampler = get_sampler()
+        thread_id = threading.get_ident()
+        sampler.start(thread_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop(thread_id)
+        self.write(request, stacks)
+        return response
+
+    async def __acall__(self, request):
+        if not self.should_profile(request):
+            return await self.get_response(request)
+
+        sampler = get_sampler()
+        thread_id = threading.get_ident()
+        if not sampler.start(thread_id):
+            # The event loop is sampled for another request
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            stacks = sampler.stop(thread_id)
+        self.write(request, stacks)
+        return response
+
+    def write(self, request, stacks):
+        if stacks:
+            write_profile(get_view_name(request) or "unresolved", stacks)
+
+
+class MiddlewareStack:
+    """
+    A chain of middleware in front of ``get_response`` and their hooks, built
+    like Django builds ``MIDDLEWARE``: for an async handler with
+    ``is_async``, the middleware that can't run async are adapted.
+    """
+
+    def __init__(self, middleware_paths, get_response, is_async=False):
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.exception_middleware = []
+
+        # For its adapt_method_mode(), which only depends on the arguments
+        adapter = BaseHandler()
+        handler = get_response
+        handler_is_async = is_async
+        for middleware_path in reversed(middleware_paths):
+            middleware = import_string(middleware_path)
+            if not handler_is_async and getattr(middleware, "sync_capable", True):
+                middleware_is_async = False
+            else:
+                middleware_is_async = getattr(middleware, "async_capable", False)
+            adapted_handler = adapter.adapt_method_mode(
+                middleware_is_async,
+                handler,
+                handler_is_async,
+                debug=settings.DEBUG,
+                name=f"middleware {middleware_path}",
+            )
+            try:
+                instance = middleware(adapted_handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(instance, "process_view"):
+                self.view_middleware.insert(
+                    0, adapter.adapt_method_mode(is_async, instance.process_view)
+                )
+            if hasattr(instance, "process_template_response"):
+                self.template_response_middleware.append(
+                    adapter.adapt_method_mode(
+                        is_async, instance.process_template_response
+                    )
+                )
+            if hasattr(instance, "process_exception"):
+                # Django runs the exception hooks synchronously in both modes
+                self.exception_middleware.append(
+                    adapter.adapt_method_mode(False, instance.process_exception)
+                )
+            handler = convert_exception_to_response(instance)
+            handler_is_async = middleware_is_async
+        self.handler = adapter.adapt_method_mode(is_async, handler, handler_is_async)
+
+
+class RouteScopedMiddleware(HybridMiddleware):
+    """
+    Runs the middleware of ``settings.ROUTE_MIDDLEWARE`` for the longest
+    prefix of the request path, in its place in ``MIDDLEWARE``, so that e.g.
+    the API doesn't pay for the session and CSRF middleware of the admin.
+    Paths without a matching prefix run none.
+
+    Under ASGI the chains, ``__call__()`` and the view and template response
+    hooks are async.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        is_async = bool(self._is_coroutine)
+        self.stacks = [
+            (prefix, MiddlewareStack(middleware_paths, get_response, is_async))
+            for prefix, middleware_paths in sorted(
+                settings.ROUTE_MIDDLEWARE.items(),
+                key=lambda route: len(route[0]),
+                reverse=True,
+            )
+        ]
+        self.empty_stack = MiddlewareStack([], get_response, is_async)
+        if is_async:
+            # Django awaits the hooks of async middleware in an async handler
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def get_stack(self, request):
+        for prefix, stack in self.stacks:
+            if request.path_info.startswith(prefix):
+                return stack
+        return self.empty_stack
+
+    def __call__(self, request):
+        # The handler of an async stack returns a coroutine
+        return self.get_stack(request).handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for process_view in self.get_stack(request).view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        for process_view in self.get_stack(request).view_middleware:
+            response = await process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        stack = self.get_stack(request)
+        for process_template_response in stack.template_response_middleware:
+            response = process_template_response(request, response)
+        return response
+
+    async def aprocess_template_response(self, request, response):
+        stack = self.get_stack(request)
+        for process_template_response in stack.template_response_middleware:
+            response = await process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        for process_exception in self.get_stack(request).exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+        return None
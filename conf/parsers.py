@@ -0,0 +1,44 @@
+"""
+JSON parsing with orjson, when it's installed.
+
+``FastJSONParser`` parses UTF-8 request bodies with orjson, which rejects
+``NaN`` and ``Infinity`` like the strict ``JSONParser``. It falls back to
+``JSONParser`` when orjson isn't installed, for other encodings and for
+bodies with integers orjson would read as floats.
+"""
+import io
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# orjson reads integers beyond 64 bits as floats. Runs of 19 digits are
+# found by mapping digits to "0" and everything else to " ", which is much
+# faster than a regular expression on large bodies.
+DIGITS = bytes(ord("0") if byte in b"0123456789" else ord(" ") for byte in range(256))
+LONG_DIGITS = b"0" * 19
+
+
+class FastJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if (
+            orjson is None
+            or not self.strict
+            or encoding.lower() not in ("utf-8", "utf8")
+        ):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if LONG_DIGITS in body.translate(DIGITS):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
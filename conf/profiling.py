@@ -0,0 +1,184 @@
+"""
+Sampling profiler for individual requests.
+
+A request picked by ``ProfilingMiddleware`` registers its thread with the
+process ``Sampler``, a daemon thread that records the stack of every
+registered thread each ``PROFILING["INTERVAL"]`` seconds and sleeps when no
+request is profiled. Requests that aren't profiled pay nothing but the
+sampling decision.
+
+Every profile is written to ``PROFILING["DIRECTORY"]`` in the folded stack
+format read by flamegraph.pl, speedscope and inferno, one file per request.
+The root frame of every stack is ``view:<view name>``, so the profiles of
+different views stay apart when files are merged.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+FILE_SUFFIX = ".folded"
+SIGNING_SALT = "conf.profiling.trigger"
+
+
+class Sampler:
+    """
+    Records the stacks of the registered threads every ``interval`` seconds.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+        self._labels = {}
+
+    def start(self, thread_id):
+        """
+        Registers ``thread_id``. Returns ``False`` if it already is.
+        """
+        with self._lock:
+            if thread_id in self._profiles:
+                return False
+            self._profiles[thread_id] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._thread.start()
+            self._active.set()
+        return True
+
+    def stop(self, thread_id):
+        """
+        Unregisters ``thread_id`` and returns its stacks with their sample
+        counts.
+        """
+        with self._lock:
+            stacks = self._profiles.pop(thread_id, Counter())
+            if not self._profiles:
+                self._active.clear()
+        return stacks
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            for path in sorted(sys.path, key=len, reverse=True):
+                if path and filename.startswith(path + os.sep):
+                    filename = filename[len(path) + 1 :]  # noqa: E203
+                    break
+            name = getattr(code, "co_qualname", code.co_name)
+            # ";" separates the frames of a folded stack
+            label = f"{name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _stack(self, frame):
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, stacks in self._profiles.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[self._stack(frame)] += 1
+            del frames
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = Sampler(settings.PROFILING["INTERVAL"])
+    return _sampler
+
+
+def _forget_sampler():
+    # The sampler thread doesn't survive a fork
+    global _sampler
+    _sampler = None
+
+
+os.register_at_fork(after_in_child=_forget_sampler)
+
+
+@receiver(setting_changed)
+def reset_sampler(*, setting, **kwargs):
+    if setting == "PROFILING":
+        _forget_sampler()
+
+
+def make_trigger():
+    """
+    Returns a value of the ``PROFILING["HEADER"]`` header that has the
+    request profiled, valid for ``PROFILING["TRIGGER_MAX_AGE"]`` seconds.
+    """
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign("profile")
+
+
+def is_valid_trigger(value):
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            value, max_age=settings.PROFILING["TRIGGER_MAX_AGE"]
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def write_profile(view_name, stacks, directory=None):
+    """
+    Writes ``stacks`` in the folded format, most sampled first and up to
+    ``PROFILING["MAX_FILE_BYTES"]``, then deletes the oldest profiles beyond
+    ``PROFILING["MAX_FILES"]``. Returns the path of the profile.
+    """
+    config = settings.PROFILING
+    directory = Path(directory or config["DIRECTORY"])
+    directory.mkdir(parents=True, exist_ok=True)
+    root = f"view:{view_name}"
+
+    lines, size = [], 0
+    for stack, count in stacks.most_common():
+        line = f"{root};{stack} {count}\n"
+        size += len(line.encode())
+        if size > config["MAX_FILE_BYTES"]:
+            break
+        lines.append(line)
+
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**9:09d}"
+    path = directory / f"{name}-{view_name}-{os.getpid()}{FILE_SUFFIX}"
+    path.write_text("".join(lines))
+
+    profiles = []
+    for profile in directory.glob(f"*{FILE_SUFFIX}"):
+        try:
+            profiles.append((profile.stat().st_mtime, profile))
+        except FileNotFoundError:
+            # Rotated by another process
+            continue
+    profiles.sort()
+    for _mtime, profile in profiles[: max(0, len(profiles) - config["MAX_FILES"])]:
+        profile.unlink(missing_ok=True)
+    return path
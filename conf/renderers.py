@@ -0,0 +1,48 @@
+"""
+JSON rendering with orjson, when it's installed.
+
+``FastJSONRenderer`` writes the same bytes as DRF's ``JSONRenderer`` with the
+default settings (compact, ``UNICODE_JSON``), with orjson doing the encoding
+and DRF's encoder converting the types orjson leaves to it: datetimes, times
+and dates (so UTC datetimes keep their "Z"), decimals, lazy strings, query
+sets and the like. It falls back to ``JSONRenderer`` when orjson isn't
+installed, for indented or ASCII-only output, and for data orjson can't
+encode, e.g. integers beyond 64 bits.
+
+Unlike ``JSONRenderer``, orjson writes floats in exponent notation without a
+"+" (``1e16``) and non-finite floats as ``null``.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    options = 0
+    if orjson is not None:
+        # Datetimes, times and dates are formatted by the DRF encoder
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default, option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes the line and paragraph separators for JavaScript
+        if b"\xe2\x80" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028")
+            ret = ret.replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
@@ -0,0 +1,89 @@
+"""
+The OpenAPI schema of the API, generated once by the
+``generate_openapi_schema`` management command and served from the file it
+writes, ``settings.OPENAPI_SCHEMA["PATH"]``, instead of walking every view on
+each request of the Swagger UI.
+
+With ``DEBUG`` the schema is generated again for every request, so changes to
+the views show up without running the command. drf_yasg is only imported to
+generate the schema.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import namedtuple
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+
+from .docs import apply_schema_overrides
+
+# The schema as served: its JSON, gzipped JSON and ETag
+Schema = namedtuple("Schema", ["content", "gzipped", "etag"])
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def generate_schema():
+    """
+    Returns the OpenAPI schema of all the API views, as JSON.
+    """
+    from drf_yasg.app_settings import swagger_settings
+    from drf_yasg.codecs import OpenAPICodecJson
+
+    # The views must be imported for their swagger_auto_schema to be applied
+    import_module(settings.ROOT_URLCONF)
+    apply_schema_overrides()
+    generator = swagger_settings.DEFAULT_GENERATOR_CLASS(
+        swagger_settings.DEFAULT_INFO, ""
+    )
+    return OpenAPICodecJson(validators=[]).encode(
+        generator.get_schema(request=None, public=True)
+    )
+
+
+def write_schema(path=None):
+    """
+    Generates the schema and replaces the file at ``path`` with it, so that
+    workers never read a partial file. Returns the path.
+    """
+    path = Path(path or settings.OPENAPI_SCHEMA["PATH"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}")
+    temporary.write_bytes(generate_schema())
+    os.replace(temporary, path)
+    return path
+
+
+def _schema(content):
+    return Schema(
+        content=content,
+        gzipped=gzip.compress(content, mtime=0),
+        etag=hashlib.sha256(content).hexdigest()[:32],
+    )
+
+
+def get_schema():
+    """
+    Returns the ``Schema`` to serve, or ``None`` when the schema file is
+    missing. The file is read and compressed once per process, and again
+    when it's replaced.
+    """
+    global _cache
+    if settings.DEBUG:
+        return _schema(generate_schema())
+
+    path = Path(settings.OPENAPI_SCHEMA["PATH"])
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    cached = _cache
+    if cached is None or cached[0] != key:
+        with _cache_lock:
+            cached = _cache = (key, _schema(path.read_bytes()))
+    return cached[1]
@@ -35,6 +35,25 @@ env = environ.Env(
     JWT_SECRET_KEY=(str, "jwt-secret-key"),
     DB_URL=(str, f"sqlite:////{os.path.join(BASE_DIR, 'db.sqlite3')}"),
     ALLOWED_HOSTS=(str, "*"),
+    CACHE_URL=(str, "locmemcache://"),
+    JWT_AUTHENTICATION_CLASS=(str, "auth.authentication.RevocableJWTAuthentication"),
+    TOKEN_REVOCATION_BACKEND=(str, "auth.revocation.ORMRevocationBackend"),
+    BLACKLIST_INDEX_ENABLED=(bool, True),
+    BLACKLIST_INDEX_PATH=(str, os.path.join(BASE_DIR, "var", "blacklist.idx")),
+    PASSWORD_HASHING_POOL_ENABLED=(bool, False),
+    LOGIN_IP_THROTTLE_RATE=(str, "60/min"),
+    LOGIN_USERNAME_THROTTLE_RATE=(str, "10/min"),
+    NUM_PROXIES=(int, None),
+    ACCOUNT_SOFT_DELETE=(bool, False),
+    QUERY_COUNT_ENABLED=(bool, True),
+    METRICS_ENABLED=(bool, True),
+    METRICS_DIRECTORY=(str, os.path.join(BASE_DIR, "var", "metrics")),
+    METRICS_TOKEN=(str, ""),
+    PROFILING_ENABLED=(bool, False),
+    PROFILING_SAMPLE_RATE=(int, 0),
+    PROFILING_DIRECTORY=(str, os.path.join(BASE_DIR, "var", "profiles")),
+    OPENAPI_SCHEMA_PATH=(str, os.path.join(BASE_DIR, "var", "openapi.json")),
+    API_DOCS_ENABLED=(bool, True),
 )
 
 # Read env. variables from environment file
@@ -50,6 +69,11 @@ ALLOWED_HOSTS = []
 
 ALLOWED_HOSTS = env("ALLOWED_HOSTS").split()
 
+# Swagger UI and OpenAPI schema endpoints, see conf/docs.py. Without them,
+# workers never import drf_yasg
+API_DOCS = {
+    "ENABLED": env("API_DOCS_ENABLED"),
+}
 
 # Application definition
 
@@ -60,7 +84,6 @@ INSTALLED_APPS = [
     "rest_framework",
     "rest_framework_simplejwt",
     "rest_framework_simplejwt.token_blacklist",
-    "drf_yasg",
     # Django Built-Ins
     "django.contrib.admin",
     "django.contrib.auth",
@@ -70,19 +93,97 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
 ]
 
+if API_DOCS["ENABLED"]:
+    # Templates and static files of the Swagger UI
+    INSTALLED_APPS.append("drf_yasg")
+
 if DEBUG:
     INSTALLED_APPS.append("django_extensions")
 
 MIDDLEWARE = [
+    "conf.middleware.MetricsMiddleware",
+    "conf.middleware.ProfilingMiddleware",
+    "conf.middleware.QueryCountMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
-    "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "conf.middleware.RouteScopedMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# The middleware run in place of conf.middleware.RouteScopedMiddleware, for the
+# longest of these prefixes of the request path. The JWT API is stateless and
+# skips sessions, CSRF, authentication and messages, which the admin and the
+# Swagger UI (logged in to with the admin's session) need
+ROUTE_MIDDLEWARE = {
+    "/": [
+        "django.contrib.sessions.middleware.SessionMiddleware",
+        "django.middleware.common.CommonMiddleware",
+        "django.middleware.csrf.CsrfViewMiddleware",
+        "django.contrib.auth.middleware.AuthenticationMiddleware",
+        "django.contrib.messages.middleware.MessageMiddleware",
+    ],
+    "/api/": [
+        "django.middleware.common.CommonMiddleware",
+    ],
+}
+ROUTE_MIDDLEWARE[f"/api/{API_VERSION}/swagger/"] = ROUTE_MIDDLEWARE["/"]
+
+# The admin checks look for the session, authentication and messages middleware
+# in MIDDLEWARE, while RouteScopedMiddleware runs them for the admin's path
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
+
+# SQL queries, DB time and repeated statements per request, see
+# conf/middleware.py. Sent as X-DB-* response headers with DEBUG, logged by the
+# conf.middleware logger otherwise
+QUERY_COUNT = {
+    "ENABLED": env("QUERY_COUNT_ENABLED"),
+}
+
+# Prometheus metrics of all the worker processes at /metrics, see
+# conf/metrics.py
+METRICS = {
+    "ENABLED": env("METRICS_ENABLED"),
+    # Every process writes its metrics to a file in this directory, which must
+    # be emptied before the server starts
+    "DIRECTORY": env("METRICS_DIRECTORY"),
+    # Bearer token the scraper has to send, if set
+    "TOKEN": env("METRICS_TOKEN"),
+}
+
+# Sampling profiler for requests, see conf/profiling.py. Profiles are written
+# to DIRECTORY in the folded stack format, for flamegraph.pl or speedscope
+PROFILING = {
+    "ENABLED": env("PROFILING_ENABLED"),
+    # Profile 1 in SAMPLE_RATE requests, 0 to only profile requests with a
+    # trigger header
+    "SAMPLE_RATE": env("PROFILING_SAMPLE_RATE"),
+    # Requests with a value of this header signed by conf.profiling.make_trigger()
+    # are profiled, for TRIGGER_MAX_AGE seconds after it was signed
+    "HEADER": "X-Profile",
+    "TRIGGER_MAX_AGE": 600,
+    # Seconds between samples
+    "INTERVAL": 0.002,
+    "DIRECTORY": env("PROFILING_DIRECTORY"),
+    # The oldest profiles beyond MAX_FILES are deleted, and the least sampled
+    # stacks of a profile are left out beyond MAX_FILE_BYTES
+    "MAX_FILES": 500,
+    "MAX_FILE_BYTES": 256 * 1024,
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "conf.middleware": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
 ROOT_URLCONF = "conf.urls"
 
 APPEND_SLASH = False
@@ -114,12 +215,31 @@ DB_URL = env("DB_URL")
 DEFAULT_DB = dj_database_url.config(default=DB_URL)
 DATABASES = {"default": DEFAULT_DB}
 
+# Cache
+# Use a cache shared by all workers (e.g. redis://) in production, so cached
+# token epochs are invalidated everywhere at once
+CACHES = {"default": env.cache("CACHE_URL")}
+
 # Authentication
 AUTH_USER_MODEL = "account.User"
 AUTHENTICATION_BACKENDS = [
-    "django.contrib.auth.backends.ModelBackend",
+    # ModelBackend that hashes in the password hashing pool when enabled
+    "auth.backends.PooledModelBackend",
 ]
 
+# Password hashing in a bounded process pool, see auth/hashing.py
+PASSWORD_HASHING_POOL = {
+    "ENABLED": env("PASSWORD_HASHING_POOL_ENABLED"),
+    # Defaults to the number of CPUs
+    "MAX_WORKERS": None,
+    # Hashes queued beyond the busy workers before requests are rejected
+    "MAX_PENDING": 64,
+    # Seconds a request waits for its hash
+    "TIMEOUT": 10,
+    # Forking a threaded worker process is unsafe, fork from a clean server
+    "START_METHOD": "forkserver",
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -166,15 +286,30 @@ MEDIA_ROOT = BASE_DIR / "mediafiles"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
+    # orjson based JSON, with the output of DRF's JSONRenderer, see
+    # conf/renderers.py and conf/parsers.py
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "conf.renderers.FastJSONRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "conf.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    # Set to auth.authentication.ClaimsJWTAuthentication to authorize requests
+    # from the token claims without loading the user row
+    "DEFAULT_AUTHENTICATION_CLASSES": (env("JWT_AUTHENTICATION_CLASS"),),
+    # Login throttling, see auth/throttling.py. An empty rate disables a throttle.
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": env("LOGIN_IP_THROTTLE_RATE") or None,
+        "login_username": env("LOGIN_USERNAME_THROTTLE_RATE") or None,
+    },
+    # Number of proxies in front of the application, whose X-Forwarded-For
+    # entries identify the client IP address
+    "NUM_PROXIES": env("NUM_PROXIES"),
 }
 
 SIMPLE_JWT = {
@@ -204,10 +339,83 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(hours=1),
 }
 
+# Account list pagination, see account/pagination.py. Clients may ask for
+# up to MAX_PAGE_SIZE accounts per page with ?page_size=
+ACCOUNT_LIST_PAGINATION = {
+    "PAGE_SIZE": 100,
+    "MAX_PAGE_SIZE": 1000,
+}
+
+# Rows fetched from the database and written to the response at a time by
+# the streaming account export, see account/views.py
+ACCOUNT_EXPORT = {
+    "CHUNK_SIZE": 2000,
+}
+
+# Bulk account changes, see account/services.py. Requests may hold up to
+# MAX_ITEMS accounts, written BATCH_SIZE rows per statement
+ACCOUNT_BULK = {
+    "MAX_ITEMS": 10000,
+    "BATCH_SIZE": 500,
+}
+
+# Account search backend, see account/search.py: "fts5" (SQLite), "trigram"
+# (PostgreSQL), "prefix" (any database) or "auto" for the best available one
+ACCOUNT_SEARCH_BACKEND = "auto"
+
+# Deleted accounts are only marked deleted and deactivated, and removed later
+# by the reap_accounts management command, see account/services.py
+ACCOUNT_SOFT_DELETE = env("ACCOUNT_SOFT_DELETE")
+
+# Seconds a user's token epoch is cached for, see auth/epochs.py
+TOKEN_EPOCH_CACHE_TIMEOUT = 60
+
+# Seconds the account snapshot behind the ETag and Last-Modified headers of the
+# account views is cached for, see account/views.py. It shares the cache entry
+# of the claims authentication snapshot, which changes and deletes drop
+ACCOUNT_ETAG_CACHE_TIMEOUT = 30
+
+# Claims backed authentication, see auth/authentication.py
+CLAIMS_AUTHENTICATION = {
+    # Seconds a snapshot of the account is cached for, 0 trusts the token
+    # claims until the token expires
+    "SNAPSHOT_TIMEOUT": 30,
+}
+
+# Storage of revoked (blacklisted) tokens, see auth/revocation.py
+# auth.revocation.CacheRevocationBackend keeps them in the cache instead of the
+# token_blacklist tables
+TOKEN_REVOCATION_BACKEND = {
+    "BACKEND": env("TOKEN_REVOCATION_BACKEND"),
+    "OPTIONS": {},
+}
+
+# Worker-wide Bloom filter index in front of the ORM revocation backend, see
+# auth/blacklist.py
+BLACKLIST_INDEX = {
+    "ENABLED": env("BLACKLIST_INDEX_ENABLED"),
+    # Snapshot file shared by all worker processes on the host
+    "PATH": env("BLACKLIST_INDEX_PATH"),
+    "CAPACITY": 1_000_000,
+    "ERROR_RATE": 0.001,
+    # Seconds between incremental refreshes from the database
+    "REFRESH_INTERVAL": 30,
+    # Seconds between full rebuilds, which also drop expired tokens
+    "REBUILD_INTERVAL": 3600,
+}
+
 SWAGGER_SETTINGS = {
-    "DEFAULT_INFO": "conf.urls.api_info",
+    "DEFAULT_INFO": "conf.openapi.api_info",
     "SECURITY_DEFINITIONS": {
         "Bearer": {"type": "apiKey", "name": "Authorization", "in": "header"},
     },
     "DISPLAY_OPERATION_ID": False,
+    # The Swagger UI loads the schema written by generate_openapi_schema
+    "SPEC_URL": "openapi_schema",
+}
+
+# OpenAPI schema file, written by the generate_openapi_schema command at build
+# or deploy time and served by conf.views.OpenAPISchemaView, see conf/schema.py
+OPENAPI_SCHEMA = {
+    "PATH": env("OPENAPI_SCHEMA_PATH"),
 }
@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+
+from conf.schema import generate_schema
+
+WORKER = """
+import json, sys
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+
+get_wsgi_application()
+get_resolver().url_patterns
+print(json.dumps(sorted(name for name in sys.modules if name.startswith("drf_yasg"))))
+"""
+
+
+def drf_yasg_modules(docs_enabled):
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "conf.settings",
+        "DEBUG": "false",
+        "API_DOCS_ENABLED": docs_enabled,
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER],
+        cwd=settings.BASE_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "docs_enabled, modules", [("true", ["drf_yasg"]), ("false", [])]
+)
+def test_workers_dont_import_drf_yasg(docs_enabled, modules):
+    # Only the app package, for the templates of the Swagger UI
+    assert drf_yasg_modules(docs_enabled) == modules
+
+
+def test_schema_overrides():
+    schema = json.loads(generate_schema())
+    operation = schema["paths"]["/v1/account/management/bulk/create/"]["post"]
+    assert operation["summary"] == "Bulk Create Accounts"
+    assert operation["tags"] == ["account"]
+    (mode,) = [
+        parameter for parameter in operation["parameters"] if parameter["in"] == "query"
+    ]
+    assert mode["name"] == "mode"
+    assert mode["enum"] == ["atomic", "best_effort"]
@@ -0,0 +1,86 @@
+import io
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from conf import parsers
+from conf.parsers import FastJSONParser
+from conf.renderers import FastJSONRenderer
+
+PAYLOADS = [
+    None,
+    {"access": "header.payload.signature", "refresh": "header.payload.signature"},
+    ReturnList(
+        [
+            ReturnDict(
+                {
+                    "id": 1,
+                    "username": "jürgen",
+                    "last_login": datetime(
+                        2022, 12, 24, 18, 30, 5, 1, tzinfo=timezone.utc
+                    ),
+                    "is_active": True,
+                },
+                serializer=None,
+            )
+        ],
+        serializer=None,
+    ),
+    {
+        "naive": datetime(2022, 12, 24, 18, 30),
+        "offset": datetime(2022, 12, 24, 18, 30, tzinfo=timezone(timedelta(hours=1))),
+        "date": date(2022, 12, 24),
+        "time": time(18, 30),
+        "duration": timedelta(minutes=15),
+        "decimal": Decimal("1.50"),
+        "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "lazy": gettext_lazy("Account not found."),
+        "separators": "\u2028\u2029",
+        "control": '\x00\n\t"\\',
+        "big": 2**70,
+        1: [1.5, -0.0, None, (1, 2)],
+    },
+]
+
+
+@pytest.mark.parametrize("data", PAYLOADS)
+def test_renders_like_json_renderer(data):
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_renders_indented_like_json_renderer():
+    data = {"detail": "Not found."}
+    media_type = "application/json; indent=4"
+    assert FastJSONRenderer().render(data, media_type) == JSONRenderer().render(
+        data, media_type
+    )
+
+
+@pytest.mark.parametrize("installed", [True, False])
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'{"username": "j\\u00fcrgen", "ids": [1, 2, 3], "active": true}',
+        '{"username": "jürgen", "ids": [12345678901234567890123]}'.encode(),
+        b"[]",
+    ],
+)
+def test_parses_like_json_parser(monkeypatch, installed, body):
+    if not installed:
+        monkeypatch.setattr(parsers, "orjson", None)
+    assert FastJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(
+        io.BytesIO(body)
+    )
+
+
+@pytest.mark.parametrize("body", [b"{", b'{"value": NaN}', b""])
+def test_invalid_json(body):
+    with pytest.raises(ParseError):
+        FastJSONParser().parse(io.BytesIO(body))
@@ -0,0 +1,121 @@
+import os
+import threading
+
+import pytest
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+
+from conf import metrics
+from conf.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsFile,
+    generate_latest,
+    get_store,
+)
+
+REQUESTS = Counter("test_requests_total", "Requests.", ["view"])
+WORKERS = Gauge("test_workers", "Workers.")
+LATENCY = Histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1))
+
+
+def test_metrics_file(tmp_path):
+    path = tmp_path / "1.metrics"
+    metrics_file = MetricsFile(path)
+    keys = [f"key-{index}" for index in range(5000)]
+    for key in keys:
+        metrics_file.add(key, 1.5)
+    metrics_file.add(keys[0], 1)
+    metrics_file.set(keys[1], 7)
+    metrics_file.close()
+
+    # The file grew past its initial size and is reopened with its values
+    values = MetricsFile.read(path)
+    assert len(values) == len(keys)
+    assert values[keys[0]] == 2.5
+    assert values[keys[1]] == 7
+    assert MetricsFile(path)._positions.keys() == values.keys()
+
+
+def test_processes_are_added_up(metrics_directory):
+    REQUESTS.inc(view="token_obtain_pair")
+    WORKERS.inc()
+    LATENCY.observe(0.05)
+    LATENCY.observe(0.5)
+    get_store()
+
+    pid = os.fork()
+    if pid == 0:
+        # An exited worker: its counts stay, its gauges don't
+        REQUESTS.inc(2, view="token_obtain_pair")
+        WORKERS.inc()
+        LATENCY.observe(5)
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    lines = generate_latest().splitlines()
+    assert "# TYPE test_requests_total counter" in lines
+    assert 'test_requests_total{view="token_obtain_pair"} 3' in lines
+    assert "test_workers 1" in lines
+    assert [line for line in lines if line.startswith("test_latency_seconds")] == [
+        'test_latency_seconds_bucket{le="0.1"} 1',
+        'test_latency_seconds_bucket{le="1"} 2',
+        'test_latency_seconds_bucket{le="+Inf"} 3',
+        "test_latency_seconds_sum 5.55",
+        "test_latency_seconds_count 3",
+    ]
+
+
+def test_reused_pid_resets_gauges(metrics_directory):
+    # The file of an exited process whose PID is reused
+    path = f"{metrics_directory}/{os.getpid()}{metrics.FILE_SUFFIX}"
+    os.makedirs(metrics_directory)
+    metrics_file = MetricsFile(path)
+    metrics_file.add(WORKERS._key("", {}), 3)
+    metrics_file.add(REQUESTS._key("", {"view": "account_list"}), 2)
+    metrics_file.close()
+
+    WORKERS.inc()
+    lines = generate_latest().splitlines()
+    assert "test_workers 1" in lines
+    assert 'test_requests_total{view="account_list"} 2' in lines
+
+
+def test_db_connections(monkeypatch, metrics_directory):
+    monkeypatch.setattr(metrics, "_connections", threading.local())
+    connection = connections["default"]
+    connection_created.send(sender=connection.__class__, connection=connection)
+    connection_created.send(sender=connection.__class__, connection=connection)
+    lines = generate_latest().splitlines()
+    assert 'db_connections_opened_total{alias="default"} 2' in lines
+    assert 'db_connections_open{alias="default"} 1' in lines
+
+
+class TestMetricsView:
+    @pytest.mark.django_db
+    def test_request_and_token_metrics(self, client, django_user_model):
+        django_user_model.objects.create_user(username="johndoe", password="secret")
+        client.post(
+            reverse("token_obtain_pair"),
+            {"username": "johndoe", "password": "secret"},
+        )
+        client.get(reverse("personal_account"), HTTP_AUTHORIZATION="Bearer invalid")
+
+        response = client.get(reverse("metrics"))
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+        lines = response.content.decode().splitlines()
+        assert (
+            'http_request_duration_seconds_count{view="token_obtain_pair",'
+            'method="POST",status="200"} 1'
+        ) in lines
+        assert 'auth_tokens_total{event="issued"} 1' in lines
+        assert 'auth_tokens_rejected_total{reason="token_not_valid"} 1' in lines
+
+    def test_token_required(self, settings, client):
+        settings.METRICS = {**settings.METRICS, "TOKEN": "secret"}
+        assert client.get(reverse("metrics")).status_code == 401
+        response = client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+        assert response.status_code == 200
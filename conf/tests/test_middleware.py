@@ -0,0 +1,131 @@
+import logging
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from conf.middleware import QueryStats
+
+
+@pytest.fixture
+def user_client(django_user_model):
+    user = django_user_model.objects.create_user(username="johndoe")
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}"
+    )
+    return client
+
+
+class TestQueryCountMiddleware:
+    @pytest.mark.django_db
+    def test_headers_in_debug_mode(self, settings, user_client):
+        settings.DEBUG = True
+        response = user_client.get(reverse("personal_account"))
+        assert response.status_code == 200
+        assert int(response["X-DB-Queries"]) > 0
+        assert float(response["X-DB-Time"]) >= 0
+        assert response["X-DB-Duplicate-Queries"] == "0"
+
+    @pytest.mark.django_db
+    def test_log_line_in_production(self, settings, user_client, caplog):
+        settings.DEBUG = False
+        with caplog.at_level(logging.INFO, logger="conf.middleware"):
+            response = user_client.get(reverse("personal_account"))
+        assert "X-DB-Queries" not in response
+        (record,) = caplog.records
+        assert record.getMessage().startswith("view=personal_account status=200 ")
+
+
+def test_duplicate_statements():
+    stats = QueryStats()
+
+    def execute(sql, params, many, context):
+        return None
+
+    for user_id in (1, 2, 3):
+        stats(execute, "SELECT * FROM account_user WHERE id = %s", [user_id], False, {})
+    stats(execute, "SELECT 1", [], False, {})
+    assert stats.queries == 4
+    assert stats.duplicates == 2
+    assert stats.most_duplicated() == ("SELECT * FROM account_user WHERE id = %s", 3)
+
+
+class TestRouteScopedMiddleware:
+    @pytest.mark.django_db
+    def test_api_skips_session_middleware(self, user_client):
+        response = user_client.get(reverse("api_welcome_view"))
+        assert response.status_code == 200
+        assert not hasattr(response.wsgi_request, "session")
+
+    @pytest.mark.django_db
+    def test_admin_keeps_full_stack(self, admin_client):
+        response = admin_client.get(reverse("admin:index"))
+        assert response.status_code == 200
+        assert response.wsgi_request.user.is_superuser
+
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(reverse("admin:login"), {"username": "admin"})
+        assert response.status_code == 403
+
+    def test_swagger_ui_keeps_full_stack(self, client):
+        response = client.get(reverse("schema-swagger-ui"))
+        assert hasattr(response.wsgi_request, "session")
+
+    def test_unmatched_path(self, settings, client):
+        settings.ROUTE_MIDDLEWARE = {
+            "/api/": ["django.contrib.sessions.middleware.SessionMiddleware"]
+        }
+        response = client.get(reverse("metrics"))
+        assert response.status_code == 200
+        assert not hasattr(response.wsgi_request, "session")
+
+    def test_system_checks(self):
+        # The admin checks don't see the middleware of ROUTE_MIDDLEWARE
+        call_command("check", fail_level="WARNING")
+
+
+class TestAsyncHandler:
+    @pytest.fixture(autouse=True)
+    def all_middleware(self, settings):
+        settings.DEBUG = True
+        settings.PROFILING = {**settings.PROFILING, "ENABLED": True}
+
+    @pytest.mark.django_db
+    def test_async_view_runs_without_adapting(self, caplog, django_user_model):
+        django_user_model.objects.create_user(
+            username="johndoe", password="super_secret_password"
+        )
+        client = AsyncClient()
+        with caplog.at_level(logging.DEBUG, logger="django.request"):
+            response = async_to_sync(client.post)(
+                reverse("async_token_obtain_pair"),
+                {"username": "johndoe", "password": "super_secret_password"},
+                content_type="application/json",
+            )
+        assert response.status_code == 200
+        # Every middleware ran async, none was adapted to a thread
+        assert not [
+            record for record in caplog.records if "adapted" in record.getMessage()
+        ]
+        assert not hasattr(response.asgi_request, "session")
+        # The queries of the async view run in another thread and are counted
+        assert int(response["X-DB-Queries"]) > 0
+
+    @pytest.mark.django_db
+    def test_admin_keeps_full_stack(self, admin_user):
+        client = AsyncClient()
+        client.force_login(admin_user)
+        response = async_to_sync(client.get)(reverse("admin:index"))
+        assert response.status_code == 200
+        assert response.asgi_request.user.is_superuser
+
+        client = AsyncClient(enforce_csrf_checks=True)
+        response = async_to_sync(client.post)(
+            reverse("admin:login"), {"username": "admin"}
+        )
+        assert response.status_code == 403
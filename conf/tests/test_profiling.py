@@ -0,0 +1,86 @@
+import os
+import time
+from collections import Counter
+from pathlib import Path
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+
+from conf import views
+from conf.profiling import make_trigger, write_profile
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.PROFILING = {
+        **settings.PROFILING,
+        "ENABLED": True,
+        "SAMPLE_RATE": 0,
+        "INTERVAL": 0.001,
+    }
+    return settings.PROFILING
+
+
+@pytest.fixture
+def slow_metrics_view(monkeypatch):
+    def slow_generate_latest():
+        time.sleep(0.05)
+        return ""
+
+    monkeypatch.setattr(views, "generate_latest", slow_generate_latest)
+
+
+def profiles(config):
+    return sorted(Path(config["DIRECTORY"]).glob("*.folded"))
+
+
+@pytest.mark.usefixtures("slow_metrics_view")
+class TestProfilingMiddleware:
+    def test_sampled_requests(self, profiling, client):
+        profiling["SAMPLE_RATE"] = 2
+        for _ in range(4):
+            assert client.get(reverse("metrics")).status_code == 200
+
+        assert len(profiles(profiling)) == 2
+        lines = profiles(profiling)[0].read_text().splitlines()
+        assert all(line.startswith("view:metrics;") for line in lines)
+        # Folded stacks, with their sample count
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert "slow_generate_latest (conf/tests/test_profiling.py:" in stack
+
+    def test_triggered_request(self, profiling, client):
+        client.get(reverse("metrics"), HTTP_X_PROFILE="invalid")
+        assert profiles(profiling) == []
+
+        client.get(reverse("metrics"), HTTP_X_PROFILE=make_trigger())
+        assert len(profiles(profiling)) == 1
+
+    def test_async_handler(self, profiling):
+        profiling["SAMPLE_RATE"] = 1
+        # The event loop running the async middleware is sampled
+        client = AsyncClient()
+        assert async_to_sync(client.get)(reverse("metrics")).status_code == 200
+        assert len(profiles(profiling)) == 1
+
+    def test_expired_trigger(self, profiling, client):
+        trigger = make_trigger()
+        profiling["TRIGGER_MAX_AGE"] = -1
+        client.get(reverse("metrics"), HTTP_X_PROFILE=trigger)
+        assert profiles(profiling) == []
+
+
+def test_rotation_and_size_cap(profiling):
+    profiling.update(MAX_FILES=3, MAX_FILE_BYTES=100)
+    stacks = Counter({f"frame-{index}": index for index in range(1, 20)})
+    paths = []
+    for index in range(5):
+        paths.append(write_profile("account_list", stacks))
+        os.utime(paths[-1], (index, index))
+
+    assert profiles(profiling) == sorted(paths[2:])
+    content = paths[-1].read_text()
+    assert len(content.encode()) <= 100
+    assert content.startswith("view:account_list;frame-19 19\n")
@@ -0,0 +1,76 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+
+@pytest.fixture
+def schema_path(openapi_schema_path):
+    return Path(openapi_schema_path)
+
+
+def test_generate_openapi_schema(schema_path):
+    call_command("generate_openapi_schema")
+    schema = json.loads(schema_path.read_bytes())
+    assert "/v1/account/" in schema["paths"]
+    assert "/v1/auth/token/" in schema["paths"]
+
+
+class TestOpenAPISchemaView:
+    def test_missing_schema(self, schema_path, client):
+        assert client.get(reverse("openapi_schema")).status_code == 404
+
+    def test_schema_file(self, schema_path, client):
+        schema_path.write_bytes(b'{"swagger": "2.0"}')
+        response = client.get(reverse("openapi_schema"))
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/json"
+        assert response.content == b'{"swagger": "2.0"}'
+
+        response = client.get(
+            reverse("openapi_schema"), HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        assert response.status_code == 304
+
+    def test_gzip(self, schema_path, client):
+        schema_path.write_bytes(b'{"swagger": "2.0"}')
+        response = client.get(reverse("openapi_schema"), HTTP_ACCEPT_ENCODING="gzip")
+        assert response["Content-Encoding"] == "gzip"
+        assert response["Vary"] == "Accept-Encoding"
+        assert gzip.decompress(response.content) == b'{"swagger": "2.0"}'
+
+    def test_replaced_schema(self, schema_path, client):
+        schema_path.write_bytes(b'{"swagger": "2.0"}')
+        etag = client.get(reverse("openapi_schema"))["ETag"]
+        schema_path.write_bytes(b'{"swagger": "2.0", "paths": {}}')
+        response = client.get(reverse("openapi_schema"), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.content == b'{"swagger": "2.0", "paths": {}}'
+
+    def test_generated_in_debug_mode(self, schema_path, settings, client):
+        settings.DEBUG = True
+        response = client.get(reverse("openapi_schema"))
+        assert response.status_code == 200
+        assert "/v1/account/" in response.json()["paths"]
+        assert not schema_path.exists()
+
+    def test_swagger_ui_loads_schema_file(self, client, monkeypatch):
+        calls = []
+        get_schema = OpenAPISchemaGenerator.get_schema
+
+        def spy(self, *args, **kwargs):
+            calls.append(args)
+            return get_schema(self, *args, **kwargs)
+
+        monkeypatch.setattr(OpenAPISchemaGenerator, "get_schema", spy)
+        for _ in range(3):
+            response = client.get(reverse("schema-swagger-ui"))
+            assert response.status_code == 200
+            assert reverse("openapi_schema").encode() in response.content
+            assert b"<title>My Awesome API</title>" in response.content
+        # The page doesn't generate the schema, it loads the file
+        assert calls == []
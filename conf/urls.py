@@ -16,41 +16,38 @@ Including another URLconf
 from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
 
-from .views import WelcomeView
+from .docs import lazy_view
+from .views import MetricsView, OpenAPISchemaView, WelcomeView
 
 api_version = settings.API_VERSION
 
-api_info = openapi.Info(
-    title=settings.API_NAME,
-    default_version=settings.API_VERSION,
-    description="Test description",
-    terms_of_service="https://www.google.com/policies/terms/",
-    license=openapi.License(name="MIT License"),
-)
-
-schema_view = get_schema_view(
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
-
-
 urlpatterns = [
     # Django Admin Views
     path("admin/", admin.site.urls),
-    # API Schema
-    path(
-        f"api/{api_version}/swagger/ui/",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
     # Welcome View
     path(f"api/{api_version}/", WelcomeView.as_view(), name="api_welcome_view"),
     # Authentication Views
     path(f"api/{api_version}/auth/", include("auth.urls")),
+    # Native async versions of the authentication views, for ASGI servers
+    path(f"api/{api_version}/auth/async/", include("auth.async_urls")),
     # Account Management
     path(f"api/{api_version}/account/", include("account.urls")),
+    # Prometheus metrics
+    path("metrics", MetricsView.as_view(), name="metrics"),
 ]
+
+if settings.API_DOCS["ENABLED"]:
+    urlpatterns += [
+        # API Schema, drf_yasg is imported by the first request of the UI
+        path(
+            f"api/{api_version}/swagger/ui/",
+            lazy_view("conf.openapi.swagger_ui_view"),
+            name="schema-swagger-ui",
+        ),
+        path(
+            f"api/{api_version}/swagger/schema.json",
+            OpenAPISchemaView.as_view(),
+            name="openapi_schema",
+        ),
+    ]
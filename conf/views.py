@@ -1,15 +1,31 @@
+import re
+
 from django.conf import settings
-from drf_yasg.utils import swagger_auto_schema
+from django.http import Http404, HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.crypto import constant_time_compare
+from django.utils.http import quote_etag
+from django.views import View
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .docs import swagger_auto_schema
+from .metrics import CONTENT_TYPE, generate_latest
+from .schema import get_schema
+
+accepts_gzip = re.compile(r"\bgzip\b")
 
 
 class WelcomeView(APIView):
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
 
     @swagger_auto_schema(
         operation_summary="API Info",
@@ -24,3 +40,49 @@ class WelcomeView(APIView):
             "message": "Welcome!",
         }
         return Response(welcome, status=status.HTTP_200_OK)
+
+
+class MetricsView(View):
+    """
+    Prometheus metrics of all the worker processes, see ``conf.metrics``.
+    Requires ``METRICS["TOKEN"]`` as a bearer token when it's set.
+    """
+
+    def get(self, request):
+        if not settings.METRICS["ENABLED"]:
+            raise Http404()
+        token = settings.METRICS["TOKEN"]
+        if token and not constant_time_compare(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        ):
+            response = HttpResponse(status=401)
+            response["WWW-Authenticate"] = 'Bearer realm="metrics"'
+            return response
+        return HttpResponse(generate_latest(), content_type=CONTENT_TYPE)
+
+
+class OpenAPISchemaView(View):
+    """
+    The OpenAPI schema written by the ``generate_openapi_schema`` command,
+    gzipped for the clients that accept it, with an ETag, see
+    ``conf.schema``.
+    """
+
+    def get(self, request):
+        schema = get_schema()
+        if schema is None:
+            raise Http404("Run the generate_openapi_schema command")
+
+        gzipped = bool(accepts_gzip.search(request.headers.get("Accept-Encoding", "")))
+        etag = quote_etag(f"{schema.etag}-gzip" if gzipped else schema.etag)
+        response = HttpResponse(
+            schema.gzipped if gzipped else schema.content,
+            content_type="application/json",
+        )
+        if gzipped:
+            response["Content-Encoding"] = "gzip"
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Accept-Encoding",))
+        # Cached by browsers, but revalidated with the ETag after a deploy
+        patch_cache_control(response, public=True, no_cache=True)
+        return get_conditional_response(request, etag=etag, response=response)
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+import pytest
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def var_settings(directory):
+    """
+    Returns overrides of the settings that keep files in BASE_DIR / "var",
+    moving the files to ``directory``.
+    """
+    return {
+        "BLACKLIST_INDEX": {
+            **django_settings.BLACKLIST_INDEX,
+            "PATH": str(directory / "blacklist.idx"),
+        },
+        "METRICS": {
+            **django_settings.METRICS,
+            "DIRECTORY": str(directory / "metrics"),
+        },
+        "PROFILING": {
+            **django_settings.PROFILING,
+            "DIRECTORY": str(directory / "profiles"),
+        },
+        "OPENAPI_SCHEMA": {
+            **django_settings.OPENAPI_SCHEMA,
+            "PATH": str(directory / "openapi.json"),
+        },
+    }
+
+
+@pytest.fixture(scope="session", autouse=True)
+def session_var_directory(tmp_path_factory):
+    """
+    Keeps the files written outside of the tests, e.g. the metrics of the
+    connection that creates the test database, out of the working tree.
+    """
+    with override_settings(**var_settings(tmp_path_factory.mktemp("var"))):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def var_directory(settings, tmp_path):
+    """
+    Gives every test its own blacklist index, metrics, profiles and schema
+    files.
+    """
+    for name, value in var_settings(tmp_path).items():
+        setattr(settings, name, value)
+    return tmp_path
+
+
+@pytest.fixture
+def metrics_directory(settings):
+    return settings.METRICS["DIRECTORY"]
+
+
+@pytest.fixture
+def openapi_schema_path(settings):
+    return settings.OPENAPI_SCHEMA["PATH"]
+
+
+@pytest.fixture
+def tokens_issued_earlier(monkeypatch):
+    """
+    Issues tokens a second in the past. The tokens of simplejwt's classes
+    only have "iat", in whole seconds, and those issued in the second of a
+    token epoch are kept, so they must be at least a second older than an
+    epoch set by the test to be revoked.
+    """
+    monkeypatch.setattr(
+        tokens, "aware_utcnow", lambda: aware_utcnow() - timedelta(seconds=1)
+    )